@@ -9,33 +9,56 @@ Environment Variables:
     PHONE_AGENT_BASE_URL: Model API base URL (default: http://localhost:8000/v1)
     PHONE_AGENT_MODEL: Model name (default: autoglm-phone-9b)
     PHONE_AGENT_API_KEY: API key for model authentication (default: EMPTY)
+    PHONE_AGENT_ENDPOINTS: Additional model endpoints, ';'-separated BASE_URL[,MODEL[,API_KEY]]
+    PHONE_AGENT_HEDGE: Hedge slow model requests across endpoints (default: false)
+    PHONE_AGENT_CASCADE: Models to escalate unusable answers to, ';'-separated BASE_URL[,MODEL[,API_KEY]]
+    PHONE_AGENT_MAX_RPS: Client-side limit of model requests per second per provider
+    PHONE_AGENT_MAX_CONCURRENT: Client-side limit of concurrent model streams per provider
+    PHONE_AGENT_MAX_RETRIES: Retries of transient model errors per step (default: 3)
+    PHONE_AGENT_TOKEN_TIMEOUT: Seconds without a streamed token before a model request is retried (default: 30)
+    PHONE_AGENT_STREAM_TIMEOUT: Maximum seconds per model response (default: 300)
+    PHONE_AGENT_RESPONSE_CACHE: Directory caching temperature-0 model responses across runs
     PHONE_AGENT_MAX_STEPS: Maximum steps per task (default: 100)
+    PHONE_AGENT_CONTEXT_BUDGET: Context token budget, 0 to disable (default: 12000)
+    PHONE_AGENT_STABLE_PREFIX: Prefix-cache-friendly message layout (default: false)
     PHONE_AGENT_DEVICE_ID: ADB device ID for multi-device setups
 """
 
 import argparse
+import atexit
 import os
 import shutil
 import subprocess
 import sys
 from urllib.parse import urlparse
 
-from openai import OpenAI
-
 from phone_agent import PhoneAgent
+from phone_agent.adb.watchdog import get_connection_watchdog
 from phone_agent.agent import AgentConfig
 from phone_agent.agent_ios import IOSAgentConfig, IOSPhoneAgent
+from phone_agent.calibration import calibrate_device
+from phone_agent.capabilities import get_capability_cache
+from phone_agent.command_runner import format_command_stats
 from phone_agent.config.apps import list_supported_apps
 from phone_agent.config.apps_harmonyos import list_supported_apps as list_harmonyos_apps
 from phone_agent.config.apps_ios import list_supported_apps as list_ios_apps
 from phone_agent.device_factory import DeviceType, get_device_factory, set_device_type
+from phone_agent.device_metrics import format_device_metrics, save_device_metrics
 from phone_agent.model import ModelConfig
+from phone_agent.model.async_client import get_stall_events
+from phone_agent.model.client import ModelEndpoint
+from phone_agent.model.client_pool import get_openai_client
+from phone_agent.model.rate_limit import format_rate_limit_stats
+from phone_agent.model.response_cache import get_response_cache
+from phone_agent.model.retry import RetryPolicy
 from phone_agent.xctest import XCTestConnection
 from phone_agent.xctest import list_devices as list_ios_devices
 
 
 def check_system_requirements(
-    device_type: DeviceType = DeviceType.ADB, wda_url: str = "http://localhost:8100"
+    device_type: DeviceType = DeviceType.ADB,
+    wda_url: str = "http://localhost:8100",
+    device_id: str | None = None,
 ) -> bool:
     """
     Check system requirements before running the agent.
@@ -49,6 +72,7 @@ def check_system_requirements(
     Args:
         device_type: Type of device tool (ADB, HDC, or IOS).
         wda_url: WebDriverAgent URL (for iOS only).
+        device_id: Device ID to check (for ADB only). If None, uses the connected device.
 
     Returns:
         True if all checks pass, False otherwise.
@@ -195,15 +219,13 @@ def check_system_requirements(
     if device_type == DeviceType.ADB:
         print("3. Checking ADB Keyboard...", end=" ")
         try:
-            result = subprocess.run(
-                ["adb", "shell", "ime", "list", "-s"],
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
-            ime_list = result.stdout.strip()
+            cache = get_capability_cache()
+            caps = cache.get(device_id)
+            if caps is not None and not caps.adb_keyboard_enabled:
+                # Re-probe in case the keyboard was enabled since the last check
+                caps = cache.get(device_id, refresh=True)
 
-            if "com.android.adbkeyboard/.AdbIME" in ime_list:
+            if caps is not None and caps.adb_keyboard_enabled:
                 print("✅ OK")
             else:
                 print("❌ FAILED")
@@ -218,10 +240,6 @@ def check_system_requirements(
                     "     3. Enable it in Settings > System > Languages & Input > Virtual Keyboard"
                 )
                 all_passed = False
-        except subprocess.TimeoutExpired:
-            print("❌ FAILED")
-            print("   Error: ADB command timed out.")
-            all_passed = False
         except Exception as e:
             print("❌ FAILED")
             print(f"   Error: {e}")
@@ -293,8 +311,8 @@ def check_model_api(base_url: str, model_name: str, api_key: str = "EMPTY") -> b
     # Check 1: Network connectivity using chat API
     print(f"1. Checking API connectivity ({base_url})...", end=" ")
     try:
-        # Create OpenAI client
-        client = OpenAI(base_url=base_url, api_key=api_key, timeout=30.0)
+        # Shared client, the task that follows reuses its warm connection
+        client = get_openai_client(base_url, api_key, timeout=30.0)
 
         # Use chat completion to test connectivity (more universally supported than /models)
         response = client.chat.completions.create(
@@ -352,6 +370,25 @@ def check_model_api(base_url: str, model_name: str, api_key: str = "EMPTY") -> b
     return all_passed
 
 
+def parse_endpoint(spec: str) -> ModelEndpoint:
+    """
+    Parse an endpoint given as BASE_URL[,MODEL[,API_KEY]].
+
+    Args:
+        spec: Endpoint specification.
+
+    Returns:
+        ModelEndpoint; a missing model falls back to --model.
+    """
+    base_url, _, rest = spec.strip().partition(",")
+    model_name, _, api_key = rest.partition(",")
+    return ModelEndpoint(
+        base_url=base_url.strip(),
+        model_name=model_name.strip() or None,
+        api_key=api_key.strip() or "EMPTY",
+    )
+
+
 def parse_args() -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -380,6 +417,9 @@ Examples:
     # Enable TCP/IP on USB device and get connection info
     python main.py --enable-tcpip
 
+    # Calibrate per-device action delays (rerun after OS updates)
+    python main.py --calibrate --device-id emulator-5554
+
     # List supported apps
     python main.py --list-apps
 
@@ -423,6 +463,84 @@ Examples:
         help="API key for model authentication",
     )
 
+    parser.add_argument(
+        "--endpoint",
+        action="append",
+        metavar="BASE_URL[,MODEL[,API_KEY]]",
+        default=[
+            spec
+            for spec in os.getenv("PHONE_AGENT_ENDPOINTS", "").split(";")
+            if spec.strip()
+        ],
+        help="Additional endpoint serving the model; each step goes to the fastest "
+        "healthy endpoint (repeatable)",
+    )
+
+    parser.add_argument(
+        "--cascade",
+        action="append",
+        metavar="BASE_URL[,MODEL[,API_KEY]]",
+        default=[
+            spec
+            for spec in os.getenv("PHONE_AGENT_CASCADE", "").split(";")
+            if spec.strip()
+        ],
+        help="Model to escalate to when the answer of --model is unusable (unparsable, "
+        "unknown action or repeated no-op); repeatable, tried in order",
+    )
+
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        default=os.getenv("PHONE_AGENT_HEDGE", "").lower() in ("true", "1", "yes"),
+        help="Send a second request to another endpoint when the first has no token "
+        "after its p95 time to first token",
+    )
+
+    parser.add_argument(
+        "--max-rps",
+        type=float,
+        default=float(os.getenv("PHONE_AGENT_MAX_RPS", "0")),
+        help="Limit model requests per second per provider and API key (0 = unlimited)",
+    )
+
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=int(os.getenv("PHONE_AGENT_MAX_CONCURRENT", "0")),
+        help="Limit concurrent model streams per provider and API key (0 = unlimited)",
+    )
+
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=int(os.getenv("PHONE_AGENT_MAX_RETRIES", "3")),
+        help="Retries of transient model errors (connection errors, 429, 5xx) per step",
+    )
+
+    parser.add_argument(
+        "--token-timeout",
+        type=float,
+        default=float(os.getenv("PHONE_AGENT_TOKEN_TIMEOUT", "30")),
+        help="Abort and retry a model stream after this many seconds without a token "
+        "(0 = no limit; the first token may take twice as long)",
+    )
+
+    parser.add_argument(
+        "--stream-timeout",
+        type=float,
+        default=float(os.getenv("PHONE_AGENT_STREAM_TIMEOUT", "300")),
+        help="Abort and retry a model response that takes longer in total (0 = no limit)",
+    )
+
+    parser.add_argument(
+        "--response-cache",
+        type=str,
+        metavar="DIR",
+        default=os.getenv("PHONE_AGENT_RESPONSE_CACHE"),
+        help="Replay identical temperature-0 model requests from a cache in this directory",
+    )
+
     parser.add_argument(
         "--max-steps",
         type=int,
@@ -430,6 +548,14 @@ Examples:
         help="Maximum steps per task",
     )
 
+    parser.add_argument(
+        "--context-budget",
+        type=int,
+        default=int(os.getenv("PHONE_AGENT_CONTEXT_BUDGET", "0")),
+        help="Estimated prompt tokens above which old steps are compacted "
+        "into an action log, e.g. 12000 (default: 0, keep the full history)",
+    )
+
     # Device options
     parser.add_argument(
         "--device-id",
@@ -460,6 +586,12 @@ Examples:
         "--list-devices", action="store_true", help="List connected devices and exit"
     )
 
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Measure action delays on the device, save a timing profile and exit",
+    )
+
     parser.add_argument(
         "--enable-tcpip",
         type=int,
@@ -490,6 +622,22 @@ Examples:
     )
 
     # Other options
+    parser.add_argument(
+        "--ui-diff",
+        action="store_true",
+        default=os.getenv("PHONE_AGENT_UI_DIFF", "").lower() in ("true", "1", "yes"),
+        help="Diff the UI hierarchy between steps and skip re-capturing unchanged screens",
+    )
+
+    parser.add_argument(
+        "--stable-prefix",
+        action="store_true",
+        default=os.getenv("PHONE_AGENT_STABLE_PREFIX", "").lower()
+        in ("true", "1", "yes"),
+        help="Keep the system prompt free of the date and compact history in batches, "
+        "so servers with prefix caching can reuse the prompt prefix",
+    )
+
     parser.add_argument(
         "--quiet", "-q", action="store_true", help="Suppress verbose output"
     )
@@ -678,6 +826,12 @@ def handle_device_commands(args) -> bool:
                 print("\nCould not determine device IP. Check device WiFi settings.")
         return True
 
+    # Handle --calibrate
+    if args.calibrate:
+        print("Calibrating action delays, keep the device unlocked...")
+        calibrate_device(args.device_id, device_type)
+        return True
+
     return False
 
 
@@ -737,6 +891,7 @@ def main():
         wda_url=args.wda_url
         if device_type == DeviceType.IOS
         else "http://localhost:8100",
+        device_id=args.device_id,
     ):
         sys.exit(1)
 
@@ -750,6 +905,17 @@ def main():
         model_name=args.model,
         api_key=args.apikey,
         lang=args.lang,
+        endpoints=[parse_endpoint(spec) for spec in args.endpoint],
+        cascade=[parse_endpoint(spec) for spec in args.cascade],
+        hedge=args.hedge,
+        requests_per_second=args.max_rps or None,
+        max_concurrent_requests=args.max_concurrent or None,
+        retry=RetryPolicy(max_retries=args.max_retries),
+        first_token_timeout=args.token_timeout * 2 or None,
+        token_timeout=args.token_timeout or None,
+        stream_timeout=args.stream_timeout or None,
+        response_cache=bool(args.response_cache),
+        response_cache_dir=args.response_cache,
     )
 
     if device_type == DeviceType.IOS:
@@ -760,6 +926,9 @@ def main():
             device_id=args.device_id,
             verbose=not args.quiet,
             lang=args.lang,
+            ui_diff=args.ui_diff,
+            context_token_budget=args.context_budget or None,
+            stable_prefix=args.stable_prefix,
         )
 
         agent = IOSPhoneAgent(
@@ -773,6 +942,9 @@ def main():
             device_id=args.device_id,
             verbose=not args.quiet,
             lang=args.lang,
+            ui_diff=args.ui_diff,
+            context_token_budget=args.context_budget or None,
+            stable_prefix=args.stable_prefix,
         )
 
         agent = PhoneAgent(
@@ -817,11 +989,41 @@ def main():
 
     print("=" * 50)
 
+    # Keep the final metrics snapshot even if the task fails or is interrupted
+    atexit.register(save_device_metrics)
+
     # Run with provided task or enter interactive mode
     if args.task:
         print(f"\nTask: {args.task}\n")
         result = agent.run(args.task)
         print(f"\nResult: {result}")
+        if not args.quiet:
+            print(f"\nDevice command latency:\n{format_command_stats()}")
+            print(f"\nPer-device latency:\n{format_device_metrics()}")
+            if model_config.endpoints:
+                print(
+                    f"\nModel endpoints:\n{agent.model_client.async_client.format_stats()}"
+                )
+            if model_config.cascade:
+                print(f"\nModel cascade:\n{agent.model_client.cascade.format_stats()}")
+            if args.max_rps or args.max_concurrent:
+                print(f"\nModel rate limits:\n{format_rate_limit_stats()}")
+            if args.response_cache:
+                stats = get_response_cache(args.response_cache).get_stats()
+                print(
+                    f"\nModel response cache: {stats['hits']} hits, {stats['misses']} misses "
+                    f"({stats['hit_rate']:.0%})"
+                )
+            for stall in get_stall_events():
+                print(
+                    f"Model stream stalled at step {stall.get('step', '?')} "
+                    f"({stall['provider']}): no {stall['phase']} after {stall['waited']:.1f}s"
+                )
+            for address, metrics in get_connection_watchdog().get_metrics().items():
+                print(
+                    f"Connection {address}: {metrics['reconnects']} reconnects, "
+                    f"{metrics['total_downtime']:.1f}s downtime"
+                )
     else:
         # Interactive mode
         print("\nEntering interactive mode. Type 'quit' to exit.\n")
@@ -2,14 +2,35 @@
 
 import ast
 import re
-import subprocess
 import time
 from dataclasses import dataclass
 from typing import Any, Callable
 
+from phone_agent.actions.ime_session import IMESession
 from phone_agent.config.timing import TIMING_CONFIG
 from phone_agent.device_factory import get_device_factory
 
+# Actions the model may name in do(action=...) and the ActionHandler method
+# handling each
+ACTION_HANDLERS = {
+    "Launch": "_handle_launch",
+    "Tap": "_handle_tap",
+    "Type": "_handle_type",
+    "Type_Name": "_handle_type",
+    "Swipe": "_handle_swipe",
+    "Back": "_handle_back",
+    "Home": "_handle_home",
+    "Double Tap": "_handle_double_tap",
+    "Long Press": "_handle_long_press",
+    "Wait": "_handle_wait",
+    "Take_over": "_handle_takeover",
+    "Note": "_handle_note",
+    "Call_API": "_handle_call_api",
+    "Interact": "_handle_interact",
+}
+
+KNOWN_ACTIONS = frozenset(ACTION_HANDLERS)
+
 
 @dataclass
 class ActionResult:
@@ -41,6 +62,11 @@ class ActionHandler:
         self.device_id = device_id
         self.confirmation_callback = confirmation_callback or self._default_confirmation
         self.takeover_callback = takeover_callback or self._default_takeover
+        self.ime_session = IMESession(device_id)
+
+    def end_task(self) -> None:
+        """Release per-task resources, restoring the original IME if needed."""
+        self.ime_session.restore()
 
     def execute(
         self, action: dict[str, Any], screen_width: int, screen_height: int
@@ -89,23 +115,8 @@ class ActionHandler:
 
     def _get_handler(self, action_name: str) -> Callable | None:
         """Get the handler method for an action."""
-        handlers = {
-            "Launch": self._handle_launch,
-            "Tap": self._handle_tap,
-            "Type": self._handle_type,
-            "Type_Name": self._handle_type,
-            "Swipe": self._handle_swipe,
-            "Back": self._handle_back,
-            "Home": self._handle_home,
-            "Double Tap": self._handle_double_tap,
-            "Long Press": self._handle_long_press,
-            "Wait": self._handle_wait,
-            "Take_over": self._handle_takeover,
-            "Note": self._handle_note,
-            "Call_API": self._handle_call_api,
-            "Interact": self._handle_interact,
-        }
-        return handlers.get(action_name)
+        method_name = ACTION_HANDLERS.get(action_name)
+        return getattr(self, method_name) if method_name else None
 
     def _convert_relative_to_absolute(
         self, element: list[int], screen_width: int, screen_height: int
@@ -154,9 +165,9 @@ class ActionHandler:
 
         device_factory = get_device_factory()
 
-        # Switch to ADB keyboard
-        original_ime = device_factory.detect_and_set_adb_keyboard(self.device_id)
-        time.sleep(TIMING_CONFIG.action.keyboard_switch_delay)
+        # Switch to ADB keyboard once per session; it stays active across
+        # consecutive Type actions and is restored by the session
+        self.ime_session.ensure_active()
 
         # Clear existing text and type new text
         device_factory.clear_text(self.device_id)
@@ -166,10 +177,6 @@ class ActionHandler:
         device_factory.type_text(text, self.device_id)
         time.sleep(TIMING_CONFIG.action.text_input_delay)
 
-        # Restore original keyboard
-        device_factory.restore_keyboard(original_ime, self.device_id)
-        time.sleep(TIMING_CONFIG.action.keyboard_restore_delay)
-
         return ActionResult(True, False)
 
     def _handle_swipe(self, action: dict, width: int, height: int) -> ActionResult:
@@ -256,66 +263,8 @@ class ActionHandler:
         return ActionResult(True, False, message="User interaction required")
 
     def _send_keyevent(self, keycode: str) -> None:
-        """Send a keyevent to the device."""
-        from phone_agent.device_factory import DeviceType, get_device_factory
-        from phone_agent.hdc.connection import _run_hdc_command
-
-        device_factory = get_device_factory()
-
-        # Handle HDC devices with HarmonyOS-specific keyEvent command
-        if device_factory.device_type == DeviceType.HDC:
-            hdc_prefix = ["hdc", "-t", self.device_id] if self.device_id else ["hdc"]
-            
-            # Map common keycodes to HarmonyOS keyEvent codes
-            # KEYCODE_ENTER (66) -> 2054 (HarmonyOS Enter key code)
-            if keycode == "KEYCODE_ENTER" or keycode == "66":
-                _run_hdc_command(
-                    hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "2054"],
-                    capture_output=True,
-                    text=True,
-                )
-            else:
-                # For other keys, try to use the numeric code directly
-                # If keycode is a string like "KEYCODE_ENTER", convert it
-                try:
-                    # Try to extract numeric code from string or use as-is
-                    if keycode.startswith("KEYCODE_"):
-                        # For now, only handle ENTER, other keys may need mapping
-                        if "ENTER" in keycode:
-                            _run_hdc_command(
-                                hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "2054"],
-                                capture_output=True,
-                                text=True,
-                            )
-                        else:
-                            # Fallback to ADB-style command for unsupported keys
-                            subprocess.run(
-                                hdc_prefix + ["shell", "input", "keyevent", keycode],
-                                capture_output=True,
-                                text=True,
-                            )
-                    else:
-                        # Assume it's a numeric code
-                        _run_hdc_command(
-                            hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", str(keycode)],
-                            capture_output=True,
-                            text=True,
-                        )
-                except Exception:
-                    # Fallback to ADB-style command
-                    subprocess.run(
-                        hdc_prefix + ["shell", "input", "keyevent", keycode],
-                        capture_output=True,
-                        text=True,
-                    )
-        else:
-            # ADB devices use standard input keyevent command
-            cmd_prefix = ["adb", "-s", self.device_id] if self.device_id else ["adb"]
-            subprocess.run(
-                cmd_prefix + ["shell", "input", "keyevent", keycode],
-                capture_output=True,
-                text=True,
-            )
+        """Send a keyevent (Android key code) to the device."""
+        get_device_factory().press_keys([keycode], self.device_id)
 
     @staticmethod
     def _default_confirmation(message: str) -> bool:
@@ -0,0 +1,84 @@
+"""IME session management for text input actions."""
+
+import subprocess
+
+from phone_agent.device_factory import get_device_factory
+
+
+class IMESession:
+    """
+    Keeps ADB Keyboard active across consecutive Type actions within a task.
+
+    The keyboard is switched on the first Type action and left in place for
+    subsequent ones. The original IME is restored when the task ends or when
+    the focused package changes away from the one the session was opened in.
+
+    Args:
+        device_id: Optional device ID for multi-device setups.
+
+    Example:
+        >>> session = IMESession(device_id="emulator-5554")
+        >>> session.ensure_active()  # Switches to ADB Keyboard once
+        >>> session.ensure_active()  # No-op, already active
+        >>> session.check_foreground()  # Restores if another app took focus
+        >>> session.restore()  # Restores the original IME
+    """
+
+    def __init__(self, device_id: str | None = None):
+        self.device_id = device_id
+        self._active = False
+        self._original_ime = ""
+        self._session_package: str | None = None
+
+    @property
+    def active(self) -> bool:
+        """Whether ADB Keyboard is currently held by this session."""
+        return self._active
+
+    @property
+    def original_ime(self) -> str:
+        """The IME that will be restored when the session ends."""
+        return self._original_ime
+
+    def ensure_active(self) -> None:
+        """Switch to ADB Keyboard if the session is not already active."""
+        if self._active:
+            return
+
+        device_factory = get_device_factory()
+        self._original_ime = device_factory.detect_and_set_adb_keyboard(self.device_id)
+        self._session_package = self._focused_package()
+        self._active = True
+
+    def check_foreground(self) -> None:
+        """
+        Restore the original IME if another app has taken focus.
+
+        Packages are compared rather than app names, so switching between
+        two apps that are not in the app table is noticed as well. Nothing
+        happens while either package is unknown.
+        """
+        if not self._active or self._session_package is None:
+            return
+        package = self._focused_package()
+        if package is not None and package != self._session_package:
+            self.restore()
+
+    def restore(self) -> None:
+        """Restore the original IME and close the session."""
+        if not self._active:
+            return
+
+        device_factory = get_device_factory()
+        try:
+            device_factory.restore_keyboard(self._original_ime, self.device_id)
+        finally:
+            self._active = False
+            self._original_ime = ""
+            self._session_package = None
+
+    def _focused_package(self) -> str | None:
+        try:
+            return get_device_factory().get_current_package(self.device_id)
+        except subprocess.TimeoutExpired:
+            return None
@@ -11,19 +11,28 @@ from phone_agent.adb.device import (
     back,
     double_tap,
     get_current_app,
+    get_current_package,
     home,
     launch_app,
     long_press,
+    press_keys,
     swipe,
     tap,
 )
 from phone_agent.adb.input import (
     clear_text,
     detect_and_set_adb_keyboard,
+    get_current_ime,
     restore_keyboard,
     type_text,
+    wait_for_ime,
 )
 from phone_agent.adb.screenshot import get_screenshot
+from phone_agent.adb.watchdog import (
+    ConnectionWatchdog,
+    get_connection_watchdog,
+    is_remote_address,
+)
 
 __all__ = [
     # Screenshot
@@ -33,8 +42,11 @@ __all__ = [
     "clear_text",
     "detect_and_set_adb_keyboard",
     "restore_keyboard",
+    "get_current_ime",
+    "wait_for_ime",
     # Device control
     "get_current_app",
+    "get_current_package",
     "tap",
     "swipe",
     "back",
@@ -42,10 +54,15 @@ __all__ = [
     "double_tap",
     "long_press",
     "launch_app",
+    "press_keys",
     # Connection management
     "ADBConnection",
     "DeviceInfo",
     "ConnectionType",
     "quick_connect",
     "list_devices",
+    # Connection watchdog
+    "ConnectionWatchdog",
+    "get_connection_watchdog",
+    "is_remote_address",
 ]
@@ -0,0 +1,579 @@
+"""ADB device, input and screenshot commands as coroutines.
+
+The functions run ``adb`` through ``asyncio.create_subprocess_exec`` and
+sleep with ``asyncio.sleep``, so a single event loop can drive many devices
+at once. They are the only implementation of these commands: the blocking
+functions exported by ``phone_agent.adb`` run them with
+``command_runner.run_blocking``.
+
+Example:
+    >>> import asyncio
+    >>> from phone_agent.adb import aio
+    >>> async def main():
+    ...     await asyncio.gather(
+    ...         aio.tap(500, 1000, device_id="emulator-5554"),
+    ...         aio.tap(500, 1000, device_id="emulator-5556"),
+    ...     )
+    >>> asyncio.run(main())
+"""
+
+import asyncio
+import base64
+import os
+import re
+import subprocess
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image
+
+from phone_agent.command_runner import CommandCancelledError, run_command_async
+from phone_agent.config.apps import APP_PACKAGES
+from phone_agent.config.timing import get_timing_config
+
+# Input method ID of ADB Keyboard
+ADB_KEYBOARD_IME = "com.android.adbkeyboard/.AdbIME"
+
+
+@dataclass
+class Screenshot:
+    """Represents a captured screenshot."""
+
+    base64_data: str
+    width: int
+    height: int
+    is_sensitive: bool = False
+
+
+async def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screenshot:
+    """
+    Capture a screenshot from the connected Android device.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+        timeout: Timeout in seconds for screenshot operations.
+
+    Returns:
+        Screenshot object containing base64 data and dimensions.
+    """
+    temp_path = os.path.join(tempfile.gettempdir(), f"screenshot_{uuid.uuid4()}.png")
+    adb_prefix = _get_adb_prefix(device_id)
+
+    try:
+        result = await run_command_async(
+            adb_prefix + ["shell", "screencap", "-p", "/sdcard/tmp.png"],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+
+        # Check for screenshot failure (sensitive screen)
+        output = result.stdout + result.stderr
+        if "Status: -1" in output or "Failed" in output:
+            return _create_fallback_screenshot(is_sensitive=True, device_id=device_id)
+
+        await run_command_async(
+            adb_prefix + ["pull", "/sdcard/tmp.png", temp_path],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+
+        if not os.path.exists(temp_path):
+            return _create_fallback_screenshot(is_sensitive=False, device_id=device_id)
+
+        # Encoding is CPU-bound, keep it off the event loop
+        base64_data, width, height = await asyncio.to_thread(_encode_png, temp_path)
+        os.remove(temp_path)
+
+        return Screenshot(
+            base64_data=base64_data, width=width, height=height, is_sensitive=False
+        )
+
+    except (CommandCancelledError, subprocess.TimeoutExpired):
+        # Cancellation and the step deadline are the caller's to handle
+        raise
+    except Exception as e:
+        print(f"Screenshot error: {e}")
+        return _create_fallback_screenshot(is_sensitive=False, device_id=device_id)
+
+
+def _encode_png(path: str) -> tuple[str, int, int]:
+    """Read a pulled screenshot as base64 PNG data and its size."""
+    with Image.open(path) as img:
+        width, height = img.size
+        buffered = BytesIO()
+        img.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode("utf-8"), width, height
+
+
+def _create_fallback_screenshot(
+    is_sensitive: bool, device_id: str | None = None
+) -> Screenshot:
+    """Create a black fallback image when screenshot fails."""
+    from phone_agent.capabilities import get_capability_cache
+
+    default_width, default_height = 1080, 2400
+
+    # Match the real screen size if it is known, so coordinates stay valid
+    caps = get_capability_cache().peek(device_id)
+    if caps is not None and caps.screen_width and caps.screen_height:
+        default_width, default_height = caps.screen_width, caps.screen_height
+
+    black_img = Image.new("RGB", (default_width, default_height), color="black")
+    buffered = BytesIO()
+    black_img.save(buffered, format="PNG")
+    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+    return Screenshot(
+        base64_data=base64_data,
+        width=default_width,
+        height=default_height,
+        is_sensitive=is_sensitive,
+    )
+
+
+async def get_current_app(device_id: str | None = None) -> str:
+    """
+    Get the currently focused app name.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Returns:
+        The app name if recognized, otherwise "System Home".
+    """
+    adb_prefix = _get_adb_prefix(device_id)
+
+    result = await run_command_async(
+        adb_prefix + ["shell", "dumpsys", "window"],
+        capture_output=True,
+        encoding="utf-8",
+    )
+    output = result.stdout
+    if not output:
+        raise ValueError("No output from dumpsys window")
+
+    return _parse_current_app(output)
+
+
+def _parse_current_app(output: str) -> str:
+    """Map `dumpsys window` output to a known app name or "System Home"."""
+    # Parse window focus info
+    for line in output.split("\n"):
+        if "mCurrentFocus" in line or "mFocusedApp" in line:
+            for app_name, package in APP_PACKAGES.items():
+                if package in line:
+                    return app_name
+
+    return "System Home"
+
+
+# Package of the focused activity in `dumpsys window`, e.g.
+# "mFocusedApp=ActivityRecord{7d3f u0 com.tencent.mm/.ui.LauncherUI t12}"
+_FOCUS_PACKAGE_RE = re.compile(r"(mFocusedApp|mCurrentFocus)=.*?\s([A-Za-z][\w.]*)/")
+
+
+async def get_current_package(device_id: str | None = None) -> str | None:
+    """
+    Get the package name of the focused app.
+
+    Unlike get_current_app, this also identifies apps that are not listed
+    in APP_PACKAGES.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Returns:
+        The package name, or None if no app window has focus.
+    """
+    adb_prefix = _get_adb_prefix(device_id)
+
+    result = await run_command_async(
+        adb_prefix + ["shell", "dumpsys", "window"],
+        capture_output=True,
+        encoding="utf-8",
+    )
+    return _parse_current_package(result.stdout or "")
+
+
+def _parse_current_package(output: str) -> str | None:
+    """Extract the focused package from `dumpsys window` output."""
+    packages = {}
+    for match in _FOCUS_PACKAGE_RE.finditer(output):
+        packages.setdefault(match.group(1), match.group(2))
+    # The focused activity stays put while a popup or the IME takes focus
+    return packages.get("mFocusedApp") or packages.get("mCurrentFocus")
+
+
+async def tap(
+    x: int, y: int, device_id: str | None = None, delay: float | None = None
+) -> None:
+    """
+    Tap at the specified coordinates.
+
+    Args:
+        x: X coordinate.
+        y: Y coordinate.
+        device_id: Optional ADB device ID.
+        delay: Delay in seconds after tap. If None, uses configured default.
+    """
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_tap_delay
+
+    adb_prefix = _get_adb_prefix(device_id)
+
+    await run_command_async(
+        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
+    )
+    await asyncio.sleep(delay)
+
+
+async def double_tap(
+    x: int, y: int, device_id: str | None = None, delay: float | None = None
+) -> None:
+    """
+    Double tap at the specified coordinates.
+
+    Args:
+        x: X coordinate.
+        y: Y coordinate.
+        device_id: Optional ADB device ID.
+        delay: Delay in seconds after double tap. If None, uses configured default.
+    """
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_double_tap_delay
+
+    adb_prefix = _get_adb_prefix(device_id)
+
+    await run_command_async(
+        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
+    )
+    await asyncio.sleep(get_timing_config(device_id).device.double_tap_interval)
+    await run_command_async(
+        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
+    )
+    await asyncio.sleep(delay)
+
+
+async def long_press(
+    x: int,
+    y: int,
+    duration_ms: int = 3000,
+    device_id: str | None = None,
+    delay: float | None = None,
+) -> None:
+    """
+    Long press at the specified coordinates.
+
+    Args:
+        x: X coordinate.
+        y: Y coordinate.
+        duration_ms: Duration of press in milliseconds.
+        device_id: Optional ADB device ID.
+        delay: Delay in seconds after long press. If None, uses configured default.
+    """
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_long_press_delay
+
+    adb_prefix = _get_adb_prefix(device_id)
+
+    await run_command_async(
+        adb_prefix
+        + ["shell", "input", "swipe", str(x), str(y), str(x), str(y), str(duration_ms)],
+        capture_output=True,
+    )
+    await asyncio.sleep(delay)
+
+
+async def swipe(
+    start_x: int,
+    start_y: int,
+    end_x: int,
+    end_y: int,
+    duration_ms: int | None = None,
+    device_id: str | None = None,
+    delay: float | None = None,
+) -> None:
+    """
+    Swipe from start to end coordinates.
+
+    Args:
+        start_x: Starting X coordinate.
+        start_y: Starting Y coordinate.
+        end_x: Ending X coordinate.
+        end_y: Ending Y coordinate.
+        duration_ms: Duration of swipe in milliseconds (auto-calculated if None).
+        device_id: Optional ADB device ID.
+        delay: Delay in seconds after swipe. If None, uses configured default.
+    """
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_swipe_delay
+
+    adb_prefix = _get_adb_prefix(device_id)
+
+    if duration_ms is None:
+        # Calculate duration based on distance
+        dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
+        duration_ms = int(dist_sq / 1000)
+        duration_ms = max(1000, min(duration_ms, 2000))  # Clamp between 1000-2000ms
+
+    await run_command_async(
+        adb_prefix
+        + [
+            "shell",
+            "input",
+            "swipe",
+            str(start_x),
+            str(start_y),
+            str(end_x),
+            str(end_y),
+            str(duration_ms),
+        ],
+        capture_output=True,
+    )
+    await asyncio.sleep(delay)
+
+
+async def back(device_id: str | None = None, delay: float | None = None) -> None:
+    """
+    Press the back button.
+
+    Args:
+        device_id: Optional ADB device ID.
+        delay: Delay in seconds after pressing back. If None, uses configured default.
+    """
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_back_delay
+
+    adb_prefix = _get_adb_prefix(device_id)
+
+    await run_command_async(
+        adb_prefix + ["shell", "input", "keyevent", "4"], capture_output=True
+    )
+    await asyncio.sleep(delay)
+
+
+async def home(device_id: str | None = None, delay: float | None = None) -> None:
+    """
+    Press the home button.
+
+    Args:
+        device_id: Optional ADB device ID.
+        delay: Delay in seconds after pressing home. If None, uses configured default.
+    """
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_home_delay
+
+    adb_prefix = _get_adb_prefix(device_id)
+
+    await run_command_async(
+        adb_prefix + ["shell", "input", "keyevent", "KEYCODE_HOME"], capture_output=True
+    )
+    await asyncio.sleep(delay)
+
+
+async def press_keys(keycodes: list[str | int], device_id: str | None = None) -> None:
+    """
+    Press a sequence of keys in a single adb call.
+
+    Args:
+        keycodes: Android key codes, as names ("KEYCODE_ENTER") or numbers (66).
+        device_id: Optional ADB device ID.
+    """
+    if not keycodes:
+        return
+
+    adb_prefix = _get_adb_prefix(device_id)
+
+    await run_command_async(
+        adb_prefix + ["shell", "input", "keyevent"] + [str(k) for k in keycodes],
+        capture_output=True,
+    )
+
+
+async def launch_app(
+    app_name: str, device_id: str | None = None, delay: float | None = None
+) -> bool:
+    """
+    Launch an app by name.
+
+    Args:
+        app_name: The app name (must be in APP_PACKAGES).
+        device_id: Optional ADB device ID.
+        delay: Delay in seconds after launching. If None, uses configured default.
+
+    Returns:
+        True if app was launched, False if app not found.
+    """
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_launch_delay
+
+    if app_name not in APP_PACKAGES:
+        return False
+
+    adb_prefix = _get_adb_prefix(device_id)
+    package = APP_PACKAGES[app_name]
+
+    await run_command_async(
+        adb_prefix
+        + [
+            "shell",
+            "monkey",
+            "-p",
+            package,
+            "-c",
+            "android.intent.category.LAUNCHER",
+            "1",
+        ],
+        capture_output=True,
+    )
+    await asyncio.sleep(delay)
+    return True
+
+
+async def type_text(text: str, device_id: str | None = None) -> None:
+    """
+    Type text into the currently focused input field using ADB Keyboard.
+
+    Args:
+        text: The text to type.
+        device_id: Optional ADB device ID for multi-device setups.
+    """
+    adb_prefix = _get_adb_prefix(device_id)
+    encoded_text = base64.b64encode(text.encode("utf-8")).decode("utf-8")
+
+    await run_command_async(
+        adb_prefix
+        + [
+            "shell",
+            "am",
+            "broadcast",
+            "-a",
+            "ADB_INPUT_B64",
+            "--es",
+            "msg",
+            encoded_text,
+        ],
+        capture_output=True,
+    )
+
+
+async def clear_text(device_id: str | None = None) -> None:
+    """
+    Clear text in the currently focused input field.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+    """
+    adb_prefix = _get_adb_prefix(device_id)
+
+    await run_command_async(
+        adb_prefix + ["shell", "am", "broadcast", "-a", "ADB_CLEAR_TEXT"],
+        capture_output=True,
+    )
+
+
+async def get_current_ime(device_id: str | None = None) -> str:
+    """
+    Get the currently selected input method.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Returns:
+        The IME identifier reported by ``default_input_method``.
+    """
+    adb_prefix = _get_adb_prefix(device_id)
+
+    result = await run_command_async(
+        adb_prefix + ["shell", "settings", "get", "secure", "default_input_method"],
+        capture_output=True,
+        text=True,
+    )
+    return (result.stdout + result.stderr).strip()
+
+
+async def wait_for_ime(
+    ime: str,
+    device_id: str | None = None,
+    timeout: float | None = None,
+    poll_interval: float | None = None,
+) -> bool:
+    """
+    Wait until the given IME is reported as the selected input method.
+
+    Args:
+        ime: The IME identifier to wait for.
+        device_id: Optional ADB device ID for multi-device setups.
+        timeout: Maximum time to wait in seconds. If None, uses configured default.
+        poll_interval: Time between checks in seconds. If None, uses configured default.
+
+    Returns:
+        True if the IME became active within the timeout, False otherwise.
+    """
+    if timeout is None:
+        timeout = get_timing_config(device_id).action.ime_ready_timeout
+    if poll_interval is None:
+        poll_interval = get_timing_config(device_id).action.ime_poll_interval
+
+    deadline = time.monotonic() + timeout
+    while True:
+        if ime in await get_current_ime(device_id):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(poll_interval)
+
+
+async def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
+    """
+    Detect current keyboard and switch to ADB Keyboard if needed.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Returns:
+        The original keyboard IME identifier for later restoration.
+    """
+    adb_prefix = _get_adb_prefix(device_id)
+
+    current_ime = await get_current_ime(device_id)
+
+    # Switch to ADB Keyboard if not already set
+    if ADB_KEYBOARD_IME not in current_ime:
+        await run_command_async(
+            adb_prefix + ["shell", "ime", "set", ADB_KEYBOARD_IME], capture_output=True
+        )
+        if not await wait_for_ime(ADB_KEYBOARD_IME, device_id):
+            print(f"Warning: {ADB_KEYBOARD_IME} did not become the active IME in time")
+
+    # Warm up the keyboard
+    await type_text("", device_id)
+
+    return current_ime
+
+
+async def restore_keyboard(ime: str, device_id: str | None = None) -> None:
+    """
+    Restore the original keyboard IME.
+
+    Args:
+        ime: The IME identifier to restore.
+        device_id: Optional ADB device ID for multi-device setups.
+    """
+    adb_prefix = _get_adb_prefix(device_id)
+
+    await run_command_async(
+        adb_prefix + ["shell", "ime", "set", ime], capture_output=True
+    )
+
+
+def _get_adb_prefix(device_id: str | None) -> list:
+    """Get ADB command prefix with optional device specifier."""
+    if device_id:
+        return ["adb", "-s", device_id]
+    return ["adb"]
@@ -83,6 +83,10 @@ class ADBConnection:
             output = result.stdout + result.stderr
 
             if "connected" in output.lower():
+                # Fill the capability cache on first connect
+                from phone_agent.capabilities import get_capability_cache
+
+                get_capability_cache().get(address, adb_path=self.adb_path)
                 return True, f"Connected to {address}"
             elif "already connected" in output.lower():
                 return True, f"Already connected to {address}"
@@ -1,12 +1,11 @@
-"""Device control utilities for Android automation."""
+"""Device control utilities for Android automation.
 
-import os
-import subprocess
-import time
-from typing import List, Optional, Tuple
+The commands are implemented once, as coroutines in ``phone_agent.adb.aio``;
+the functions here run them for blocking callers.
+"""
 
-from phone_agent.config.apps import APP_PACKAGES
-from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.adb import aio
+from phone_agent.command_runner import run_blocking
 
 
 def get_current_app(device_id: str | None = None) -> str:
@@ -19,23 +18,20 @@ def get_current_app(device_id: str | None = None) -> str:
     Returns:
         The app name if recognized, otherwise "System Home".
     """
-    adb_prefix = _get_adb_prefix(device_id)
+    return run_blocking(aio.get_current_app(device_id))
 
-    result = subprocess.run(
-        adb_prefix + ["shell", "dumpsys", "window"], capture_output=True, text=True, encoding="utf-8"
-    )
-    output = result.stdout
-    if not output:
-        raise ValueError("No output from dumpsys window")
 
-    # Parse window focus info
-    for line in output.split("\n"):
-        if "mCurrentFocus" in line or "mFocusedApp" in line:
-            for app_name, package in APP_PACKAGES.items():
-                if package in line:
-                    return app_name
+def get_current_package(device_id: str | None = None) -> str | None:
+    """
+    Get the package name of the focused app.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
 
-    return "System Home"
+    Returns:
+        The package name, or None if no app window has focus.
+    """
+    return run_blocking(aio.get_current_package(device_id))
 
 
 def tap(
@@ -50,15 +46,7 @@ def tap(
         device_id: Optional ADB device ID.
         delay: Delay in seconds after tap. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_tap_delay
-
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
-    )
-    time.sleep(delay)
+    run_blocking(aio.tap(x, y, device_id, delay))
 
 
 def double_tap(
@@ -73,19 +61,7 @@ def double_tap(
         device_id: Optional ADB device ID.
         delay: Delay in seconds after double tap. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_double_tap_delay
-
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
-    )
-    time.sleep(TIMING_CONFIG.device.double_tap_interval)
-    subprocess.run(
-        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
-    )
-    time.sleep(delay)
+    run_blocking(aio.double_tap(x, y, device_id, delay))
 
 
 def long_press(
@@ -105,17 +81,7 @@ def long_press(
         device_id: Optional ADB device ID.
         delay: Delay in seconds after long press. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_long_press_delay
-
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix
-        + ["shell", "input", "swipe", str(x), str(y), str(x), str(y), str(duration_ms)],
-        capture_output=True,
-    )
-    time.sleep(delay)
+    run_blocking(aio.long_press(x, y, duration_ms, device_id, delay))
 
 
 def swipe(
@@ -139,32 +105,9 @@ def swipe(
         device_id: Optional ADB device ID.
         delay: Delay in seconds after swipe. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_swipe_delay
-
-    adb_prefix = _get_adb_prefix(device_id)
-
-    if duration_ms is None:
-        # Calculate duration based on distance
-        dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
-        duration_ms = int(dist_sq / 1000)
-        duration_ms = max(1000, min(duration_ms, 2000))  # Clamp between 1000-2000ms
-
-    subprocess.run(
-        adb_prefix
-        + [
-            "shell",
-            "input",
-            "swipe",
-            str(start_x),
-            str(start_y),
-            str(end_x),
-            str(end_y),
-            str(duration_ms),
-        ],
-        capture_output=True,
+    run_blocking(
+        aio.swipe(start_x, start_y, end_x, end_y, duration_ms, device_id, delay)
     )
-    time.sleep(delay)
 
 
 def back(device_id: str | None = None, delay: float | None = None) -> None:
@@ -175,15 +118,7 @@ def back(device_id: str | None = None, delay: float | None = None) -> None:
         device_id: Optional ADB device ID.
         delay: Delay in seconds after pressing back. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_back_delay
-
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "input", "keyevent", "4"], capture_output=True
-    )
-    time.sleep(delay)
+    run_blocking(aio.back(device_id, delay))
 
 
 def home(device_id: str | None = None, delay: float | None = None) -> None:
@@ -194,15 +129,7 @@ def home(device_id: str | None = None, delay: float | None = None) -> None:
         device_id: Optional ADB device ID.
         delay: Delay in seconds after pressing home. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_home_delay
-
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "input", "keyevent", "KEYCODE_HOME"], capture_output=True
-    )
-    time.sleep(delay)
+    run_blocking(aio.home(device_id, delay))
 
 
 def launch_app(
@@ -219,34 +146,15 @@ def launch_app(
     Returns:
         True if app was launched, False if app not found.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_launch_delay
-
-    if app_name not in APP_PACKAGES:
-        return False
-
-    adb_prefix = _get_adb_prefix(device_id)
-    package = APP_PACKAGES[app_name]
-
-    subprocess.run(
-        adb_prefix
-        + [
-            "shell",
-            "monkey",
-            "-p",
-            package,
-            "-c",
-            "android.intent.category.LAUNCHER",
-            "1",
-        ],
-        capture_output=True,
-    )
-    time.sleep(delay)
-    return True
+    return run_blocking(aio.launch_app(app_name, device_id, delay))
 
 
-def _get_adb_prefix(device_id: str | None) -> list:
-    """Get ADB command prefix with optional device specifier."""
-    if device_id:
-        return ["adb", "-s", device_id]
-    return ["adb"]
+def press_keys(keycodes: list[str | int], device_id: str | None = None) -> None:
+    """
+    Press a sequence of keys in a single adb call.
+
+    Args:
+        keycodes: Android key codes, as names ("KEYCODE_ENTER") or numbers (66).
+        device_id: Optional ADB device ID.
+    """
+    run_blocking(aio.press_keys(keycodes, device_id))
@@ -1,8 +1,8 @@
 """Input utilities for Android device text input."""
 
-import base64
-import subprocess
-from typing import Optional
+from phone_agent.adb import aio
+from phone_agent.adb.aio import ADB_KEYBOARD_IME
+from phone_agent.command_runner import run_blocking
 
 
 def type_text(text: str, device_id: str | None = None) -> None:
@@ -17,24 +17,7 @@ def type_text(text: str, device_id: str | None = None) -> None:
         Requires ADB Keyboard to be installed on the device.
         See: https://github.com/nicnocquee/AdbKeyboard
     """
-    adb_prefix = _get_adb_prefix(device_id)
-    encoded_text = base64.b64encode(text.encode("utf-8")).decode("utf-8")
-
-    subprocess.run(
-        adb_prefix
-        + [
-            "shell",
-            "am",
-            "broadcast",
-            "-a",
-            "ADB_INPUT_B64",
-            "--es",
-            "msg",
-            encoded_text,
-        ],
-        capture_output=True,
-        text=True,
-    )
+    run_blocking(aio.type_text(text, device_id))
 
 
 def clear_text(device_id: str | None = None) -> None:
@@ -44,13 +27,7 @@ def clear_text(device_id: str | None = None) -> None:
     Args:
         device_id: Optional ADB device ID for multi-device setups.
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "am", "broadcast", "-a", "ADB_CLEAR_TEXT"],
-        capture_output=True,
-        text=True,
-    )
+    run_blocking(aio.clear_text(device_id))
 
 
 def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
@@ -63,47 +40,49 @@ def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
     Returns:
         The original keyboard IME identifier for later restoration.
     """
-    adb_prefix = _get_adb_prefix(device_id)
+    return run_blocking(aio.detect_and_set_adb_keyboard(device_id))
 
-    # Get current IME
-    result = subprocess.run(
-        adb_prefix + ["shell", "settings", "get", "secure", "default_input_method"],
-        capture_output=True,
-        text=True,
-    )
-    current_ime = (result.stdout + result.stderr).strip()
 
-    # Switch to ADB Keyboard if not already set
-    if "com.android.adbkeyboard/.AdbIME" not in current_ime:
-        subprocess.run(
-            adb_prefix + ["shell", "ime", "set", "com.android.adbkeyboard/.AdbIME"],
-            capture_output=True,
-            text=True,
-        )
+def get_current_ime(device_id: str | None = None) -> str:
+    """
+    Get the currently selected input method.
 
-    # Warm up the keyboard
-    type_text("", device_id)
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
 
-    return current_ime
+    Returns:
+        The IME identifier reported by ``default_input_method``.
+    """
+    return run_blocking(aio.get_current_ime(device_id))
 
 
-def restore_keyboard(ime: str, device_id: str | None = None) -> None:
+def wait_for_ime(
+    ime: str,
+    device_id: str | None = None,
+    timeout: float | None = None,
+    poll_interval: float | None = None,
+) -> bool:
     """
-    Restore the original keyboard IME.
+    Wait until the given IME is reported as the selected input method.
 
     Args:
-        ime: The IME identifier to restore.
+        ime: The IME identifier to wait for.
         device_id: Optional ADB device ID for multi-device setups.
+        timeout: Maximum time to wait in seconds. If None, uses configured default.
+        poll_interval: Time between checks in seconds. If None, uses configured default.
+
+    Returns:
+        True if the IME became active within the timeout, False otherwise.
     """
-    adb_prefix = _get_adb_prefix(device_id)
+    return run_blocking(aio.wait_for_ime(ime, device_id, timeout, poll_interval))
 
-    subprocess.run(
-        adb_prefix + ["shell", "ime", "set", ime], capture_output=True, text=True
-    )
 
+def restore_keyboard(ime: str, device_id: str | None = None) -> None:
+    """
+    Restore the original keyboard IME.
 
-def _get_adb_prefix(device_id: str | None) -> list:
-    """Get ADB command prefix with optional device specifier."""
-    if device_id:
-        return ["adb", "-s", device_id]
-    return ["adb"]
+    Args:
+        ime: The IME identifier to restore.
+        device_id: Optional ADB device ID for multi-device setups.
+    """
+    run_blocking(aio.restore_keyboard(ime, device_id))
@@ -0,0 +1,340 @@
+"""Keepalive watchdog for remote (WiFi) ADB devices.
+
+WiFi connections drop silently: adb keeps listing the device as offline (or
+not at all) and every command fails until someone runs ``adb connect``
+again. The watchdog probes each watched device in a background thread,
+reconnects with exponential backoff when a probe fails, and lets callers
+block until the device is back instead of failing.
+
+Example:
+    >>> from phone_agent.adb.watchdog import get_connection_watchdog
+    >>> watchdog = get_connection_watchdog()
+    >>> watchdog.watch("192.168.1.100:5555")
+    >>> watchdog.wait_until_online("192.168.1.100:5555")
+    True
+    >>> watchdog.get_metrics()["192.168.1.100:5555"]["reconnects"]
+    0
+"""
+
+import random
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+
+from phone_agent.adb.connection import ADBConnection
+from phone_agent.command_runner import run_command
+from phone_agent.config.timing import TIMING_CONFIG
+
+# Timeout for a single liveness probe (seconds)
+_PROBE_TIMEOUT = 5.0
+
+_REMOTE_ADDRESS = re.compile(r"^[\w.\-]+:\d+$")
+
+
+def is_remote_address(device_id: str | None) -> bool:
+    """
+    Check whether a device ID is a TCP/IP address such as "192.168.1.100:5555".
+
+    Args:
+        device_id: ADB device ID.
+
+    Returns:
+        True for host:port device IDs, False for USB serials and None.
+    """
+    return bool(device_id) and bool(_REMOTE_ADDRESS.match(device_id))
+
+
+@dataclass
+class _DeviceState:
+    online: threading.Event = field(default_factory=threading.Event)
+    # Set by watch(), which also marks the device online
+    watching: bool = False
+    next_check: float = 0.0
+    backoff: float = 0.0
+    down_since: float | None = None
+    probes: int = 0
+    failed_probes: int = 0
+    reconnect_attempts: int = 0
+    reconnects: int = 0
+    total_downtime: float = 0.0
+    last_error: str = ""
+
+
+class ConnectionWatchdog:
+    """
+    Background keepalive and reconnect loop for remote ADB devices.
+
+    Args:
+        adb_path: Path to ADB executable.
+        interval: Time between probes of an online device in seconds.
+            If None, uses configured default.
+
+    Example:
+        >>> watchdog = ConnectionWatchdog()
+        >>> watchdog.watch("192.168.1.100:5555")  # Starts the thread
+        >>> watchdog.unwatch("192.168.1.100:5555")
+        >>> watchdog.stop()
+    """
+
+    def __init__(self, adb_path: str = "adb", interval: float | None = None):
+        self.adb_path = adb_path
+        self.interval = interval
+        self._devices: dict[str, _DeviceState] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def watch(self, address: str) -> None:
+        """
+        Start watching a remote device.
+
+        The device is assumed online until the first probe says otherwise.
+
+        Args:
+            address: Device address in format "host:port".
+        """
+        with self._lock:
+            state = self._devices.get(address)
+            if state is None:
+                state = self._devices[address] = _DeviceState()
+            if not state.watching:
+                state.watching = True
+                state.backoff = 0.0
+                state.next_check = 0.0
+                state.online.set()
+        self.start()
+        self._wakeup.set()
+
+    def unwatch(self, address: str | None = None) -> None:
+        """
+        Stop watching a device. Its metrics are kept.
+
+        Args:
+            address: Device address. If None, stops watching all devices.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if address is None:
+                states = list(self._devices.values())
+            else:
+                states = [s for s in [self._devices.get(address)] if s]
+            for state in states:
+                state.watching = False
+                if state.down_since is not None:
+                    state.total_downtime += now - state.down_since
+                    state.down_since = None
+                # Release anyone still waiting on a device that is no longer watched
+                state.online.set()
+
+    def is_watching(self, address: str | None) -> bool:
+        """Whether the given device is watched."""
+        with self._lock:
+            state = self._devices.get(address)
+            return state is not None and state.watching
+
+    def wait_until_online(
+        self, address: str | None, timeout: float | None = None
+    ) -> bool:
+        """
+        Block while a watched device is being reconnected.
+
+        Returns immediately for devices that are online or not watched.
+
+        Args:
+            address: Device address.
+            timeout: Maximum time to wait in seconds. If None, uses configured default.
+
+        Returns:
+            True if the device is online (or not watched), False on timeout.
+        """
+        with self._lock:
+            state = self._devices.get(address)
+        if state is None or not state.watching or state.online.is_set():
+            return True
+
+        if timeout is None:
+            timeout = TIMING_CONFIG.connection.reconnect_wait_timeout
+        print(f"Device {address} is offline, waiting for reconnection...")
+        # Reconnect right away instead of waiting for the backoff timer
+        with self._lock:
+            state.next_check = 0.0
+        self._wakeup.set()
+        return state.online.wait(timeout)
+
+    def get_metrics(self) -> dict[str, dict]:
+        """
+        Get per-device reconnect metrics.
+
+        Returns:
+            Dictionary keyed by device address with online state, probe and
+            reconnect counters and downtime in seconds.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                address: {
+                    "watching": state.watching,
+                    "online": state.online.is_set(),
+                    "probes": state.probes,
+                    "failed_probes": state.failed_probes,
+                    "reconnect_attempts": state.reconnect_attempts,
+                    "reconnects": state.reconnects,
+                    "total_downtime": round(
+                        state.total_downtime
+                        + (now - state.down_since if state.down_since else 0.0),
+                        3,
+                    ),
+                    "current_downtime": round(now - state.down_since, 3)
+                    if state.down_since
+                    else 0.0,
+                    "last_error": state.last_error,
+                }
+                for address, state in self._devices.items()
+            }
+
+    def start(self) -> None:
+        """Start the background thread if it is not running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="adb-watchdog", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=_PROBE_TIMEOUT)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            now = time.monotonic()
+            with self._lock:
+                watched = {a: s for a, s in self._devices.items() if s.watching}
+                due = [a for a, s in watched.items() if s.next_check <= now]
+                upcoming = [s.next_check for s in watched.values()]
+
+            for address in due:
+                if self._stopped.is_set():
+                    return
+                self._check(address)
+
+            if not due:
+                wait = min(upcoming) - now if upcoming else None
+                self._wakeup.wait(wait)
+                self._wakeup.clear()
+
+    def _check(self, address: str) -> None:
+        """Probe one device and reconnect it if it is offline."""
+        interval = self.interval or TIMING_CONFIG.connection.keepalive_interval
+
+        with self._lock:
+            state = self._devices.get(address)
+        if state is None or not state.watching:
+            return
+
+        online = self._probe(address)
+        if not online and state.down_since is not None:
+            # Already known offline: this probe is a reconnect attempt
+            online = self._reconnect(address, state)
+
+        with self._lock:
+            if not state.watching:
+                return
+            state.probes += 1
+            now = time.monotonic()
+            if online:
+                if state.down_since is not None:
+                    state.total_downtime += now - state.down_since
+                    state.reconnects += 1
+                    state.down_since = None
+                    print(f"Device {address} reconnected")
+                state.backoff = 0.0
+                state.next_check = now + interval
+                state.online.set()
+            else:
+                state.failed_probes += 1
+                if state.down_since is None:
+                    state.down_since = now
+                    print(f"Device {address} went offline, reconnecting...")
+                    # First reconnect attempt immediately
+                    state.next_check = now
+                else:
+                    state.backoff = min(
+                        max(
+                            state.backoff * 2,
+                            TIMING_CONFIG.connection.reconnect_backoff_initial,
+                        ),
+                        TIMING_CONFIG.connection.reconnect_backoff_max,
+                    )
+                    # Jitter avoids synchronised retries across devices
+                    state.next_check = now + state.backoff * random.uniform(0.8, 1.2)
+                state.online.clear()
+
+    def _probe(self, address: str) -> bool:
+        """Check whether adb reports the device as online."""
+        try:
+            result = run_command(
+                [self.adb_path, "-s", address, "get-state"],
+                timeout=_PROBE_TIMEOUT,
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            self._set_error(address, str(e))
+            return False
+
+        if result.returncode == 0 and result.stdout.strip() == "device":
+            return True
+        self._set_error(address, (result.stdout + result.stderr).strip())
+        return False
+
+    def _reconnect(self, address: str, state: _DeviceState) -> bool:
+        """Drop the stale transport and connect again."""
+        with self._lock:
+            state.reconnect_attempts += 1
+
+        conn = ADBConnection(self.adb_path)
+        # A stale "offline" entry makes adb answer "already connected"
+        conn.disconnect(address)
+        success, message = conn.connect(address, timeout=int(_PROBE_TIMEOUT))
+        if not success:
+            self._set_error(address, message)
+            return False
+        return self._probe(address)
+
+    def _set_error(self, address: str, error: str) -> None:
+        with self._lock:
+            state = self._devices.get(address)
+            if state is not None:
+                state.last_error = error
+
+
+# Global watchdog instance
+_watchdog: ConnectionWatchdog | None = None
+
+
+def get_connection_watchdog(adb_path: str = "adb") -> ConnectionWatchdog:
+    """
+    Get the global connection watchdog.
+
+    Args:
+        adb_path: Path to ADB executable, used when the watchdog is created.
+
+    Returns:
+        The ConnectionWatchdog instance.
+    """
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = ConnectionWatchdog(adb_path)
+    return _watchdog
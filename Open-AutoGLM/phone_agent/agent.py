@@ -1,16 +1,30 @@
 """Main PhoneAgent class for orchestrating phone automation."""
 
 import json
+import subprocess
+import time
 import traceback
 from dataclasses import dataclass
 from typing import Any, Callable
 
 from phone_agent.actions import ActionHandler
 from phone_agent.actions.handler import do, finish, parse_action
-from phone_agent.config import get_messages, get_system_prompt
-from phone_agent.device_factory import get_device_factory
+from phone_agent.adb.watchdog import get_connection_watchdog, is_remote_address
+from phone_agent.capabilities import get_capability_cache
+from phone_agent.command_runner import (
+    CancellationToken,
+    CommandCancelledError,
+    Deadline,
+    command_scope,
+)
+from phone_agent.config import get_date_line, get_messages, get_system_prompt
+from phone_agent.config.timing_profiles import get_profile_store
+from phone_agent.context import ConversationContext
+from phone_agent.device_factory import DeviceType, get_device_factory
 from phone_agent.model import ModelClient, ModelConfig
+from phone_agent.model.async_client import request_labels
 from phone_agent.model.client import MessageBuilder
+from phone_agent.ui_hierarchy import UIStateTracker, dump_hierarchy
 
 
 @dataclass
@@ -22,10 +36,25 @@ class AgentConfig:
     lang: str = "cn"
     system_prompt: str | None = None
     verbose: bool = True
+    # Overall deadline in seconds for the device commands of one step
+    # (screen capture and action execution, model inference excluded)
+    step_timeout: float | None = 60.0
+    # Diff the UI hierarchy between steps; reuse the previous screenshot when
+    # nothing changed and tell the model what did
+    ui_diff: bool = False
+    # Estimated prompt tokens above which old steps are folded into a compact
+    # action log (None keeps the full history)
+    context_token_budget: int | None = None
+    # Most recent steps always kept verbatim
+    context_keep_turns: int = 4
+    # Keep the message prefix byte-stable for server-side prefix caching: the
+    # system prompt has no date (it is sent with the task instead) and old
+    # steps are compacted in batches
+    stable_prefix: bool = False
 
     def __post_init__(self):
         if self.system_prompt is None:
-            self.system_prompt = get_system_prompt(self.lang)
+            self.system_prompt = get_system_prompt(self.lang, stable=self.stable_prefix)
 
 
 @dataclass
@@ -37,6 +66,9 @@ class StepResult:
     action: dict[str, Any] | None
     thinking: str
     message: str | None = None
+    # Failed model requests retried in this step and the time they cost
+    model_retries: int = 0
+    model_retry_time: float = 0.0
 
 
 class PhoneAgent:
@@ -78,8 +110,25 @@ class PhoneAgent:
             takeover_callback=takeover_callback,
         )
 
-        self._context: list[dict[str, Any]] = []
+        self._context = ConversationContext(
+            token_budget=self.agent_config.context_token_budget,
+            keep_turns=self.agent_config.context_keep_turns,
+            stable_prefix=self.agent_config.stable_prefix,
+        )
         self._step_count = 0
+        self._cancel_token = CancellationToken()
+        self._watched_device: str | None = None
+        self._ui_tracker = UIStateTracker()
+        self._last_capture = None
+
+    def cancel(self) -> None:
+        """
+        Cancel the running task.
+
+        Safe to call from another thread. In-flight device commands are
+        killed and run() returns after the current step.
+        """
+        self._cancel_token.cancel()
 
     def run(self, task: str) -> str:
         """
@@ -91,23 +140,53 @@ class PhoneAgent:
         Returns:
             Final message from the agent.
         """
-        self._context = []
+        self._context.reset()
         self._step_count = 0
+        self._cancel_token = CancellationToken()
+        self._ui_tracker.reset()
+        self._last_capture = None
+
+        # Fill the capability cache on first use of the device
+        device_type = get_device_factory().device_type
+        caps = get_capability_cache().get(
+            self.agent_config.device_id, device_type.value
+        )
 
-        # First step with user prompt
-        result = self._execute_step(task, is_first=True)
+        # Calibrated delays are keyed by serial; map device_id=None calls to it
+        serial = self.agent_config.device_id or (caps.device_id if caps else None)
+        if self.agent_config.device_id is None:
+            get_profile_store().set_default_device(serial)
 
-        if result.finished:
-            return result.message or "Task completed"
+        # Keep WiFi devices connected for the duration of the task
+        if device_type == DeviceType.ADB and is_remote_address(serial):
+            get_connection_watchdog().watch(serial)
+            self._watched_device = serial
 
-        # Continue until finished or max steps reached
-        while self._step_count < self.agent_config.max_steps:
-            result = self._execute_step(is_first=False)
+        try:
+            # First step with user prompt
+            result = self._execute_step(task, is_first=True)
 
             if result.finished:
                 return result.message or "Task completed"
 
-        return "Max steps reached"
+            # Continue until finished or max steps reached
+            while self._step_count < self.agent_config.max_steps:
+                if self._cancel_token.cancelled:
+                    return "Task cancelled"
+
+                result = self._execute_step(is_first=False)
+
+                if result.finished:
+                    return result.message or "Task completed"
+
+            return "Max steps reached"
+        except CommandCancelledError:
+            return "Task cancelled"
+        finally:
+            self.action_handler.end_task()
+            if self._watched_device is not None:
+                get_connection_watchdog().unwatch(self._watched_device)
+                self._watched_device = None
 
     def step(self, task: str | None = None) -> StepResult:
         """
@@ -130,8 +209,11 @@ class PhoneAgent:
 
     def reset(self) -> None:
         """Reset the agent state for a new task."""
-        self._context = []
+        self.action_handler.end_task()
+        self._context.reset()
         self._step_count = 0
+        self._ui_tracker.reset()
+        self._last_capture = None
 
     def _execute_step(
         self, user_prompt: str | None = None, is_first: bool = False
@@ -139,33 +221,93 @@ class PhoneAgent:
         """Execute a single step of the agent loop."""
         self._step_count += 1
 
+        # Pause rather than fail while a dropped WiFi device is reconnected
+        if self._watched_device is not None:
+            if not get_connection_watchdog().wait_until_online(self._watched_device):
+                print(f"Warning: device {self._watched_device} is still offline")
+
+        # All device commands of this step share one deadline and the task's
+        # cancellation token
+        deadline = Deadline(self.agent_config.step_timeout)
+
         # Capture current screen state
         device_factory = get_device_factory()
-        screenshot = device_factory.get_screenshot(self.agent_config.device_id)
-        current_app = device_factory.get_current_app(self.agent_config.device_id)
+        with command_scope(deadline=deadline, token=self._cancel_token):
+            ui_diff = None
+            if self.agent_config.ui_diff:
+                ui_diff = self._ui_tracker.update(
+                    dump_hierarchy(
+                        self.agent_config.device_id, device_factory.device_type
+                    )
+                )
+
+            if ui_diff is not None and not ui_diff.changed and self._last_capture:
+                # The last action had no effect, the previous capture still holds
+                screenshot, current_app = self._last_capture
+            else:
+                try:
+                    screenshot = device_factory.get_screenshot(
+                        self.agent_config.device_id
+                    )
+                except subprocess.TimeoutExpired:
+                    return StepResult(
+                        success=False,
+                        finished=True,
+                        action=None,
+                        thinking="",
+                        message="Device error: timed out capturing the screen",
+                    )
+                except CommandCancelledError:
+                    return StepResult(
+                        success=False,
+                        finished=True,
+                        action=None,
+                        thinking="",
+                        message="Task cancelled",
+                    )
+                try:
+                    current_app = device_factory.get_current_app(
+                        self.agent_config.device_id
+                    )
+                except subprocess.TimeoutExpired:
+                    print("Warning: timed out getting current app")
+                    current_app = "System Home"
+                self._last_capture = (screenshot, current_app)
+                # A fresh capture may show another app
+                self.action_handler.ime_session.check_foreground()
+
+        if ui_diff is not None and self.agent_config.verbose:
+            print(ui_diff.summary())
 
         # Build messages
         if is_first:
-            self._context.append(
+            self._context.set_system(
                 MessageBuilder.create_system_message(self.agent_config.system_prompt)
             )
 
+            task = user_prompt
+            if self.agent_config.stable_prefix:
+                task = f"{get_date_line(self.agent_config.lang)}\n{user_prompt}"
             screen_info = MessageBuilder.build_screen_info(current_app)
-            text_content = f"{user_prompt}\n\n{screen_info}"
+            text_content = f"{task}\n\n{screen_info}"
 
-            self._context.append(
+            self._context.add_user(
                 MessageBuilder.create_user_message(
                     text=text_content, image_base64=screenshot.base64_data
-                )
+                ),
+                app=current_app,
+                task=task,
             )
         else:
-            screen_info = MessageBuilder.build_screen_info(current_app)
+            extra_info = {"ui_change": ui_diff.summary()} if ui_diff is not None else {}
+            screen_info = MessageBuilder.build_screen_info(current_app, **extra_info)
             text_content = f"** Screen Info **\n\n{screen_info}"
 
-            self._context.append(
+            self._context.add_user(
                 MessageBuilder.create_user_message(
                     text=text_content, image_base64=screenshot.base64_data
-                )
+                ),
+                app=current_app,
             )
 
         # Get model response
@@ -174,7 +316,17 @@ class PhoneAgent:
             print("\n" + "=" * 50)
             print(f"💭 {msgs['thinking']}:")
             print("-" * 50)
-            response = self.model_client.request(self._context)
+            inference_start = time.monotonic()
+            # Whether the last action changed the screen, for the model cascade
+            screen_changed = ui_diff.changed if ui_diff is not None else None
+            with request_labels(
+                step=self._step_count,
+                device=self.agent_config.device_id,
+                screen_changed=screen_changed,
+            ):
+                response = self.model_client.request(self._context.messages)
+            # Model inference does not count against the device deadline
+            deadline.extend(time.monotonic() - inference_start)
         except Exception as e:
             if self.agent_config.verbose:
                 traceback.print_exc()
@@ -202,12 +354,21 @@ class PhoneAgent:
             print("=" * 50 + "\n")
 
         # Remove image from context to save space
-        self._context[-1] = MessageBuilder.remove_images_from_message(self._context[-1])
+        self._context.strip_images()
 
         # Execute action
         try:
-            result = self.action_handler.execute(
-                action, screenshot.width, screenshot.height
+            with command_scope(deadline=deadline, token=self._cancel_token):
+                result = self.action_handler.execute(
+                    action, screenshot.width, screenshot.height
+                )
+        except CommandCancelledError:
+            return StepResult(
+                success=False,
+                finished=True,
+                action=action,
+                thinking=response.thinking,
+                message="Task cancelled",
             )
         except Exception as e:
             if self.agent_config.verbose:
@@ -217,10 +378,13 @@ class PhoneAgent:
             )
 
         # Add assistant response to context
-        self._context.append(
+        self._context.add_assistant(
             MessageBuilder.create_assistant_message(
                 f"<think>{response.thinking}</think><answer>{response.action}</answer>"
-            )
+            ),
+            action=response.action,
+            success=result.success,
+            detail=result.message,
         )
 
         # Check if finished
@@ -240,12 +404,14 @@ class PhoneAgent:
             action=action,
             thinking=response.thinking,
             message=result.message or action.get("message"),
+            model_retries=response.retries,
+            model_retry_time=response.retry_time,
         )
 
     @property
     def context(self) -> list[dict[str, Any]]:
         """Get the current conversation context."""
-        return self._context.copy()
+        return self._context.messages
 
     @property
     def step_count(self) -> int:
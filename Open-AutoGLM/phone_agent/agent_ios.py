@@ -7,10 +7,18 @@ from typing import Any, Callable
 
 from phone_agent.actions.handler import do, finish, parse_action
 from phone_agent.actions.handler_ios import IOSActionHandler
-from phone_agent.config import get_messages, get_system_prompt
+from phone_agent.config import get_date_line, get_messages, get_system_prompt
+from phone_agent.context import ConversationContext
 from phone_agent.model import ModelClient, ModelConfig
+from phone_agent.model.async_client import request_labels
 from phone_agent.model.client import MessageBuilder
-from phone_agent.xctest import XCTestConnection, get_current_app, get_screenshot
+from phone_agent.ui_hierarchy import UIStateTracker, dump_ios_hierarchy
+from phone_agent.xctest import (
+    XCTestConnection,
+    get_current_app,
+    get_screenshot,
+    get_wda_session,
+)
 
 
 @dataclass
@@ -24,10 +32,22 @@ class IOSAgentConfig:
     lang: str = "cn"
     system_prompt: str | None = None
     verbose: bool = True
+    # Diff the UI hierarchy between steps; reuse the previous screenshot when
+    # nothing changed and tell the model what did
+    ui_diff: bool = False
+    # Estimated prompt tokens above which old steps are folded into a compact
+    # action log (None keeps the full history)
+    context_token_budget: int | None = None
+    # Most recent steps always kept verbatim
+    context_keep_turns: int = 4
+    # Keep the message prefix byte-stable for server-side prefix caching: the
+    # system prompt has no date (it is sent with the task instead) and old
+    # steps are compacted in batches
+    stable_prefix: bool = False
 
     def __post_init__(self):
         if self.system_prompt is None:
-            self.system_prompt = get_system_prompt(self.lang)
+            self.system_prompt = get_system_prompt(self.lang, stable=self.stable_prefix)
 
 
 @dataclass
@@ -39,6 +59,9 @@ class StepResult:
     action: dict[str, Any] | None
     thinking: str
     message: str | None = None
+    # Failed model requests retried in this step and the time they cost
+    model_retries: int = 0
+    model_retry_time: float = 0.0
 
 
 class IOSPhoneAgent:
@@ -76,13 +99,16 @@ class IOSPhoneAgent:
 
         self.model_client = ModelClient(self.model_config)
 
-        # Initialize WDA connection and create session if needed
+        # Initialize WDA connection and the session shared by all WDA calls
         self.wda_connection = XCTestConnection(wda_url=self.agent_config.wda_url)
+        self.wda_session = get_wda_session(
+            self.agent_config.wda_url, self.agent_config.session_id
+        )
 
         # Auto-create session if not provided
         if self.agent_config.session_id is None:
-            success, session_id = self.wda_connection.start_wda_session()
-            if success and session_id != "session_started":
+            session_id = self.wda_session.ensure()
+            if session_id:
                 self.agent_config.session_id = session_id
                 if self.agent_config.verbose:
                     print(f"✅ Created WDA session: {session_id}")
@@ -96,8 +122,14 @@ class IOSPhoneAgent:
             takeover_callback=takeover_callback,
         )
 
-        self._context: list[dict[str, Any]] = []
+        self._context = ConversationContext(
+            token_budget=self.agent_config.context_token_budget,
+            keep_turns=self.agent_config.context_keep_turns,
+            stable_prefix=self.agent_config.stable_prefix,
+        )
         self._step_count = 0
+        self._ui_tracker = UIStateTracker()
+        self._last_capture = None
 
     def run(self, task: str) -> str:
         """
@@ -109,8 +141,10 @@ class IOSPhoneAgent:
         Returns:
             Final message from the agent.
         """
-        self._context = []
+        self._context.reset()
         self._step_count = 0
+        self._ui_tracker.reset()
+        self._last_capture = None
 
         # First step with user prompt
         result = self._execute_step(task, is_first=True)
@@ -148,8 +182,10 @@ class IOSPhoneAgent:
 
     def reset(self) -> None:
         """Reset the agent state for a new task."""
-        self._context = []
+        self._context.reset()
         self._step_count = 0
+        self._ui_tracker.reset()
+        self._last_capture = None
 
     def _execute_step(
         self, user_prompt: str | None = None, is_first: bool = False
@@ -158,42 +194,73 @@ class IOSPhoneAgent:
         self._step_count += 1
 
         # Capture current screen state
-        screenshot = get_screenshot(
-            wda_url=self.agent_config.wda_url,
-            session_id=self.agent_config.session_id,
-            device_id=self.agent_config.device_id,
-        )
-        current_app = get_current_app(
-            wda_url=self.agent_config.wda_url, session_id=self.agent_config.session_id
-        )
+        ui_diff = None
+        if self.agent_config.ui_diff:
+            ui_diff = self._ui_tracker.update(
+                dump_ios_hierarchy(
+                    self.agent_config.wda_url, self.agent_config.session_id
+                )
+            )
+
+        if ui_diff is not None and not ui_diff.changed and self._last_capture:
+            # The last action had no effect, the previous capture still holds
+            screenshot, current_app = self._last_capture
+        else:
+            screenshot = get_screenshot(
+                wda_url=self.agent_config.wda_url,
+                session_id=self.agent_config.session_id,
+                device_id=self.agent_config.device_id,
+            )
+            current_app = get_current_app(
+                wda_url=self.agent_config.wda_url,
+                session_id=self.agent_config.session_id,
+            )
+            self._last_capture = (screenshot, current_app)
+
+        if ui_diff is not None and self.agent_config.verbose:
+            print(ui_diff.summary())
 
         # Build messages
         if is_first:
-            self._context.append(
+            self._context.set_system(
                 MessageBuilder.create_system_message(self.agent_config.system_prompt)
             )
 
+            task = user_prompt
+            if self.agent_config.stable_prefix:
+                task = f"{get_date_line(self.agent_config.lang)}\n{user_prompt}"
             screen_info = MessageBuilder.build_screen_info(current_app)
-            text_content = f"{user_prompt}\n\n{screen_info}"
+            text_content = f"{task}\n\n{screen_info}"
 
-            self._context.append(
+            self._context.add_user(
                 MessageBuilder.create_user_message(
                     text=text_content, image_base64=screenshot.base64_data
-                )
+                ),
+                app=current_app,
+                task=task,
             )
         else:
-            screen_info = MessageBuilder.build_screen_info(current_app)
+            extra_info = {"ui_change": ui_diff.summary()} if ui_diff is not None else {}
+            screen_info = MessageBuilder.build_screen_info(current_app, **extra_info)
             text_content = f"** Screen Info **\n\n{screen_info}"
 
-            self._context.append(
+            self._context.add_user(
                 MessageBuilder.create_user_message(
                     text=text_content, image_base64=screenshot.base64_data
-                )
+                ),
+                app=current_app,
             )
 
         # Get model response
         try:
-            response = self.model_client.request(self._context)
+            # Whether the last action changed the screen, for the model cascade
+            screen_changed = ui_diff.changed if ui_diff is not None else None
+            with request_labels(
+                step=self._step_count,
+                device=self.agent_config.device_id,
+                screen_changed=screen_changed,
+            ):
+                response = self.model_client.request(self._context.messages)
         except Exception as e:
             if self.agent_config.verbose:
                 traceback.print_exc()
@@ -226,7 +293,7 @@ class IOSPhoneAgent:
             print("=" * 50 + "\n")
 
         # Remove image from context to save space
-        self._context[-1] = MessageBuilder.remove_images_from_message(self._context[-1])
+        self._context.strip_images()
 
         # Execute action
         try:
@@ -241,10 +308,13 @@ class IOSPhoneAgent:
             )
 
         # Add assistant response to context
-        self._context.append(
+        self._context.add_assistant(
             MessageBuilder.create_assistant_message(
                 f"<think>{response.thinking}</think><answer>{response.action}</answer>"
-            )
+            ),
+            action=response.action,
+            success=result.success,
+            detail=result.message,
         )
 
         # Check if finished
@@ -264,12 +334,14 @@ class IOSPhoneAgent:
             action=action,
             thinking=response.thinking,
             message=result.message or action.get("message"),
+            model_retries=response.retries,
+            model_retry_time=response.retry_time,
         )
 
     @property
     def context(self) -> list[dict[str, Any]]:
         """Get the current conversation context."""
-        return self._context.copy()
+        return self._context.messages
 
     @property
     def step_count(self) -> int:
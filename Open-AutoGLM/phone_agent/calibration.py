@@ -0,0 +1,312 @@
+"""Measure how quickly a device reacts to actions and store a timing profile.
+
+The global delays in ``config/timing.py`` have to be conservative enough for
+the slowest device. Calibration drives the device through a short, harmless
+sequence (open Settings, tap an entry, go back, scroll, go home, switch the
+keyboard), watches the screen until it stops changing after each action and
+derives per-device delays from the measured settle times. The result is saved
+as a ``TimingProfile`` that ``get_timing_config(device_id)`` applies
+automatically.
+
+Example:
+    >>> from phone_agent.calibration import calibrate_device
+    >>> profile = calibrate_device("emulator-5554")
+    >>> profile.tap_delay
+    0.42
+"""
+
+import base64
+import statistics
+import time
+from io import BytesIO
+from typing import Callable
+
+from PIL import Image, ImageChops, ImageStat
+
+from phone_agent.command_runner import run_command
+from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.config.timing_profiles import TimingProfile, get_profile_store
+from phone_agent.device_factory import DeviceFactory, DeviceType
+
+# Delay = measured settle time * factor, never below the minimum
+_SAFETY_FACTOR = 1.3
+_MIN_DELAY = 0.2
+
+# Longest time to wait for the screen to settle after an action (seconds)
+_SETTLE_TIMEOUT = 5.0
+
+# Consecutive unchanged frames that count as "settled"
+_STABLE_FRAMES = 2
+
+# Mean per-channel difference (0-255) of the thumbnails that counts as a change
+_CHANGE_THRESHOLD = 2.0
+
+# Thumbnail size used for comparing frames
+_THUMBNAIL_SIZE = (72, 160)
+
+# Fraction of the screen height excluded at the top (status bar clock etc.)
+_STATUS_BAR_FRACTION = 0.06
+
+
+def calibrate_device(
+    device_id: str | None = None,
+    device_type: DeviceType = DeviceType.ADB,
+    rounds: int = 3,
+    save: bool = True,
+    verbose: bool = True,
+) -> TimingProfile:
+    """
+    Calibrate the action delays of a device.
+
+    The device should be unlocked. It is left on the home screen.
+
+    Args:
+        device_id: Optional device ID. If None, the single connected device is used.
+        device_type: Device type (ADB or HDC).
+        rounds: Number of times each action is measured. The slowest
+            measurement is used, so delays cover the worst case seen.
+        save: Store the profile in the global profile store.
+        verbose: Print progress and results.
+
+    Returns:
+        The measured TimingProfile.
+    """
+    factory = DeviceFactory(device_type)
+    serial = device_id or _resolve_serial(device_type)
+    width, height = _screen_size(factory, device_id)
+
+    def observe() -> Image.Image:
+        return _frame(factory, device_type, device_id)
+
+    settings = "Settings" if device_type == DeviceType.ADB else "设置"
+    center = (width // 2, height // 2)
+
+    actions: dict[str, Callable[[], None]] = {
+        "launch": lambda: factory.launch_app(settings, device_id, delay=0),
+        "tap": lambda: factory.tap(*center, device_id=device_id, delay=0),
+        "back": lambda: factory.back(device_id, delay=0),
+        "swipe": lambda: factory.swipe(
+            width // 2,
+            int(height * 0.7),
+            width // 2,
+            int(height * 0.3),
+            device_id=device_id,
+            delay=0,
+        ),
+        "home": lambda: factory.home(device_id, delay=0),
+    }
+
+    samples: dict[str, list[float]] = {name: [] for name in actions}
+    samples["keyboard_switch"] = []
+
+    for i in range(rounds):
+        if verbose:
+            print(f"Calibration round {i + 1}/{rounds}...")
+
+        # Start every round from a settled home screen
+        factory.home(device_id)
+        for name in ("launch", "tap", "back", "swipe", "home"):
+            latency = _measure(actions[name], observe)
+            if latency is not None:
+                samples[name].append(latency)
+            # Let trailing animations finish before the next measurement
+            time.sleep(_MIN_DELAY)
+
+        latency = _measure_keyboard_switch(factory, device_id)
+        if latency is not None:
+            samples["keyboard_switch"].append(latency)
+
+    measurements = {
+        name: round(max(values), 3) for name, values in samples.items() if values
+    }
+
+    profile = TimingProfile(
+        device_id=serial or "",
+        device_type=device_type.value,
+        tap_delay=_delay(
+            measurements.get("tap"), TIMING_CONFIG.device.default_tap_delay
+        ),
+        swipe_delay=_delay(
+            measurements.get("swipe"), TIMING_CONFIG.device.default_swipe_delay
+        ),
+        back_delay=_delay(
+            measurements.get("back"), TIMING_CONFIG.device.default_back_delay
+        ),
+        home_delay=_delay(
+            measurements.get("home"), TIMING_CONFIG.device.default_home_delay
+        ),
+        launch_delay=_delay(
+            measurements.get("launch"), TIMING_CONFIG.device.default_launch_delay
+        ),
+        measurements=measurements,
+        calibrated_at=time.time(),
+    )
+    profile.double_tap_delay = profile.tap_delay
+    if "keyboard_switch" in measurements:
+        # Polling stops as soon as the IME is active, so allow a wide margin
+        profile.ime_ready_timeout = round(
+            max(1.0, measurements["keyboard_switch"] * 3), 3
+        )
+
+    if save:
+        if profile.device_id:
+            get_profile_store().set(profile)
+        elif verbose:
+            print("Warning: could not determine the device serial, profile not saved")
+
+    if verbose:
+        print(format_profile(profile))
+
+    return profile
+
+
+def format_profile(profile: TimingProfile) -> str:
+    """
+    Format a timing profile as a table next to the global defaults.
+
+    Args:
+        profile: The profile to format.
+
+    Returns:
+        Multi-line table string.
+    """
+    defaults = TIMING_CONFIG.device
+    rows = [
+        ("tap", profile.tap_delay, defaults.default_tap_delay),
+        ("swipe", profile.swipe_delay, defaults.default_swipe_delay),
+        ("back", profile.back_delay, defaults.default_back_delay),
+        ("home", profile.home_delay, defaults.default_home_delay),
+        ("launch", profile.launch_delay, defaults.default_launch_delay),
+        (
+            "keyboard_switch",
+            profile.ime_ready_timeout,
+            TIMING_CONFIG.action.ime_ready_timeout,
+        ),
+    ]
+    lines = [
+        f"Timing profile for {profile.device_id or 'unknown device'}",
+        f"{'action':<16} {'measured':>9} {'delay':>8} {'default':>8}",
+    ]
+    for name, value, default in rows:
+        measured = profile.measurements.get(name)
+        lines.append(
+            f"{name:<16} "
+            f"{f'{measured:.2f}s' if measured is not None else '-':>9} "
+            f"{f'{value:.2f}s' if value is not None else '-':>8} "
+            f"{default:>7.2f}s"
+        )
+    return "\n".join(lines)
+
+
+def _delay(measured: float | None, default: float) -> float | None:
+    """Turn a measured settle time into a delay, capped at twice the default."""
+    if measured is None:
+        return None
+    return round(min(max(_MIN_DELAY, measured * _SAFETY_FACTOR), default * 2), 3)
+
+
+def _measure(
+    action: Callable[[], None], observe: Callable[[], Image.Image]
+) -> float | None:
+    """
+    Run an action and time how long the screen keeps changing afterwards.
+
+    Returns:
+        Seconds from issuing the action until the last visible change, or
+        None if nothing changed within the settle timeout.
+    """
+    previous = observe()
+    start = time.monotonic()
+    action()
+
+    last_change = None
+    stable = 0
+    while time.monotonic() - start < _SETTLE_TIMEOUT:
+        frame = observe()
+        elapsed = time.monotonic() - start
+        if _differs(frame, previous):
+            last_change = elapsed
+            stable = 0
+        elif last_change is not None:
+            stable += 1
+            if stable >= _STABLE_FRAMES:
+                break
+        previous = frame
+    return last_change
+
+
+def _measure_keyboard_switch(
+    factory: DeviceFactory, device_id: str | None
+) -> float | None:
+    """Time switching to ADB Keyboard and back, or None if not applicable."""
+    if factory.device_type != DeviceType.ADB:
+        return None
+
+    start = time.monotonic()
+    original = factory.detect_and_set_adb_keyboard(device_id)
+    latency = time.monotonic() - start
+    if not original or "adbkeyboard" in original.lower():
+        # Already active, nothing was switched
+        return None
+    factory.restore_keyboard(original, device_id)
+    factory.wait_for_ime(original, device_id)
+    return latency
+
+
+def _differs(a: Image.Image, b: Image.Image) -> bool:
+    """Whether two thumbnails differ noticeably."""
+    if a.size != b.size:
+        return True
+    diff = ImageStat.Stat(ImageChops.difference(a, b)).mean
+    return statistics.fmean(diff) > _CHANGE_THRESHOLD
+
+
+def _frame(
+    factory: DeviceFactory, device_type: DeviceType, device_id: str | None
+) -> Image.Image:
+    """Capture a small thumbnail of the screen below the status bar."""
+    if device_type == DeviceType.ADB:
+        img = _raw_adb_frame(device_id)
+    else:
+        screenshot = factory.get_screenshot(device_id)
+        img = Image.open(BytesIO(base64.b64decode(screenshot.base64_data)))
+
+    img = img.convert("RGB")
+    top = int(img.height * _STATUS_BAR_FRACTION)
+    return img.crop((0, top, img.width, img.height)).resize(_THUMBNAIL_SIZE)
+
+
+def _raw_adb_frame(device_id: str | None) -> Image.Image:
+    """
+    Grab an uncompressed frame over ``adb exec-out screencap``.
+
+    Skipping PNG encoding on the device makes frames several times faster,
+    which keeps the measurement resolution fine.
+    """
+    prefix = ["adb", "-s", device_id] if device_id else ["adb"]
+    data = run_command(
+        prefix + ["exec-out", "screencap"], capture_output=True, timeout=10
+    ).stdout
+    width = int.from_bytes(data[0:4], "little")
+    height = int.from_bytes(data[4:8], "little")
+    # Header is 12 bytes, or 16 with the color space field on Android 8+
+    header = len(data) - width * height * 4
+    if width <= 0 or height <= 0 or header not in (12, 16):
+        raise ValueError("Unexpected screencap output")
+    return Image.frombuffer("RGBA", (width, height), data[header:], "raw", "RGBA", 0, 1)
+
+
+def _screen_size(factory: DeviceFactory, device_id: str | None) -> tuple[int, int]:
+    """Get the screen size in pixels."""
+    screenshot = factory.get_screenshot(device_id)
+    return screenshot.width, screenshot.height
+
+
+def _resolve_serial(device_type: DeviceType) -> str | None:
+    """Get the serial of the single connected device."""
+    devices = [
+        d for d in DeviceFactory(device_type).list_devices() if d.status == "device"
+    ]
+    if len(devices) == 1:
+        return devices[0].device_id
+    return None
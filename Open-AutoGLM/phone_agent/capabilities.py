@@ -0,0 +1,318 @@
+"""Persistent cache of static per-device capabilities.
+
+Screen size, density, SDK level, the enabled IME list and ADB Keyboard
+presence rarely change for a given device, yet they used to be rediscovered
+with fresh ``adb shell`` calls on every check. This module probes them once
+(in a single shell round trip), keeps them in memory and persists them to a
+small JSON store keyed by device serial or UDID. Entries are refreshed after
+a TTL or on explicit invalidation.
+
+The store location and TTL can be configured with the environment variables
+``PHONE_AGENT_CAPABILITY_CACHE`` and ``PHONE_AGENT_CAPABILITY_TTL``.
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+
+from phone_agent.adb.input import ADB_KEYBOARD_IME
+
+DEFAULT_CACHE_PATH = Path.home() / ".phone_agent" / "device_capabilities.json"
+DEFAULT_TTL = 3600.0  # seconds
+
+# Separator echoed between sections of the combined probe command
+_SECTION_MARKER = "__PHONE_AGENT_SECTION__"
+
+
+@dataclass
+class DeviceCapabilities:
+    """Static facts about a device."""
+
+    device_id: str
+    device_type: str = "adb"
+    screen_width: int | None = None
+    screen_height: int | None = None
+    density: int | None = None
+    sdk_level: int | None = None
+    ime_list: list[str] = field(default_factory=list)
+    adb_keyboard_installed: bool = False
+    adb_keyboard_enabled: bool = False
+    updated_at: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DeviceCapabilities":
+        """Build from a dictionary, ignoring unknown keys."""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class CapabilityCache:
+    """
+    Thread-safe capability cache backed by a JSON file.
+
+    Args:
+        path: Path of the JSON store.
+        ttl: Time in seconds after which an entry is probed again.
+
+    Example:
+        >>> cache = CapabilityCache()
+        >>> caps = cache.get("emulator-5554")
+        >>> caps.adb_keyboard_enabled
+        True
+        >>> cache.invalidate("emulator-5554")
+    """
+
+    def __init__(self, path: str | Path | None = None, ttl: float | None = None):
+        if path is None:
+            path = os.getenv("PHONE_AGENT_CAPABILITY_CACHE", DEFAULT_CACHE_PATH)
+        if ttl is None:
+            ttl = float(os.getenv("PHONE_AGENT_CAPABILITY_TTL", DEFAULT_TTL))
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[str, DeviceCapabilities] | None = None
+
+    def get(
+        self,
+        device_id: str | None = None,
+        device_type: str = "adb",
+        adb_path: str = "adb",
+        refresh: bool = False,
+    ) -> DeviceCapabilities | None:
+        """
+        Get capabilities for a device, probing it if needed.
+
+        Args:
+            device_id: Device serial. If None, the single connected device is used.
+            device_type: Device type ("adb", "hdc" or "ios"). Only ADB devices
+                can be probed; other types return whatever was stored via update().
+            adb_path: Path to the ADB executable used for probing.
+            refresh: Force a new probe even if a fresh entry exists.
+
+        Returns:
+            DeviceCapabilities, or None if the device could not be probed.
+        """
+        if device_id is None:
+            if device_type != "adb":
+                return None
+            device_id = _resolve_adb_serial(adb_path)
+            if device_id is None:
+                return None
+
+        if not refresh:
+            caps = self.peek(device_id)
+            if caps is not None and time.time() - caps.updated_at < self.ttl:
+                return caps
+
+        if device_type != "adb":
+            return self.peek(device_id)
+
+        caps = _probe_adb(device_id, adb_path)
+        if caps is None:
+            return None
+
+        with self._lock:
+            self._load()
+            self._entries[device_id] = caps
+            self._save()
+        return caps
+
+    def peek(self, device_id: str | None) -> DeviceCapabilities | None:
+        """
+        Get the stored capabilities for a device without probing.
+
+        Args:
+            device_id: Device serial or UDID.
+
+        Returns:
+            DeviceCapabilities, or None if nothing is stored.
+        """
+        if device_id is None:
+            return None
+        with self._lock:
+            self._load()
+            return self._entries.get(device_id)
+
+    def update(
+        self, device_id: str, device_type: str = "adb", **values
+    ) -> DeviceCapabilities:
+        """
+        Store individual capability values for a device.
+
+        Args:
+            device_id: Device serial or UDID.
+            device_type: Device type ("adb", "hdc" or "ios").
+            **values: DeviceCapabilities fields to set.
+
+        Returns:
+            The updated DeviceCapabilities.
+        """
+        with self._lock:
+            self._load()
+            caps = self._entries.get(device_id) or DeviceCapabilities(
+                device_id=device_id, device_type=device_type
+            )
+            for key, value in values.items():
+                setattr(caps, key, value)
+            caps.updated_at = time.time()
+            self._entries[device_id] = caps
+            self._save()
+            return caps
+
+    def invalidate(self, device_id: str | None = None) -> None:
+        """
+        Drop cached capabilities.
+
+        Args:
+            device_id: Device to invalidate. If None, invalidates all devices.
+        """
+        with self._lock:
+            self._load()
+            if device_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(device_id, None)
+            self._save()
+
+    def _load(self) -> None:
+        """Load the store from disk on first use. Caller must hold the lock."""
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for device_id, entry in data.items():
+                self._entries[device_id] = DeviceCapabilities.from_dict(entry)
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def _save(self) -> None:
+        """Write the store to disk. Caller must hold the lock."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {k: asdict(v) for k, v in self._entries.items()},
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not save capability cache: {e}")
+
+
+def _resolve_adb_serial(adb_path: str = "adb") -> str | None:
+    """Get the serial of the single connected ADB device."""
+    try:
+        result = subprocess.run(
+            [adb_path, "get-serialno"],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=5,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    serial = result.stdout.strip()
+    if result.returncode != 0 or not serial or serial == "unknown":
+        return None
+    return serial
+
+
+def _probe_adb(device_id: str, adb_path: str = "adb") -> DeviceCapabilities | None:
+    """Probe all capabilities of an ADB device in one shell round trip."""
+    probes = [
+        "wm size",
+        "wm density",
+        "getprop ro.build.version.sdk",
+        "ime list -s",
+        "pm path com.android.adbkeyboard",
+    ]
+    # End with `true` so the exit status does not depend on the last probe
+    # (`pm path` fails when ADB Keyboard is not installed)
+    script = f"; echo {_SECTION_MARKER}; ".join(probes) + "; true"
+
+    try:
+        result = subprocess.run(
+            [adb_path, "-s", device_id, "shell", script],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    sections = result.stdout.split(_SECTION_MARKER)
+    if len(sections) != len(probes):
+        return None
+    size_out, density_out, sdk_out, ime_out, pkg_out = (s.strip() for s in sections)
+
+    caps = DeviceCapabilities(device_id=device_id, device_type="adb")
+    caps.screen_width, caps.screen_height = _parse_wm_size(size_out)
+    caps.density = _parse_last_int(density_out)
+    caps.sdk_level = _parse_last_int(sdk_out)
+    caps.ime_list = [line.strip() for line in ime_out.splitlines() if line.strip()]
+    caps.adb_keyboard_installed = "package:" in pkg_out.lower()
+    caps.adb_keyboard_enabled = ADB_KEYBOARD_IME in caps.ime_list
+    if caps.screen_width is None or caps.sdk_level is None:
+        # The shell ran, but the device did not answer the basic probes
+        return None
+    caps.updated_at = time.time()
+    return caps
+
+
+def _parse_wm_size(output: str) -> tuple[int | None, int | None]:
+    """Parse `wm size` output, preferring the override size if present."""
+    size = None
+    for line in output.splitlines():
+        if ":" in line and "x" in line:
+            value = line.split(":", 1)[1].strip()
+            # Override size takes precedence over physical size
+            if size is None or line.lower().startswith("override"):
+                size = value
+    if size:
+        try:
+            width, height = size.split("x", 1)
+            return int(width), int(height)
+        except ValueError:
+            pass
+    return None, None
+
+
+def _parse_last_int(output: str) -> int | None:
+    """Parse the integer at the end of the last output line."""
+    lines = [line for line in output.splitlines() if line.strip()]
+    if not lines:
+        return None
+    try:
+        return int(lines[-1].split(":")[-1].strip())
+    except ValueError:
+        return None
+
+
+# Global capability cache instance
+_capability_cache: CapabilityCache | None = None
+
+
+def get_capability_cache() -> CapabilityCache:
+    """
+    Get the global capability cache instance.
+
+    Returns:
+        The CapabilityCache instance.
+    """
+    global _capability_cache
+    if _capability_cache is None:
+        _capability_cache = CapabilityCache()
+    return _capability_cache
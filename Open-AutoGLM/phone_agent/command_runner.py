@@ -0,0 +1,527 @@
+"""Deadline-aware runner for device commands.
+
+All adb/hdc invocations go through run_command(), which adds:
+
+- a per-call timeout (configurable default, see DeviceTimingConfig.command_timeout)
+- an optional overall deadline shared by every command in a scope, e.g. one agent step
+- cooperative cancellation through a CancellationToken
+- kill-on-timeout of the whole child process tree
+- per command type counters and latency percentiles, plus per device
+  histograms in ``phone_agent.device_metrics``
+
+run_command_async() provides the same guarantees for asyncio callers, and
+run_blocking() lets synchronous code run coroutines built on it.
+
+Example:
+    >>> from phone_agent.command_runner import (
+    ...     CancellationToken, Deadline, command_scope, run_command
+    ... )
+    >>> token = CancellationToken()
+    >>> with command_scope(deadline=Deadline(30), token=token):
+    ...     run_command(["adb", "shell", "input", "tap", "100", "200"])
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass, field
+from typing import Any, Coroutine, Iterator, TypeVar
+
+from phone_agent import device_metrics
+from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.device_metrics import command_labels
+
+# How often a running command checks for cancellation (seconds)
+_POLL_INTERVAL = 0.1
+
+# Number of recent durations kept per command type for percentiles
+_MAX_SAMPLES = 1024
+
+T = TypeVar("T")
+
+
+class CommandCancelledError(RuntimeError):
+    """Raised when a command is cancelled through a CancellationToken."""
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag shared between a controller and workers.
+
+    Example:
+        >>> token = CancellationToken()
+        >>> token.cancel()  # From another thread
+        >>> token.raise_if_cancelled()
+        Traceback (most recent call last):
+        ...
+        CommandCancelledError: Operation cancelled
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """Request cancellation."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation has been requested."""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """Raise CommandCancelledError if cancellation has been requested."""
+        if self._event.is_set():
+            raise CommandCancelledError("Operation cancelled")
+
+
+class Deadline:
+    """
+    An absolute point in time by which work must be finished.
+
+    Args:
+        seconds: Time budget from now in seconds. None means no deadline.
+    """
+
+    def __init__(self, seconds: float | None):
+        self._expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> float | None:
+        """Seconds left before the deadline, or None if unbounded."""
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def extend(self, seconds: float) -> None:
+        """Push the deadline back, e.g. to exclude time spent outside the scope."""
+        if self._expires_at is not None:
+            self._expires_at += seconds
+
+
+@dataclass(frozen=True)
+class _Scope:
+    deadline: Deadline | None = None
+    token: CancellationToken | None = None
+
+
+# A context variable rather than a thread-local, so that scopes are isolated
+# both per thread and per asyncio task
+_scope_var: ContextVar[_Scope] = ContextVar("command_scope", default=_Scope())
+
+
+def _current_scope() -> _Scope:
+    return _scope_var.get()
+
+
+@contextmanager
+def command_scope(
+    deadline: Deadline | None = None, token: CancellationToken | None = None
+) -> Iterator[None]:
+    """
+    Apply a deadline and/or cancellation token to all commands in this context.
+
+    The scope covers the current thread, or the current asyncio task when
+    used from async code.
+
+    Args:
+        deadline: Overall deadline shared by every command in the scope.
+        token: Cancellation token checked by every command in the scope.
+    """
+    previous = _current_scope()
+    reset_token = _scope_var.set(
+        _Scope(deadline=deadline or previous.deadline, token=token or previous.token)
+    )
+    try:
+        yield
+    finally:
+        _scope_var.reset(reset_token)
+
+
+@dataclass
+class _KindStats:
+    count: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    cancellations: int = 0
+    durations: deque = field(default_factory=lambda: deque(maxlen=_MAX_SAMPLES))
+
+
+_stats: dict[str, _KindStats] = {}
+_stats_lock = threading.Lock()
+
+
+def command_kind(cmd: list[str]) -> str:
+    """
+    Derive a command type label used for statistics.
+
+    Examples: "adb shell input", "hdc shell uitest", "adb pull".
+
+    Args:
+        cmd: Command list.
+
+    Returns:
+        Short label identifying the command type.
+    """
+    if not cmd:
+        return "unknown"
+    tool = os.path.splitext(os.path.basename(cmd[0]))[0]
+    args = list(cmd[1:])
+    # Skip device selectors such as "-s <serial>" / "-t <id>"
+    while len(args) >= 2 and args[0] in ("-s", "-t"):
+        args = args[2:]
+    if not args:
+        return tool
+    if args[0] == "shell" and len(args) > 1:
+        return f"{tool} shell {args[1].split()[0]}"
+    return f"{tool} {args[0]}"
+
+
+def _record(cmd: list[str], kind: str, duration: float, outcome: str) -> None:
+    device_metrics.record(*command_labels(cmd), duration, ok=outcome == "ok")
+    with _stats_lock:
+        stats = _stats.setdefault(kind, _KindStats())
+        stats.count += 1
+        stats.durations.append(duration)
+        if outcome == "timeout":
+            stats.timeouts += 1
+        elif outcome == "cancelled":
+            stats.cancellations += 1
+        elif outcome == "failed":
+            stats.failures += 1
+
+
+def _kill_process_tree(process: subprocess.Popen | asyncio.subprocess.Process) -> None:
+    """Kill a process and all of its children."""
+    try:
+        if os.name == "nt":
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                capture_output=True,
+                timeout=5,
+            )
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except Exception:
+        pass
+    try:
+        process.kill()
+    except Exception:
+        pass
+
+
+def _resolve_timeout(timeout: float | None, scope: _Scope) -> float:
+    """Combine the per-call timeout with the scope deadline."""
+    if timeout is None:
+        timeout = TIMING_CONFIG.device.command_timeout
+    if scope.deadline is not None:
+        remaining = scope.deadline.remaining()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+    return timeout
+
+
+def _new_process_group_kwargs(kwargs: dict) -> dict:
+    """Start the child in its own process group so the whole tree can be killed."""
+    if os.name == "nt":
+        kwargs["creationflags"] = (
+            kwargs.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+        )
+    else:
+        kwargs["start_new_session"] = True
+    return kwargs
+
+
+def run_command(
+    cmd: list[str],
+    timeout: float | None = None,
+    token: CancellationToken | None = None,
+    kind: str | None = None,
+    capture_output: bool = False,
+    **kwargs,
+) -> subprocess.CompletedProcess:
+    """
+    Run a command with a deadline, cancellation and kill-on-timeout.
+
+    Accepts the same keyword arguments as subprocess.run (capture_output,
+    text, encoding, errors, ...).
+
+    Args:
+        cmd: Command list to execute.
+        timeout: Per-call timeout in seconds. If None, uses configured default.
+            The effective timeout is also capped by the scope deadline.
+        token: Cancellation token. If None, uses the scope token.
+        kind: Command type label for statistics. Derived from cmd if None.
+        capture_output: Capture stdout and stderr.
+        **kwargs: Additional arguments for subprocess.Popen.
+
+    Returns:
+        CompletedProcess result.
+
+    Raises:
+        subprocess.TimeoutExpired: If the command or scope deadline timed out.
+        CommandCancelledError: If the command was cancelled.
+    """
+    scope = _current_scope()
+    token = token or scope.token
+    kind = kind or command_kind(cmd)
+
+    timeout = _resolve_timeout(timeout, scope)
+
+    if token is not None:
+        token.raise_if_cancelled()
+    if timeout <= 0:
+        _record(cmd, kind, 0.0, "timeout")
+        raise subprocess.TimeoutExpired(cmd, 0)
+
+    if capture_output:
+        kwargs["stdout"] = subprocess.PIPE
+        kwargs["stderr"] = subprocess.PIPE
+    _new_process_group_kwargs(kwargs)
+
+    start = time.monotonic()
+    expires_at = start + timeout
+    process = subprocess.Popen(cmd, **kwargs)
+    outcome = "ok"
+    try:
+        while True:
+            wait = min(_POLL_INTERVAL, max(0.0, expires_at - time.monotonic()))
+            try:
+                stdout, stderr = process.communicate(timeout=wait)
+                break
+            except subprocess.TimeoutExpired:
+                if token is not None and token.cancelled:
+                    outcome = "cancelled"
+                    _kill_process_tree(process)
+                    process.communicate()
+                    raise CommandCancelledError(f"Command cancelled: {' '.join(cmd)}")
+                if time.monotonic() >= expires_at:
+                    outcome = "timeout"
+                    _kill_process_tree(process)
+                    stdout, stderr = process.communicate()
+                    raise subprocess.TimeoutExpired(
+                        cmd, timeout, output=stdout, stderr=stderr
+                    )
+    except BaseException:
+        if outcome == "ok":
+            outcome = "failed"
+            _kill_process_tree(process)
+        raise
+    finally:
+        if outcome == "ok" and process.returncode != 0:
+            outcome = "failed"
+        _record(cmd, kind, time.monotonic() - start, outcome)
+
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+async def run_command_async(
+    cmd: list[str],
+    timeout: float | None = None,
+    token: CancellationToken | None = None,
+    kind: str | None = None,
+    capture_output: bool = False,
+    text: bool = False,
+    encoding: str | None = None,
+    errors: str | None = None,
+) -> subprocess.CompletedProcess:
+    """
+    Async counterpart of run_command built on asyncio.create_subprocess_exec.
+
+    Timeouts, scope deadlines, cancellation tokens and statistics behave as
+    in run_command. Cancelling the awaiting task also kills the process tree.
+
+    Args:
+        cmd: Command list to execute.
+        timeout: Per-call timeout in seconds. If None, uses configured default.
+        token: Cancellation token. If None, uses the scope token.
+        kind: Command type label for statistics. Derived from cmd if None.
+        capture_output: Capture stdout and stderr.
+        text: Decode output as text.
+        encoding: Text encoding (implies text). Defaults to UTF-8.
+        errors: Error handling scheme for decoding.
+
+    Returns:
+        CompletedProcess result.
+
+    Raises:
+        subprocess.TimeoutExpired: If the command or scope deadline timed out.
+        CommandCancelledError: If the command was cancelled through the token.
+    """
+    scope = _current_scope()
+    token = token or scope.token
+    kind = kind or command_kind(cmd)
+    timeout = _resolve_timeout(timeout, scope)
+
+    if token is not None:
+        token.raise_if_cancelled()
+    if timeout <= 0:
+        _record(cmd, kind, 0.0, "timeout")
+        raise subprocess.TimeoutExpired(cmd, 0)
+
+    pipe = asyncio.subprocess.PIPE if capture_output else None
+    start = time.monotonic()
+    expires_at = start + timeout
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=pipe, stderr=pipe, **_new_process_group_kwargs({})
+    )
+    communicate = asyncio.ensure_future(process.communicate())
+    outcome = "ok"
+    try:
+        while True:
+            wait = min(_POLL_INTERVAL, max(0.0, expires_at - time.monotonic()))
+            done, _ = await asyncio.wait({communicate}, timeout=wait)
+            if done:
+                stdout, stderr = communicate.result()
+                break
+            if token is not None and token.cancelled:
+                outcome = "cancelled"
+                _kill_process_tree(process)
+                await communicate
+                raise CommandCancelledError(f"Command cancelled: {' '.join(cmd)}")
+            if time.monotonic() >= expires_at:
+                outcome = "timeout"
+                _kill_process_tree(process)
+                stdout, stderr = await communicate
+                raise subprocess.TimeoutExpired(
+                    cmd, timeout, output=stdout, stderr=stderr
+                )
+    except BaseException:
+        if outcome == "ok":
+            outcome = "cancelled"
+            _kill_process_tree(process)
+            communicate.cancel()
+        raise
+    finally:
+        if outcome == "ok" and process.returncode != 0:
+            outcome = "failed"
+        _record(cmd, kind, time.monotonic() - start, outcome)
+
+    if text or encoding:
+        encoding = encoding or "utf-8"
+        errors = errors or "strict"
+        stdout = stdout.decode(encoding, errors) if stdout is not None else None
+        stderr = stderr.decode(encoding, errors) if stderr is not None else None
+
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop on a daemon thread that runs device commands for blocking callers."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="device-command-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def run_blocking(
+    coro: Coroutine[Any, Any, T], loop: asyncio.AbstractEventLoop | None = None
+) -> T:
+    """
+    Run a coroutine from synchronous code and wait for its result.
+
+    The coroutine runs on a shared background event loop, so it works from
+    any thread, including one that is already running an event loop. The
+    caller's command scope (deadline and cancellation token) carries over.
+    If the caller is interrupted (e.g. KeyboardInterrupt), the coroutine is
+    cancelled, which kills a running command.
+
+    Args:
+        coro: Coroutine to run, e.g. ``aio.tap(500, 1000)``.
+        loop: Event loop to run it on. Defaults to the device command loop.
+
+    Returns:
+        The coroutine's result. Its exceptions are re-raised in the caller.
+    """
+    # Carry context variables such as the command scope over to the loop thread
+    context = copy_context()
+
+    async def run() -> T:
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+
+    future = asyncio.run_coroutine_threadsafe(run(), loop or _background_loop())
+    try:
+        return future.result()
+    finally:
+        future.cancel()
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(
+        len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1)))
+    )
+    return sorted_values[index]
+
+
+def get_command_stats() -> dict[str, dict]:
+    """
+    Get counters and latency percentiles per command type.
+
+    Returns:
+        Mapping of command type to a dict with count, failures, timeouts,
+        cancellations and p50/p95/p99/max latency in seconds.
+    """
+    with _stats_lock:
+        snapshot = {kind: (s, sorted(s.durations)) for kind, s in _stats.items()}
+
+    return {
+        kind: {
+            "count": stats.count,
+            "failures": stats.failures,
+            "timeouts": stats.timeouts,
+            "cancellations": stats.cancellations,
+            "p50": _percentile(durations, 50),
+            "p95": _percentile(durations, 95),
+            "p99": _percentile(durations, 99),
+            "max": durations[-1] if durations else 0.0,
+        }
+        for kind, (stats, durations) in snapshot.items()
+    }
+
+
+def reset_command_stats() -> None:
+    """Clear all command statistics."""
+    with _stats_lock:
+        _stats.clear()
+
+
+def format_command_stats() -> str:
+    """
+    Format command statistics as a table.
+
+    Returns:
+        Human-readable table, one row per command type.
+    """
+    stats = get_command_stats()
+    lines = [
+        f"{'command':<24} {'count':>6} {'timeouts':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    ]
+    for kind, s in sorted(stats.items(), key=lambda item: -item[1]["p95"]):
+        lines.append(
+            f"{kind:<24} {s['count']:>6} {s['timeouts']:>8} "
+            f"{s['p50']:>7.3f}s {s['p95']:>7.3f}s {s['p99']:>7.3f}s {s['max']:>7.3f}s"
+        )
+    return "\n".join(lines)
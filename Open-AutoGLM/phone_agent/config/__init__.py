@@ -1,5 +1,6 @@
 """Configuration module for Phone Agent."""
 
+from phone_agent.config import prompts_en, prompts_zh
 from phone_agent.config.apps import APP_PACKAGES
 from phone_agent.config.apps_ios import APP_PACKAGES_IOS
 from phone_agent.config.i18n import get_message, get_messages
@@ -14,21 +15,42 @@ from phone_agent.config.timing import (
     get_timing_config,
     update_timing_config,
 )
+from phone_agent.config.timing_profiles import (
+    TimingProfile,
+    TimingProfileStore,
+    get_profile_store,
+)
 
 
-def get_system_prompt(lang: str = "cn") -> str:
+def get_system_prompt(lang: str = "cn", stable: bool = False) -> str:
     """
     Get system prompt by language.
 
     Args:
         lang: Language code, 'cn' for Chinese, 'en' for English.
+        stable: Return the variant without the date, which stays byte-identical
+            across tasks and days so the server can reuse its prefix cache.
+            Send ``get_date_line(lang)`` with the task instead.
 
     Returns:
         System prompt string.
     """
-    if lang == "en":
-        return SYSTEM_PROMPT_EN
-    return SYSTEM_PROMPT_ZH
+    prompts = prompts_en if lang == "en" else prompts_zh
+    return prompts.STABLE_SYSTEM_PROMPT if stable else prompts.SYSTEM_PROMPT
+
+
+def get_date_line(lang: str = "cn") -> str:
+    """
+    Get the line stating today's date, as it appears in the system prompt.
+
+    Args:
+        lang: Language code, 'cn' for Chinese, 'en' for English.
+
+    Returns:
+        Date line computed at call time.
+    """
+    prompts = prompts_en if lang == "en" else prompts_zh
+    return prompts.get_date_line()
 
 
 # Default to Chinese for backward compatibility
@@ -41,6 +63,7 @@ __all__ = [
     "SYSTEM_PROMPT_ZH",
     "SYSTEM_PROMPT_EN",
     "get_system_prompt",
+    "get_date_line",
     "get_messages",
     "get_message",
     "TIMING_CONFIG",
@@ -50,4 +73,7 @@ __all__ = [
     "ConnectionTimingConfig",
     "get_timing_config",
     "update_timing_config",
+    "TimingProfile",
+    "TimingProfileStore",
+    "get_profile_store",
 ]
@@ -23,6 +23,10 @@ MESSAGES_ZH = {
     "time_to_first_token": "首 Token 延迟 (TTFT)",
     "time_to_thinking_end": "思考完成延迟",
     "total_inference_time": "总推理时间",
+    "model_retry": "模型请求失败，正在重试",
+    "model_retries": "重试次数",
+    "model_cached": "响应来自缓存",
+    "model_escalate": "模型输出不可用，升级到",
 }
 
 # English messages
@@ -48,6 +52,10 @@ MESSAGES_EN = {
     "time_to_first_token": "Time to First Token (TTFT)",
     "time_to_thinking_end": "Time to Thinking End",
     "total_inference_time": "Total Inference Time",
+    "model_retry": "Model request failed, retrying",
+    "model_retries": "Retries",
+    "model_cached": "Response replayed from cache",
+    "model_escalate": "Model answer unusable, escalating to",
 }
 
 
@@ -2,14 +2,21 @@
 
 from datetime import datetime
 
+
+def format_date(day: datetime | None = None) -> str:
+    """Format a date the way the prompt states it, e.g. 2025-12-12, Friday."""
+    return (day or datetime.today()).strftime("%Y-%m-%d, %A")
+
+
+def get_date_line(day: datetime | None = None) -> str:
+    """The line stating the current date."""
+    return "The current date: " + format_date(day)
+
+
 today = datetime.today()
-formatted_date = today.strftime("%Y-%m-%d, %A")
+formatted_date = format_date(today)
 
-SYSTEM_PROMPT = (
-    "The current date: "
-    + formatted_date
-    + """
-# Setup
+INSTRUCTIONS = """# Setup
 You are a professional Android operation agent assistant that can fulfill the user's high-level instructions. Given a screenshot of the Android interface at each step, you first analyze the situation, then plan the best course of action using Python-style pseudo-code.
 
 # More details about the code
@@ -76,4 +83,9 @@ REMEMBER:
 - Only ONE LINE of action in <answer> part per response: Each step must contain exactly one line of executable code.
 - Generate execution code strictly according to format requirements.
 """
-)
+
+SYSTEM_PROMPT = get_date_line(today) + "\n" + INSTRUCTIONS
+
+# Byte-identical across tasks and days, so servers can reuse the cached
+# prefix; the date is sent with the task instead
+STABLE_SYSTEM_PROMPT = INSTRUCTIONS
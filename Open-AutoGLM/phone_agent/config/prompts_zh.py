@@ -2,16 +2,25 @@
 
 from datetime import datetime
 
-today = datetime.today()
 weekday_names = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
+
+
+def format_date(day: datetime | None = None) -> str:
+    """Format a date the way the prompt states it, e.g. 2025年12月12日 星期五."""
+    day = day or datetime.today()
+    return day.strftime("%Y年%m月%d日") + " " + weekday_names[day.weekday()]
+
+
+def get_date_line(day: datetime | None = None) -> str:
+    """The line stating the current date."""
+    return "今天的日期是: " + format_date(day)
+
+
+today = datetime.today()
 weekday = weekday_names[today.weekday()]
-formatted_date = today.strftime("%Y年%m月%d日") + " " + weekday
+formatted_date = format_date(today)
 
-SYSTEM_PROMPT = (
-    "今天的日期是: "
-    + formatted_date
-    + """
-你是一个智能体分析专家，可以根据操作历史和当前状态图执行一系列操作来完成任务。
+INSTRUCTIONS = """你是一个智能体分析专家，可以根据操作历史和当前状态图执行一系列操作来完成任务。
 你必须严格按照要求输出以下格式：
 <think>{think}</think>
 <answer>{action}</answer>
@@ -74,4 +83,9 @@ SYSTEM_PROMPT = (
 17. 如果没有合适的搜索结果，可能是因为搜索页面不对，请返回到搜索页面的上一级尝试重新搜索，如果尝试三次返回上一级搜索后仍然没有符合要求的结果，执行 finish(message="原因")。
 18. 在结束任务前请一定要仔细检查任务是否完整准确的完成，如果出现错选、漏选、多选的情况，请返回之前的步骤进行纠正。
 """
-)
+
+SYSTEM_PROMPT = get_date_line(today) + "\n" + INSTRUCTIONS
+
+# Byte-identical across tasks and days, so servers can reuse the cached
+# prefix; the date is sent with the task instead
+STABLE_SYSTEM_PROMPT = INSTRUCTIONS
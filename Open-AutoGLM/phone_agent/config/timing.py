@@ -13,10 +13,14 @@ class ActionTimingConfig:
     """Configuration for action handler timing delays."""
 
     # Text input related delays (in seconds)
-    keyboard_switch_delay: float = 1.0  # Delay after switching to ADB keyboard
+    # keyboard_switch_delay and keyboard_restore_delay are no longer slept on:
+    # IME readiness is confirmed by polling default_input_method instead.
+    keyboard_switch_delay: float = 1.0  # Deprecated, kept for compatibility
     text_clear_delay: float = 1.0  # Delay after clearing text
     text_input_delay: float = 1.0  # Delay after typing text
-    keyboard_restore_delay: float = 1.0  # Delay after restoring original keyboard
+    keyboard_restore_delay: float = 1.0  # Deprecated, kept for compatibility
+    ime_ready_timeout: float = 3.0  # Max wait for an IME switch to take effect
+    ime_poll_interval: float = 0.1  # Interval between IME readiness checks
 
     def __post_init__(self):
         """Load values from environment variables if present."""
@@ -32,6 +36,12 @@ class ActionTimingConfig:
         self.keyboard_restore_delay = float(
             os.getenv("PHONE_AGENT_KEYBOARD_RESTORE_DELAY", self.keyboard_restore_delay)
         )
+        self.ime_ready_timeout = float(
+            os.getenv("PHONE_AGENT_IME_READY_TIMEOUT", self.ime_ready_timeout)
+        )
+        self.ime_poll_interval = float(
+            os.getenv("PHONE_AGENT_IME_POLL_INTERVAL", self.ime_poll_interval)
+        )
 
 
 @dataclass
@@ -47,6 +57,7 @@ class DeviceTimingConfig:
     default_back_delay: float = 1.0  # Default delay after back button
     default_home_delay: float = 1.0  # Default delay after home button
     default_launch_delay: float = 1.0  # Default delay after launching app
+    command_timeout: float = 20.0  # Default timeout for a single device command
 
     def __post_init__(self):
         """Load values from environment variables if present."""
@@ -74,6 +85,9 @@ class DeviceTimingConfig:
         self.default_launch_delay = float(
             os.getenv("PHONE_AGENT_LAUNCH_DELAY", self.default_launch_delay)
         )
+        self.command_timeout = float(
+            os.getenv("PHONE_AGENT_COMMAND_TIMEOUT", self.command_timeout)
+        )
 
 
 @dataclass
@@ -86,6 +100,12 @@ class ConnectionTimingConfig:
         1.0  # Wait time between killing and starting ADB server
     )
 
+    # Watchdog for remote (WiFi) devices (in seconds)
+    keepalive_interval: float = 3.0  # Time between liveness probes
+    reconnect_backoff_initial: float = 1.0  # First delay between reconnect attempts
+    reconnect_backoff_max: float = 30.0  # Upper bound for the reconnect delay
+    reconnect_wait_timeout: float = 30.0  # How long agent steps pause for a reconnect
+
     def __post_init__(self):
         """Load values from environment variables if present."""
         self.adb_restart_delay = float(
@@ -94,6 +114,20 @@ class ConnectionTimingConfig:
         self.server_restart_delay = float(
             os.getenv("PHONE_AGENT_SERVER_RESTART_DELAY", self.server_restart_delay)
         )
+        self.keepalive_interval = float(
+            os.getenv("PHONE_AGENT_KEEPALIVE_INTERVAL", self.keepalive_interval)
+        )
+        self.reconnect_backoff_initial = float(
+            os.getenv(
+                "PHONE_AGENT_RECONNECT_BACKOFF_INITIAL", self.reconnect_backoff_initial
+            )
+        )
+        self.reconnect_backoff_max = float(
+            os.getenv("PHONE_AGENT_RECONNECT_BACKOFF_MAX", self.reconnect_backoff_max)
+        )
+        self.reconnect_wait_timeout = float(
+            os.getenv("PHONE_AGENT_RECONNECT_WAIT_TIMEOUT", self.reconnect_wait_timeout)
+        )
 
 
 @dataclass
@@ -116,14 +150,26 @@ class TimingConfig:
 TIMING_CONFIG = TimingConfig()
 
 
-def get_timing_config() -> TimingConfig:
+def get_timing_config(device_id: str | None = None) -> TimingConfig:
     """
-    Get the global timing configuration.
+    Get the timing configuration for a device.
+
+    If the device has a calibrated timing profile (see
+    phone_agent.calibration), its delays are applied on top of the global
+    configuration. Otherwise the global configuration is returned.
+
+    Args:
+        device_id: Optional device ID. None uses the default device's profile.
 
     Returns:
-        The global TimingConfig instance.
+        The TimingConfig to use for the device.
     """
-    return TIMING_CONFIG
+    from phone_agent.config.timing_profiles import get_profile_store
+
+    profile = get_profile_store().get(device_id)
+    if profile is None:
+        return TIMING_CONFIG
+    return profile.apply(TIMING_CONFIG)
 
 
 def update_timing_config(
@@ -142,7 +188,7 @@ def update_timing_config(
     Example:
         >>> from phone_agent.config.timing import update_timing_config, ActionTimingConfig
         >>> custom_action = ActionTimingConfig(
-        ...     keyboard_switch_delay=0.5,
+        ...     text_clear_delay=0.5,
         ...     text_input_delay=0.5
         ... )
         >>> update_timing_config(action=custom_action)
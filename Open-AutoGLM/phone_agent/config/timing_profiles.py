@@ -0,0 +1,201 @@
+"""Per-device timing profiles produced by calibration.
+
+A profile holds the delays measured for one device (see
+``phone_agent.calibration``) and is stored in a small JSON file keyed by
+device serial. ``get_timing_config(device_id)`` overlays the profile on the
+global ``TIMING_CONFIG``, so device functions pick up calibrated delays
+automatically. Values set through ``PHONE_AGENT_*`` environment variables
+still take precedence over calibrated ones.
+
+The store location can be configured with ``PHONE_AGENT_TIMING_PROFILES``.
+"""
+
+import copy
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field, fields, replace
+from pathlib import Path
+
+from phone_agent.config.timing import TimingConfig
+
+DEFAULT_PROFILE_PATH = Path.home() / ".phone_agent" / "timing_profiles.json"
+
+# Profile field -> DeviceTimingConfig field
+_DEVICE_FIELDS = {
+    "tap_delay": "default_tap_delay",
+    "double_tap_delay": "default_double_tap_delay",
+    "swipe_delay": "default_swipe_delay",
+    "back_delay": "default_back_delay",
+    "home_delay": "default_home_delay",
+    "launch_delay": "default_launch_delay",
+}
+
+# Profile field -> ActionTimingConfig field
+_ACTION_FIELDS = {
+    "ime_ready_timeout": "ime_ready_timeout",
+}
+
+
+@dataclass
+class TimingProfile:
+    """Calibrated delays for one device. None means "use the global default"."""
+
+    device_id: str
+    device_type: str = "adb"
+    tap_delay: float | None = None
+    double_tap_delay: float | None = None
+    swipe_delay: float | None = None
+    back_delay: float | None = None
+    home_delay: float | None = None
+    launch_delay: float | None = None
+    ime_ready_timeout: float | None = None
+    # Raw latencies in seconds the delays were derived from
+    measurements: dict[str, float] = field(default_factory=dict)
+    calibrated_at: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TimingProfile":
+        """Build from a dictionary, ignoring unknown keys."""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    def apply(self, base: TimingConfig) -> TimingConfig:
+        """
+        Overlay this profile on a timing configuration.
+
+        Args:
+            base: Configuration providing the defaults.
+
+        Returns:
+            A new TimingConfig; base is not modified.
+        """
+        device = {
+            target: getattr(self, name)
+            for name, target in _DEVICE_FIELDS.items()
+            if getattr(self, name) is not None
+        }
+        action = {
+            target: getattr(self, name)
+            for name, target in _ACTION_FIELDS.items()
+            if getattr(self, name) is not None
+        }
+
+        config = copy.copy(base)
+        # replace() re-runs __post_init__, so environment overrides still win
+        config.device = replace(base.device, **device)
+        config.action = replace(base.action, **action)
+        return config
+
+
+class TimingProfileStore:
+    """
+    Thread-safe store of timing profiles backed by a JSON file.
+
+    Args:
+        path: Path of the JSON store.
+
+    Example:
+        >>> store = TimingProfileStore()
+        >>> store.set(TimingProfile(device_id="emulator-5554", tap_delay=0.4))
+        >>> store.get("emulator-5554").tap_delay
+        0.4
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        if path is None:
+            path = os.getenv("PHONE_AGENT_TIMING_PROFILES", DEFAULT_PROFILE_PATH)
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._profiles: dict[str, TimingProfile] | None = None
+        self._default_device: str | None = None
+
+    def get(self, device_id: str | None) -> TimingProfile | None:
+        """
+        Get the profile for a device.
+
+        Args:
+            device_id: Device serial. None resolves to the default device
+                set with set_default_device().
+
+        Returns:
+            TimingProfile, or None if the device has not been calibrated.
+        """
+        device_id = device_id or self._default_device
+        if device_id is None:
+            return None
+        with self._lock:
+            self._load()
+            return self._profiles.get(device_id)
+
+    def set(self, profile: TimingProfile) -> None:
+        """Store a profile, replacing any previous one for the device."""
+        with self._lock:
+            self._load()
+            self._profiles[profile.device_id] = profile
+            self._save()
+
+    def delete(self, device_id: str) -> None:
+        """Remove the profile of a device."""
+        with self._lock:
+            self._load()
+            self._profiles.pop(device_id, None)
+            self._save()
+
+    def set_default_device(self, device_id: str | None) -> None:
+        """
+        Set the device whose profile is used when no device ID is given.
+
+        Device functions are usually called with device_id=None when only
+        one device is connected; this maps those calls to its serial.
+
+        Args:
+            device_id: Device serial, or None to clear.
+        """
+        self._default_device = device_id
+
+    def _load(self) -> None:
+        """Load the store from disk on first use. Caller must hold the lock."""
+        if self._profiles is not None:
+            return
+        self._profiles = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for device_id, entry in data.items():
+                self._profiles[device_id] = TimingProfile.from_dict(entry)
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def _save(self) -> None:
+        """Write the store to disk. Caller must hold the lock."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {k: asdict(v) for k, v in self._profiles.items()},
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not save timing profiles: {e}")
+
+
+# Global profile store instance
+_profile_store: TimingProfileStore | None = None
+
+
+def get_profile_store() -> TimingProfileStore:
+    """
+    Get the global timing profile store.
+
+    Returns:
+        The TimingProfileStore instance.
+    """
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = TimingProfileStore()
+    return _profile_store
@@ -0,0 +1,256 @@
+"""Token-budgeted conversation context for the agent loop.
+
+Screenshots are dropped from the context once the model has answered, but
+every step still adds its screen info and the full thinking of the answer.
+On long tasks this history dominates prompt prefill. ``ConversationContext``
+keeps an estimated token count that is updated as messages are added, and
+when it exceeds the budget it folds the oldest steps into a compact action
+log (one line per step: app, action and outcome, no thinking). The system
+prompt, the task and the last ``keep_turns`` steps are always kept verbatim.
+
+The task and the action log are prepended to the first kept user message,
+so user and assistant turns still alternate.
+
+Example:
+    >>> context = ConversationContext(token_budget=12000, keep_turns=4)
+    >>> context.set_system(system_prompt)
+    >>> context.add_user(user_message, app="WeChat", task="Send hi to John")
+    >>> response = model_client.request(context.messages)
+    >>> context.strip_images()
+    >>> context.add_assistant(assistant_message, action=response.action, success=True)
+"""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+# Rough prompt cost of one screenshot; only matters until images are stripped
+IMAGE_TOKENS = 1500
+
+# Longer actions (e.g. typed text) are cut in the action log
+_MAX_LOG_ACTION_CHARS = 160
+
+_HISTORY_HEADER = "** Action History **"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text without a tokenizer.
+
+    ASCII text averages about four characters per token, CJK text about one
+    character per token.
+
+    Args:
+        text: Text to estimate.
+
+    Returns:
+        Estimated token count.
+    """
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+def estimate_message_tokens(message: dict[str, Any]) -> int:
+    """Estimate the token count of one message in OpenAI format."""
+    content = message.get("content")
+    if isinstance(content, str):
+        return estimate_tokens(content) + 4
+    tokens = 4
+    for item in content or []:
+        if item.get("type") == "text":
+            tokens += estimate_tokens(item.get("text", ""))
+        elif item.get("type") == "image_url":
+            tokens += IMAGE_TOKENS
+    return tokens
+
+
+@dataclass
+class _Turn:
+    """One step: the screen the model saw and its answer."""
+
+    step: int
+    app: str | None
+    messages: list[dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+    log_entry: str | None = None
+
+
+class ConversationContext:
+    """
+    Conversation history with a token budget.
+
+    Args:
+        token_budget: Estimated token count above which old steps are
+            compacted into the action log. None disables compaction.
+        keep_turns: Number of most recent steps always kept verbatim.
+        stable_prefix: Compact all but the last ``keep_turns`` steps at once
+            instead of one step at a time. Every compaction rewrites the
+            history message and invalidates the server's prefix cache from
+            there on; compacting in batches lets the prefix stay unchanged
+            for several steps in between.
+    """
+
+    def __init__(
+        self,
+        token_budget: int | None = None,
+        keep_turns: int = 4,
+        stable_prefix: bool = False,
+    ):
+        self.token_budget = token_budget
+        self.keep_turns = max(1, keep_turns)
+        self.stable_prefix = stable_prefix
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the conversation."""
+        self._system: dict[str, Any] | None = None
+        self._system_tokens = 0
+        self._task: str | None = None
+        self._turns: list[_Turn] = []
+        self._log: list[str] = []
+        self._log_tokens = 0
+        self._tokens = 0
+
+    def __len__(self) -> int:
+        return (self._system is not None) + sum(
+            len(turn.messages) for turn in self._turns
+        )
+
+    @property
+    def tokens(self) -> int:
+        """Estimated token count of ``messages``."""
+        return self._tokens
+
+    @property
+    def compacted_steps(self) -> int:
+        """Number of steps folded into the action log."""
+        return len(self._log)
+
+    @property
+    def messages(self) -> list[dict[str, Any]]:
+        """The messages to send to the model."""
+        messages = [self._system] if self._system is not None else []
+        history = self._history_text() if self._log else None
+        for turn in self._turns:
+            for message in turn.messages:
+                if history is not None and message.get("role") == "user":
+                    message = _prepend_text(message, history)
+                    history = None
+                messages.append(message)
+        return messages
+
+    def set_system(self, message: dict[str, Any]) -> None:
+        """Set the system message."""
+        self._tokens -= self._system_tokens
+        self._system = message
+        self._system_tokens = estimate_message_tokens(message)
+        self._tokens += self._system_tokens
+
+    def add_user(
+        self, message: dict[str, Any], app: str | None = None, task: str | None = None
+    ) -> None:
+        """
+        Start a new step with the user message describing the screen.
+
+        Args:
+            message: User message, usually with a screenshot.
+            app: Current app, shown in the action log.
+            task: The task text, if this message carries it. It is kept in
+                the context after the message itself has been compacted.
+        """
+        if task is not None:
+            self._task = task
+        step = self._turns[-1].step + 1 if self._turns else len(self._log) + 1
+        turn = _Turn(step=step, app=app)
+        self._turns.append(turn)
+        self._append(turn, message)
+
+    def add_assistant(
+        self,
+        message: dict[str, Any],
+        action: str,
+        success: bool = True,
+        detail: str | None = None,
+    ) -> None:
+        """
+        Finish the current step with the model's answer and its outcome.
+
+        Compacts old steps if the context is now over budget.
+
+        Args:
+            message: Assistant message with the full response.
+            action: The action text, e.g. 'do(action="Back")'.
+            success: Whether the action succeeded.
+            detail: Optional result message.
+        """
+        turn = self._turns[-1]
+        self._append(turn, message)
+        turn.log_entry = _log_entry(turn, action, success, detail)
+        self._compact()
+
+    def strip_images(self) -> None:
+        """Remove images from the latest user message."""
+        if not self._turns:
+            return
+        turn = self._turns[-1]
+        message = turn.messages[-1]
+        if not isinstance(message.get("content"), list):
+            return
+        before = estimate_message_tokens(message)
+        message["content"] = [
+            item for item in message["content"] if item.get("type") == "text"
+        ]
+        delta = estimate_message_tokens(message) - before
+        turn.tokens += delta
+        self._tokens += delta
+
+    def _append(self, turn: _Turn, message: dict[str, Any]) -> None:
+        tokens = estimate_message_tokens(message)
+        turn.messages.append(message)
+        turn.tokens += tokens
+        self._tokens += tokens
+
+    def _compact(self) -> None:
+        if self.token_budget is None or self._tokens <= self.token_budget:
+            return
+        while len(self._turns) > self.keep_turns and (
+            self.stable_prefix or self._tokens > self.token_budget
+        ):
+            before = self._history_tokens()
+            turn = self._turns.pop(0)
+            self._log.append(turn.log_entry or f"{turn.step}. (no answer)")
+            self._log_tokens += estimate_tokens(self._log[-1])
+            self._tokens += self._history_tokens() - before - turn.tokens
+
+    def _history_tokens(self) -> int:
+        if not self._log:
+            return 0
+        return (
+            estimate_tokens(self._task or "")
+            + estimate_tokens(_HISTORY_HEADER)
+            + self._log_tokens
+        )
+
+    def _history_text(self) -> str:
+        parts = [self._task] if self._task else []
+        parts.append(_HISTORY_HEADER + "\n" + "\n".join(self._log))
+        return "\n\n".join(parts)
+
+
+def _prepend_text(message: dict[str, Any], text: str) -> dict[str, Any]:
+    """Copy of a message with a text block in front of its content."""
+    content = message.get("content")
+    if isinstance(content, list):
+        return {**message, "content": [{"type": "text", "text": text}, *content]}
+    return {**message, "content": f"{text}\n\n{content or ''}"}
+
+
+def _log_entry(turn: _Turn, action: str, success: bool, detail: str | None) -> str:
+    """One action log line, e.g. '3. [WeChat] do(action="Back") -> ok'."""
+    action = " ".join(action.split())
+    if len(action) > _MAX_LOG_ACTION_CHARS:
+        action = action[: _MAX_LOG_ACTION_CHARS - 3] + "..."
+    outcome = "ok" if success else "failed"
+    if detail:
+        outcome += f": {detail}"
+    app = f"[{turn.app}] " if turn.app else ""
+    return f"{turn.step}. {app}{action} -> {outcome}"
@@ -53,6 +53,10 @@ class DeviceFactory:
         """Get current app name."""
         return self.module.get_current_app(device_id)
 
+    def get_current_package(self, device_id: str | None = None) -> str | None:
+        """Get the package name of the focused app."""
+        return self.module.get_current_package(device_id)
+
     def tap(
         self, x: int, y: int, device_id: str | None = None, delay: float | None = None
     ):
@@ -95,6 +99,10 @@ class DeviceFactory:
         """Press back button."""
         return self.module.back(device_id, delay)
 
+    def press_keys(self, keycodes: list[str | int], device_id: str | None = None):
+        """Press a sequence of keys (Android key codes) in one device call."""
+        return self.module.press_keys(keycodes, device_id)
+
     def home(self, device_id: str | None = None, delay: float | None = None):
         """Press home button."""
         return self.module.home(device_id, delay)
@@ -121,6 +129,16 @@ class DeviceFactory:
         """Restore keyboard."""
         return self.module.restore_keyboard(ime, device_id)
 
+    def get_current_ime(self, device_id: str | None = None) -> str:
+        """Get the currently selected IME."""
+        return self.module.get_current_ime(device_id)
+
+    def wait_for_ime(
+        self, ime: str, device_id: str | None = None, timeout: float | None = None
+    ) -> bool:
+        """Wait until the given IME is active."""
+        return self.module.wait_for_ime(ime, device_id, timeout)
+
     def list_devices(self):
         """List connected devices."""
         return self.module.list_devices()
@@ -139,6 +157,143 @@ class DeviceFactory:
             raise ValueError(f"Unknown device type: {self.device_type}")
 
 
+class AsyncDeviceFactory:
+    """
+    Asyncio counterpart of DeviceFactory.
+
+    Methods have the same signatures as DeviceFactory but are coroutines
+    backed by ``asyncio.create_subprocess_exec``, so one event loop can
+    drive many devices without a thread per device.
+
+    Example:
+        >>> factory = AsyncDeviceFactory(DeviceType.ADB)
+        >>> async def snapshot_all(device_ids):
+        ...     return await asyncio.gather(
+        ...         *(factory.get_screenshot(d) for d in device_ids)
+        ...     )
+    """
+
+    def __init__(self, device_type: DeviceType = DeviceType.ADB):
+        """
+        Initialize the async device factory.
+
+        Args:
+            device_type: The type of device to use (ADB or HDC).
+        """
+        self.device_type = device_type
+        self._module = None
+
+    @property
+    def module(self):
+        """Get the appropriate async device module (adb.aio or hdc.aio)."""
+        if self._module is None:
+            if self.device_type == DeviceType.ADB:
+                from phone_agent.adb import aio
+
+                self._module = aio
+            elif self.device_type == DeviceType.HDC:
+                from phone_agent.hdc import aio
+
+                self._module = aio
+            else:
+                raise ValueError(f"Unknown device type: {self.device_type}")
+        return self._module
+
+    async def get_screenshot(self, device_id: str | None = None, timeout: int = 10):
+        """Get screenshot from device."""
+        return await self.module.get_screenshot(device_id, timeout)
+
+    async def get_current_app(self, device_id: str | None = None) -> str:
+        """Get current app name."""
+        return await self.module.get_current_app(device_id)
+
+    async def get_current_package(self, device_id: str | None = None) -> str | None:
+        """Get the package name of the focused app."""
+        return await self.module.get_current_package(device_id)
+
+    async def tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ):
+        """Tap at coordinates."""
+        return await self.module.tap(x, y, device_id, delay)
+
+    async def double_tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ):
+        """Double tap at coordinates."""
+        return await self.module.double_tap(x, y, device_id, delay)
+
+    async def long_press(
+        self,
+        x: int,
+        y: int,
+        duration_ms: int = 3000,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ):
+        """Long press at coordinates."""
+        return await self.module.long_press(x, y, duration_ms, device_id, delay)
+
+    async def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration_ms: int | None = None,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ):
+        """Swipe from start to end."""
+        return await self.module.swipe(
+            start_x, start_y, end_x, end_y, duration_ms, device_id, delay
+        )
+
+    async def back(self, device_id: str | None = None, delay: float | None = None):
+        """Press back button."""
+        return await self.module.back(device_id, delay)
+
+    async def press_keys(self, keycodes: list[str | int], device_id: str | None = None):
+        """Press a sequence of keys (Android key codes) in one device call."""
+        return await self.module.press_keys(keycodes, device_id)
+
+    async def home(self, device_id: str | None = None, delay: float | None = None):
+        """Press home button."""
+        return await self.module.home(device_id, delay)
+
+    async def launch_app(
+        self, app_name: str, device_id: str | None = None, delay: float | None = None
+    ) -> bool:
+        """Launch an app."""
+        return await self.module.launch_app(app_name, device_id, delay)
+
+    async def type_text(self, text: str, device_id: str | None = None):
+        """Type text."""
+        return await self.module.type_text(text, device_id)
+
+    async def clear_text(self, device_id: str | None = None):
+        """Clear text."""
+        return await self.module.clear_text(device_id)
+
+    async def detect_and_set_adb_keyboard(self, device_id: str | None = None) -> str:
+        """Detect and set keyboard."""
+        return await self.module.detect_and_set_adb_keyboard(device_id)
+
+    async def restore_keyboard(self, ime: str, device_id: str | None = None):
+        """Restore keyboard."""
+        return await self.module.restore_keyboard(ime, device_id)
+
+    async def get_current_ime(self, device_id: str | None = None) -> str:
+        """Get the currently selected IME."""
+        return await self.module.get_current_ime(device_id)
+
+    async def wait_for_ime(
+        self, ime: str, device_id: str | None = None, timeout: float | None = None
+    ) -> bool:
+        """Wait until the given IME is active."""
+        return await self.module.wait_for_ime(ime, device_id, timeout)
+
+
 # Global device factory instance
 _device_factory: DeviceFactory | None = None
 
@@ -165,3 +320,13 @@ def get_device_factory() -> DeviceFactory:
     if _device_factory is None:
         _device_factory = DeviceFactory(DeviceType.ADB)  # Default to ADB
     return _device_factory
+
+
+def get_async_device_factory() -> AsyncDeviceFactory:
+    """
+    Get an async device factory for the globally configured device type.
+
+    Returns:
+        An AsyncDeviceFactory matching get_device_factory().device_type.
+    """
+    return AsyncDeviceFactory(get_device_factory().device_type)
@@ -0,0 +1,333 @@
+"""Latency histograms for device primitives, per backend, device and operation.
+
+Every adb/hdc command that goes through ``command_runner`` and every
+WebDriverAgent request is recorded here under a label such as
+``("adb", "emulator-5554", "input tap")`` or ``("wda", "http://...:8100",
+"POST actions")``. Each label keeps a fixed-bucket latency histogram plus
+counters, so a single slow primitive on a single phone stands out.
+
+Metrics live in the current process. ``save_device_metrics`` writes a JSON
+snapshot (to ``PHONE_AGENT_METRICS_FILE`` by default) so another process,
+such as the web server that spawned the agent, can read them. With that
+variable set, the snapshot is also refreshed while commands are recorded,
+at most every ``SNAPSHOT_INTERVAL`` seconds, so it stays current even if the
+process is killed.
+
+Example:
+    >>> from phone_agent.device_metrics import format_device_metrics
+    >>> print(format_device_metrics())
+    backend  device          operation               count  errors      p50      p95      max
+    adb      emulator-5554   input tap                  12       0   0.250s   0.500s   0.912s
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+# Upper bounds of the latency buckets in seconds; the last bucket is unbounded
+BUCKETS: tuple[float, ...] = (
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+# Minimum seconds between snapshots written while recording
+SNAPSHOT_INTERVAL = 5.0
+
+# Shell tools whose first argument is a sub-command worth keeping in the label
+_SUBCOMMAND_TOOLS = {
+    "input": 1,
+    "am": 1,
+    "pm": 1,
+    "cmd": 1,
+    "settings": 1,
+    "ime": 1,
+    "wm": 1,
+    "dumpsys": 1,
+    "aa": 1,
+    "bm": 1,
+    "uitest": 2,
+}
+
+
+@dataclass
+class LatencyHistogram:
+    """Counters and a fixed-bucket latency histogram for one operation."""
+
+    count: int = 0
+    errors: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+
+    def observe(self, duration: float, ok: bool = True) -> None:
+        """Record one call."""
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, pct: float) -> float:
+        """
+        Estimate a percentile from the buckets.
+
+        Returns the upper bound of the bucket holding the percentile (the
+        observed maximum for the unbounded bucket).
+        """
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        """Summary with counters, mean, percentiles and cumulative buckets."""
+        cumulative, seen = {}, 0
+        for bound, n in zip([*map(str, BUCKETS), "+Inf"], self.buckets):
+            seen += n
+            cumulative[bound] = seen
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "buckets": cumulative,
+        }
+
+
+_metrics: dict[tuple[str, str, str], LatencyHistogram] = {}
+_metrics_lock = threading.Lock()
+# Serialises snapshot writes, which share one temporary file
+_save_lock = threading.Lock()
+_last_snapshot = 0.0
+
+
+def record(
+    backend: str, device: str, operation: str, duration: float, ok: bool = True
+) -> None:
+    """
+    Record one device primitive call.
+
+    Args:
+        backend: "adb", "hdc" or "wda".
+        device: Device serial, connect address or WDA URL.
+        operation: Short operation label, e.g. "input tap".
+        duration: Wall time in seconds.
+        ok: Whether the call succeeded.
+    """
+    with _metrics_lock:
+        histogram = _metrics.setdefault(
+            (backend, device, operation), LatencyHistogram()
+        )
+        histogram.observe(duration, ok)
+    _refresh_snapshot()
+
+
+def _refresh_snapshot() -> None:
+    """Write the snapshot if one is configured and the last one is old."""
+    global _last_snapshot
+    path = os.getenv("PHONE_AGENT_METRICS_FILE")
+    if not path or time.monotonic() - _last_snapshot < SNAPSHOT_INTERVAL:
+        return
+    # Another thread is already writing it
+    if not _save_lock.acquire(blocking=False):
+        return
+    try:
+        _last_snapshot = time.monotonic()
+        _write_snapshot(path)
+    except OSError as e:
+        print(f"Warning: Failed to write device metrics to {path}: {e}")
+    finally:
+        _save_lock.release()
+
+
+@contextmanager
+def timed(backend: str, device: str, operation: str) -> Iterator[None]:
+    """
+    Time a block and record it; exceptions count as errors.
+
+    Example:
+        >>> with timed("wda", wda_url, "POST actions"):
+        ...     session.post(url, json=payload)
+    """
+    start = time.monotonic()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        record(backend, device, operation, time.monotonic() - start, ok)
+
+
+def command_labels(cmd: list[str]) -> tuple[str, str, str]:
+    """
+    Derive (backend, device, operation) labels from an adb/hdc command.
+
+    Examples:
+        ["adb", "-s", "X", "shell", "input", "tap", "1", "2"] -> ("adb", "X", "input tap")
+        ["hdc", "shell", "uitest uiInput click 1 2"] -> ("hdc", "default", "uitest uiInput click")
+        ["adb", "exec-out", "screencap", "-p"] -> ("adb", "default", "screencap")
+
+    Args:
+        cmd: Command list.
+
+    Returns:
+        Tuple of backend, device and operation labels.
+    """
+    if not cmd:
+        return "unknown", "default", "unknown"
+    backend = os.path.splitext(os.path.basename(cmd[0]))[0]
+    args = list(cmd[1:])
+    device = "default"
+    while len(args) >= 2 and args[0] in ("-s", "-t"):
+        device = args[1]
+        args = args[2:]
+    if not args:
+        return backend, device, backend
+
+    if args[0] in ("shell", "exec-out") and len(args) > 1:
+        return backend, device, _shell_operation(" ".join(args[1:]))
+    if args[0] == "file" and len(args) > 1:
+        return backend, device, f"file {args[1]}"
+    return backend, device, args[0]
+
+
+def _shell_operation(command: str) -> str:
+    """Label a device-side shell command by its tool and sub-command."""
+    # Shell sequences are labelled by their first command
+    first = command.replace("&&", ";").split(";", 1)[0]
+    words = first.split()
+    if not words:
+        return "shell"
+    label = [os.path.basename(words[0])]
+    depth = _SUBCOMMAND_TOOLS.get(label[0], 0)
+    for word in words[1:]:
+        if len(label) > depth:
+            break
+        if word.startswith("-"):
+            break
+        label.append(word)
+    return " ".join(label)
+
+
+def get_device_metrics() -> list[dict]:
+    """
+    Get a snapshot of all recorded metrics.
+
+    Returns:
+        One dict per (backend, device, operation) with the labels and the
+        fields of ``LatencyHistogram.to_dict``, slowest p95 first.
+    """
+    with _metrics_lock:
+        rows = [
+            {
+                "backend": backend,
+                "device": device,
+                "operation": operation,
+                **h.to_dict(),
+            }
+            for (backend, device, operation), h in _metrics.items()
+        ]
+    return sorted(rows, key=lambda row: -row["p95"])
+
+
+def reset_device_metrics() -> None:
+    """Clear all device metrics."""
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def format_device_metrics(rows: list[dict] | None = None) -> str:
+    """
+    Format device metrics as a table.
+
+    Args:
+        rows: Rows from ``get_device_metrics`` or a loaded snapshot. If None,
+            the metrics of the current process are used.
+
+    Returns:
+        Human-readable table, slowest operations first.
+    """
+    if rows is None:
+        rows = get_device_metrics()
+    lines = [
+        f"{'backend':<8} {'device':<22} {'operation':<24} "
+        f"{'count':>6} {'errors':>6} {'p50':>8} {'p95':>8} {'max':>8}"
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['backend']:<8} {row['device']:<22} {row['operation']:<24} "
+            f"{row['count']:>6} {row['errors']:>6} "
+            f"{row['p50']:>7.3f}s {row['p95']:>7.3f}s {row['max']:>7.3f}s"
+        )
+    return "\n".join(lines)
+
+
+def save_device_metrics(path: str | None = None) -> str | None:
+    """
+    Write the current metrics to a JSON file.
+
+    Args:
+        path: Output path. Defaults to the PHONE_AGENT_METRICS_FILE env var.
+
+    Returns:
+        The path written, or None if no path was configured.
+    """
+    path = path or os.getenv("PHONE_AGENT_METRICS_FILE")
+    if not path:
+        return None
+    with _save_lock:
+        _write_snapshot(path)
+    return path
+
+
+def _write_snapshot(path: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(get_device_metrics(), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_device_metrics(path: str | None = None) -> list[dict]:
+    """
+    Read a snapshot written by ``save_device_metrics``.
+
+    Args:
+        path: Snapshot path. Defaults to the PHONE_AGENT_METRICS_FILE env var.
+
+    Returns:
+        The metric rows, or an empty list if there is no snapshot.
+    """
+    path = path or os.getenv("PHONE_AGENT_METRICS_FILE")
+    if not path or not os.path.exists(path):
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
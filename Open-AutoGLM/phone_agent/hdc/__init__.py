@@ -12,17 +12,21 @@ from phone_agent.hdc.device import (
     back,
     double_tap,
     get_current_app,
+    get_current_package,
     home,
     launch_app,
     long_press,
+    press_keys,
     swipe,
     tap,
 )
 from phone_agent.hdc.input import (
     clear_text,
     detect_and_set_adb_keyboard,
+    get_current_ime,
     restore_keyboard,
     type_text,
+    wait_for_ime,
 )
 from phone_agent.hdc.screenshot import get_screenshot
 
@@ -34,8 +38,11 @@ __all__ = [
     "clear_text",
     "detect_and_set_adb_keyboard",
     "restore_keyboard",
+    "get_current_ime",
+    "wait_for_ime",
     # Device control
     "get_current_app",
+    "get_current_package",
     "tap",
     "swipe",
     "back",
@@ -43,6 +50,7 @@ __all__ = [
     "double_tap",
     "long_press",
     "launch_app",
+    "press_keys",
     # Connection management
     "HDCConnection",
     "DeviceInfo",
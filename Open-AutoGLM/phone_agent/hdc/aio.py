@@ -0,0 +1,504 @@
+"""HDC device, input and screenshot commands as coroutines.
+
+The functions run ``hdc`` through ``asyncio.create_subprocess_exec`` and
+sleep with ``asyncio.sleep``, so a single event loop can drive many devices
+at once. They are the only implementation of these commands: the blocking
+functions exported by ``phone_agent.hdc`` run them with
+``command_runner.run_blocking``.
+"""
+
+import asyncio
+import base64
+import os
+import re
+import subprocess
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image
+
+from phone_agent.command_runner import CommandCancelledError
+from phone_agent.config.apps_harmonyos import APP_ABILITIES, APP_PACKAGES
+from phone_agent.config.timing import get_timing_config
+from phone_agent.hdc.connection import _build_shell_sequence, _run_hdc_command_async
+from phone_agent.hdc.keycodes import HARMONY_KEYCODES, to_harmony_keycode
+
+# Select all (Ctrl+A key combination) followed by DEL
+_CLEAR_TEXT_COMMANDS = [
+    [
+        "uitest",
+        "uiInput",
+        "keyEvent",
+        str(HARMONY_KEYCODES["CTRL_LEFT"]),
+        str(HARMONY_KEYCODES["A"]),
+    ],
+    ["uitest", "uiInput", "keyEvent", str(HARMONY_KEYCODES["DEL"])],
+]
+
+
+@dataclass
+class Screenshot:
+    """Represents a captured screenshot."""
+
+    base64_data: str
+    width: int
+    height: int
+    is_sensitive: bool = False
+
+
+def _is_failure(output: str, markers: tuple[str, ...]) -> bool:
+    output = output.lower()
+    return any(marker in output for marker in markers)
+
+
+async def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screenshot:
+    """
+    Capture a screenshot from the connected HarmonyOS device.
+
+    Args:
+        device_id: Optional HDC device ID for multi-device setups.
+        timeout: Timeout in seconds for screenshot operations.
+
+    Returns:
+        Screenshot object containing base64 data and dimensions.
+    """
+    temp_path = os.path.join(tempfile.gettempdir(), f"screenshot_{uuid.uuid4()}.png")
+    hdc_prefix = _get_hdc_prefix(device_id)
+    # HarmonyOS HDC only supports JPEG format
+    remote_path = "/data/local/tmp/tmp_screenshot.jpeg"
+
+    try:
+        result = await _run_hdc_command_async(
+            hdc_prefix + ["shell", "screenshot", remote_path],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+        if _is_failure(result.stdout + result.stderr, ("fail", "error", "not found")):
+            # Older versions or different devices
+            result = await _run_hdc_command_async(
+                hdc_prefix + ["shell", "snapshot_display", "-f", remote_path],
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+            )
+            if _is_failure(result.stdout + result.stderr, ("fail", "error")):
+                return _create_fallback_screenshot(is_sensitive=True)
+
+        await _run_hdc_command_async(
+            hdc_prefix + ["file", "recv", remote_path, temp_path],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+
+        if not os.path.exists(temp_path):
+            return _create_fallback_screenshot(is_sensitive=False)
+
+        # Re-encoding is CPU-bound, keep it off the event loop
+        base64_data, width, height = await asyncio.to_thread(_convert_to_png, temp_path)
+        os.remove(temp_path)
+
+        return Screenshot(
+            base64_data=base64_data, width=width, height=height, is_sensitive=False
+        )
+
+    except (CommandCancelledError, subprocess.TimeoutExpired):
+        # Cancellation and the step deadline are the caller's to handle
+        raise
+    except Exception as e:
+        print(f"Screenshot error: {e}")
+        return _create_fallback_screenshot(is_sensitive=False)
+
+
+def _convert_to_png(path: str) -> tuple[str, int, int]:
+    """Convert the device's JPEG to a base64 PNG for model inference."""
+    with Image.open(path) as img:
+        width, height = img.size
+        buffered = BytesIO()
+        img.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode("utf-8"), width, height
+
+
+def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
+    """Create a black fallback image when screenshot fails."""
+    default_width, default_height = 1080, 2400
+
+    black_img = Image.new("RGB", (default_width, default_height), color="black")
+    buffered = BytesIO()
+    black_img.save(buffered, format="PNG")
+    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+    return Screenshot(
+        base64_data=base64_data,
+        width=default_width,
+        height=default_height,
+        is_sensitive=is_sensitive,
+    )
+
+
+async def get_current_app(device_id: str | None = None) -> str:
+    """
+    Get the currently focused app name.
+
+    Args:
+        device_id: Optional HDC device ID for multi-device setups.
+
+    Returns:
+        The app name if recognized, otherwise "System Home".
+    """
+    hdc_prefix = _get_hdc_prefix(device_id)
+
+    result = await _run_hdc_command_async(
+        hdc_prefix + ["shell", "hidumper", "-s", "WindowManagerService", "-a", "-a"],
+        capture_output=True,
+        encoding="utf-8",
+    )
+    output = result.stdout
+    if not output:
+        raise ValueError("No output from hidumper")
+
+    return _parse_current_app(output)
+
+
+def _parse_current_app(output: str) -> str:
+    """Map `hidumper` window output to a known app name or "System Home"."""
+    # Parse window focus info
+    for line in output.split("\n"):
+        if "focused" in line.lower() or "current" in line.lower():
+            for app_name, package in APP_PACKAGES.items():
+                if package in line:
+                    return app_name
+
+    return "System Home"
+
+
+# A bundle name such as "com.huawei.hmos.settings"
+_BUNDLE_RE = re.compile(r"\b[A-Za-z]\w*(?:\.\w+)+\b")
+
+
+async def get_current_package(device_id: str | None = None) -> str | None:
+    """
+    Get the bundle name of the focused app.
+
+    Unlike get_current_app, this also identifies apps that are not listed
+    in APP_PACKAGES.
+
+    Args:
+        device_id: Optional HDC device ID for multi-device setups.
+
+    Returns:
+        The bundle name, or None if it cannot be determined.
+    """
+    hdc_prefix = _get_hdc_prefix(device_id)
+
+    result = await _run_hdc_command_async(
+        hdc_prefix + ["shell", "hidumper", "-s", "WindowManagerService", "-a", "-a"],
+        capture_output=True,
+        encoding="utf-8",
+    )
+    return _parse_current_package(result.stdout or "")
+
+
+def _parse_current_package(output: str) -> str | None:
+    """Extract the focused bundle name from `hidumper` window output."""
+    for line in output.split("\n"):
+        if "focused" in line.lower() or "current" in line.lower():
+            match = _BUNDLE_RE.search(line)
+            if match:
+                return match.group(0)
+    return None
+
+
+async def _input(device_id: str | None, args: list[str], delay: float) -> None:
+    """Run one ``uitest uiInput`` command and wait for the UI to settle."""
+    await _run_hdc_command_async(
+        _get_hdc_prefix(device_id) + ["shell", "uitest", "uiInput"] + args,
+        capture_output=True,
+    )
+    await asyncio.sleep(delay)
+
+
+async def tap(
+    x: int, y: int, device_id: str | None = None, delay: float | None = None
+) -> None:
+    """Tap at the specified coordinates."""
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_tap_delay
+    await _input(device_id, ["click", str(x), str(y)], delay)
+
+
+async def double_tap(
+    x: int, y: int, device_id: str | None = None, delay: float | None = None
+) -> None:
+    """Double tap at the specified coordinates."""
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_double_tap_delay
+    await _input(device_id, ["doubleClick", str(x), str(y)], delay)
+
+
+async def long_press(
+    x: int,
+    y: int,
+    duration_ms: int = 3000,
+    device_id: str | None = None,
+    delay: float | None = None,
+) -> None:
+    """Long press at the specified coordinates (duration is fixed by longClick)."""
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_long_press_delay
+    await _input(device_id, ["longClick", str(x), str(y)], delay)
+
+
+async def swipe(
+    start_x: int,
+    start_y: int,
+    end_x: int,
+    end_y: int,
+    duration_ms: int | None = None,
+    device_id: str | None = None,
+    delay: float | None = None,
+) -> None:
+    """Swipe from start to end coordinates."""
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_swipe_delay
+
+    if duration_ms is None:
+        # Calculate duration based on distance
+        dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
+        duration_ms = int(dist_sq / 1000)
+        duration_ms = max(500, min(duration_ms, 1000))  # Clamp between 500-1000ms
+
+    await _input(
+        device_id,
+        ["swipe", str(start_x), str(start_y), str(end_x), str(end_y), str(duration_ms)],
+        delay,
+    )
+
+
+async def back(device_id: str | None = None, delay: float | None = None) -> None:
+    """Press the back button."""
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_back_delay
+    await _input(device_id, ["keyEvent", "Back"], delay)
+
+
+async def home(device_id: str | None = None, delay: float | None = None) -> None:
+    """Press the home button."""
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_home_delay
+    await _input(device_id, ["keyEvent", "Home"], delay)
+
+
+async def launch_app(
+    app_name: str, device_id: str | None = None, delay: float | None = None
+) -> bool:
+    """
+    Launch an app by name.
+
+    Args:
+        app_name: The app name (must be in APP_PACKAGES).
+        device_id: Optional HDC device ID.
+        delay: Delay in seconds after launching. If None, uses configured default.
+
+    Returns:
+        True if app was launched, False if app not found.
+    """
+    if delay is None:
+        delay = get_timing_config(device_id).device.default_launch_delay
+
+    if app_name not in APP_PACKAGES:
+        print(f"[HDC] App '{app_name}' not found in HarmonyOS app list")
+        print(f"[HDC] Available apps: {', '.join(sorted(APP_PACKAGES.keys())[:10])}...")
+        return False
+
+    bundle = APP_PACKAGES[app_name]
+    ability = APP_ABILITIES.get(bundle, "EntryAbility")
+
+    await _run_hdc_command_async(
+        _get_hdc_prefix(device_id)
+        + ["shell", "aa", "start", "-b", bundle, "-a", ability],
+        capture_output=True,
+    )
+    await asyncio.sleep(delay)
+    return True
+
+
+async def type_text(text: str, device_id: str | None = None) -> None:
+    """
+    Type text into the currently focused input field.
+
+    All lines and ENTER keys are sent in a single hdc shell invocation.
+
+    Args:
+        text: The text to type. Supports multi-line text with newline characters.
+        device_id: Optional HDC device ID for multi-device setups.
+    """
+    commands = _build_type_text_commands(text)
+    if not commands:
+        return
+    await _run_hdc_command_async(
+        _get_hdc_prefix(device_id) + ["shell", _build_shell_sequence(commands)],
+        capture_output=True,
+        text=True,
+    )
+
+
+def _build_type_text_commands(text: str) -> list[list[str]]:
+    """
+    Build the device-side commands that type the given text.
+
+    Args:
+        text: The text to type, possibly containing newlines.
+
+    Returns:
+        List of uitest commands, one per non-empty line plus one ENTER
+        keyEvent between consecutive lines.
+    """
+    commands = []
+    lines = text.split("\n")
+    for i, line in enumerate(lines):
+        if line:  # Only process non-empty lines
+            commands.append(["uitest", "uiInput", "text", line])
+
+        # Send ENTER key event after each line except the last one
+        if i < len(lines) - 1:
+            commands.append(
+                ["uitest", "uiInput", "keyEvent", str(HARMONY_KEYCODES["ENTER"])]
+            )
+    return commands
+
+
+async def clear_text(device_id: str | None = None) -> None:
+    """Clear text in the currently focused input field (select all + delete)."""
+    await _run_hdc_command_async(
+        _get_hdc_prefix(device_id)
+        + ["shell", _build_shell_sequence(_CLEAR_TEXT_COMMANDS)],
+        capture_output=True,
+        text=True,
+    )
+
+
+async def press_keys(keycodes: list[str | int], device_id: str | None = None) -> None:
+    """
+    Press a sequence of keys in a single hdc shell invocation.
+
+    Args:
+        keycodes: Android key codes, translated to HarmonyOS key codes.
+        device_id: Optional HDC device ID.
+    """
+    commands = []
+    for keycode in keycodes:
+        harmony_code = to_harmony_keycode(keycode)
+        if harmony_code is None:
+            print(f"[HDC] Key {keycode} has no HarmonyOS equivalent, skipped")
+            continue
+        commands.append(["uitest", "uiInput", "keyEvent", str(harmony_code)])
+    if not commands:
+        return
+
+    await _run_hdc_command_async(
+        _get_hdc_prefix(device_id) + ["shell", _build_shell_sequence(commands)],
+        capture_output=True,
+    )
+
+
+async def get_current_ime(device_id: str | None = None) -> str:
+    """
+    Get the currently selected input method.
+
+    Args:
+        device_id: Optional HDC device ID for multi-device setups.
+
+    Returns:
+        The IME identifier, or an empty string if it cannot be queried.
+    """
+    try:
+        result = await _run_hdc_command_async(
+            _get_hdc_prefix(device_id)
+            + ["shell", "settings", "get", "secure", "default_input_method"],
+            capture_output=True,
+            text=True,
+        )
+        return (result.stdout + result.stderr).strip()
+    except Exception:
+        return ""
+
+
+async def wait_for_ime(
+    ime: str,
+    device_id: str | None = None,
+    timeout: float | None = None,
+    poll_interval: float | None = None,
+) -> bool:
+    """
+    Wait until the given IME is reported as the selected input method.
+
+    Args:
+        ime: The IME identifier to wait for.
+        device_id: Optional HDC device ID for multi-device setups.
+        timeout: Maximum time to wait in seconds. If None, uses configured default.
+        poll_interval: Time between checks in seconds. If None, uses configured default.
+
+    Returns:
+        True if the IME became active within the timeout, False otherwise.
+    """
+    if not ime:
+        return True
+
+    if timeout is None:
+        timeout = get_timing_config(device_id).action.ime_ready_timeout
+    if poll_interval is None:
+        poll_interval = get_timing_config(device_id).action.ime_poll_interval
+
+    deadline = time.monotonic() + timeout
+    while True:
+        if ime in await get_current_ime(device_id):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(poll_interval)
+
+
+async def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
+    """
+    Return the current IME; HarmonyOS has no ADB Keyboard equivalent yet.
+
+    Args:
+        device_id: Optional HDC device ID for multi-device setups.
+
+    Returns:
+        The original keyboard IME identifier for later restoration.
+    """
+    return await get_current_ime(device_id)
+
+
+async def restore_keyboard(ime: str, device_id: str | None = None) -> None:
+    """
+    Restore the original keyboard IME.
+
+    Args:
+        ime: The IME identifier to restore.
+        device_id: Optional HDC device ID for multi-device setups.
+    """
+    if not ime:
+        return
+
+    try:
+        await _run_hdc_command_async(
+            _get_hdc_prefix(device_id) + ["shell", "ime", "set", ime],
+            capture_output=True,
+            text=True,
+        )
+    except Exception:
+        pass
+
+
+def _get_hdc_prefix(device_id: str | None) -> list:
+    """Get HDC command prefix with optional device specifier."""
+    if device_id:
+        return ["hdc", "-t", device_id]
+    return ["hdc"]
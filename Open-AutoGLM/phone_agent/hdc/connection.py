@@ -1,12 +1,14 @@
 """HDC connection management for HarmonyOS devices."""
 
 import os
+import shlex
 import subprocess
 import time
 from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
+from phone_agent.command_runner import run_command, run_command_async
 from phone_agent.config.timing import TIMING_CONFIG
 
 
@@ -18,9 +20,13 @@ def _run_hdc_command(cmd: list, **kwargs) -> subprocess.CompletedProcess:
     """
     Run HDC command with optional verbose output.
 
+    Commands go through the shared command runner, so they get a default
+    timeout, honour the current step deadline and cancellation token, and
+    are killed (with their children) on timeout.
+
     Args:
         cmd: Command list to execute.
-        **kwargs: Additional arguments for subprocess.run.
+        **kwargs: Additional arguments for run_command.
 
     Returns:
         CompletedProcess result.
@@ -28,7 +34,7 @@ def _run_hdc_command(cmd: list, **kwargs) -> subprocess.CompletedProcess:
     if _HDC_VERBOSE:
         print(f"[HDC] Running command: {' '.join(cmd)}")
 
-    result = subprocess.run(cmd, **kwargs)
+    result = run_command(cmd, **kwargs)
 
     if _HDC_VERBOSE and result.returncode != 0:
         print(f"[HDC] Command failed with return code {result.returncode}")
@@ -38,6 +44,46 @@ def _run_hdc_command(cmd: list, **kwargs) -> subprocess.CompletedProcess:
     return result
 
 
+async def _run_hdc_command_async(cmd: list, **kwargs) -> subprocess.CompletedProcess:
+    """
+    Async counterpart of _run_hdc_command.
+
+    Args:
+        cmd: Command list to execute.
+        **kwargs: Additional arguments for run_command_async.
+
+    Returns:
+        CompletedProcess result.
+    """
+    if _HDC_VERBOSE:
+        print(f"[HDC] Running command: {' '.join(cmd)}")
+
+    result = await run_command_async(cmd, **kwargs)
+
+    if _HDC_VERBOSE and result.returncode != 0:
+        print(f"[HDC] Command failed with return code {result.returncode}")
+        if result.stderr:
+            print(f"[HDC] Error: {result.stderr}")
+
+    return result
+
+
+def _build_shell_sequence(commands: list[list[str]]) -> str:
+    """
+    Compile several device-side commands into one shell command line.
+
+    Each argument is quoted for the device shell, so text containing
+    spaces, quotes, ``$`` or backslashes reaches the command verbatim.
+
+    Args:
+        commands: List of commands, each given as a list of arguments.
+
+    Returns:
+        A single shell command line running the commands in order.
+    """
+    return "; ".join(" ".join(shlex.quote(arg) for arg in cmd) for cmd in commands)
+
+
 def set_hdc_verbose(verbose: bool):
     """Set HDC verbose mode globally."""
     global _HDC_VERBOSE
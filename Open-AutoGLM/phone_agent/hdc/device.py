@@ -1,13 +1,11 @@
-"""Device control utilities for HarmonyOS automation."""
+"""Device control utilities for HarmonyOS automation.
 
-import os
-import subprocess
-import time
-from typing import List, Optional, Tuple
+The commands are implemented once, as coroutines in ``phone_agent.hdc.aio``;
+the functions here run them for blocking callers.
+"""
 
-from phone_agent.config.apps_harmonyos import APP_ABILITIES, APP_PACKAGES
-from phone_agent.config.timing import TIMING_CONFIG
-from phone_agent.hdc.connection import _run_hdc_command
+from phone_agent.command_runner import run_blocking
+from phone_agent.hdc import aio
 
 
 def get_current_app(device_id: str | None = None) -> str:
@@ -20,26 +18,20 @@ def get_current_app(device_id: str | None = None) -> str:
     Returns:
         The app name if recognized, otherwise "System Home".
     """
-    hdc_prefix = _get_hdc_prefix(device_id)
+    return run_blocking(aio.get_current_app(device_id))
 
-    result = _run_hdc_command(
-        hdc_prefix + ["shell", "hidumper", "-s", "WindowManagerService", "-a", "-a"],
-        capture_output=True,
-        text=True,
-        encoding="utf-8"
-    )
-    output = result.stdout
-    if not output:
-        raise ValueError("No output from hidumper")
 
-    # Parse window focus info
-    for line in output.split("\n"):
-        if "focused" in line.lower() or "current" in line.lower():
-            for app_name, package in APP_PACKAGES.items():
-                if package in line:
-                    return app_name
+def get_current_package(device_id: str | None = None) -> str | None:
+    """
+    Get the bundle name of the focused app.
 
-    return "System Home"
+    Args:
+        device_id: Optional HDC device ID for multi-device setups.
+
+    Returns:
+        The bundle name, or None if it cannot be determined.
+    """
+    return run_blocking(aio.get_current_package(device_id))
 
 
 def tap(
@@ -54,17 +46,7 @@ def tap(
         device_id: Optional HDC device ID.
         delay: Delay in seconds after tap. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_tap_delay
-
-    hdc_prefix = _get_hdc_prefix(device_id)
-
-    # HarmonyOS uses uitest uiInput click
-    _run_hdc_command(
-        hdc_prefix + ["shell", "uitest", "uiInput", "click", str(x), str(y)],
-        capture_output=True
-    )
-    time.sleep(delay)
+    run_blocking(aio.tap(x, y, device_id, delay))
 
 
 def double_tap(
@@ -79,17 +61,7 @@ def double_tap(
         device_id: Optional HDC device ID.
         delay: Delay in seconds after double tap. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_double_tap_delay
-
-    hdc_prefix = _get_hdc_prefix(device_id)
-
-    # HarmonyOS uses uitest uiInput doubleClick
-    _run_hdc_command(
-        hdc_prefix + ["shell", "uitest", "uiInput", "doubleClick", str(x), str(y)],
-        capture_output=True
-    )
-    time.sleep(delay)
+    run_blocking(aio.double_tap(x, y, device_id, delay))
 
 
 def long_press(
@@ -109,18 +81,7 @@ def long_press(
         device_id: Optional HDC device ID.
         delay: Delay in seconds after long press. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_long_press_delay
-
-    hdc_prefix = _get_hdc_prefix(device_id)
-
-    # HarmonyOS uses uitest uiInput longClick
-    # Note: longClick may have a fixed duration, duration_ms parameter might not be supported
-    _run_hdc_command(
-        hdc_prefix + ["shell", "uitest", "uiInput", "longClick", str(x), str(y)],
-        capture_output=True,
-    )
-    time.sleep(delay)
+    run_blocking(aio.long_press(x, y, duration_ms, device_id, delay))
 
 
 def swipe(
@@ -144,35 +105,9 @@ def swipe(
         device_id: Optional HDC device ID.
         delay: Delay in seconds after swipe. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_swipe_delay
-
-    hdc_prefix = _get_hdc_prefix(device_id)
-
-    if duration_ms is None:
-        # Calculate duration based on distance
-        dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
-        duration_ms = int(dist_sq / 1000)
-        duration_ms = max(500, min(duration_ms, 1000))  # Clamp between 500-1000ms
-
-    # HarmonyOS uses uitest uiInput swipe
-    # Format: swipe startX startY endX endY duration
-    _run_hdc_command(
-        hdc_prefix
-        + [
-            "shell",
-            "uitest",
-            "uiInput",
-            "swipe",
-            str(start_x),
-            str(start_y),
-            str(end_x),
-            str(end_y),
-            str(duration_ms),
-        ],
-        capture_output=True,
+    run_blocking(
+        aio.swipe(start_x, start_y, end_x, end_y, duration_ms, device_id, delay)
     )
-    time.sleep(delay)
 
 
 def back(device_id: str | None = None, delay: float | None = None) -> None:
@@ -183,17 +118,7 @@ def back(device_id: str | None = None, delay: float | None = None) -> None:
         device_id: Optional HDC device ID.
         delay: Delay in seconds after pressing back. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_back_delay
-
-    hdc_prefix = _get_hdc_prefix(device_id)
-
-    # HarmonyOS uses uitest uiInput keyEvent Back
-    _run_hdc_command(
-        hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "Back"],
-        capture_output=True
-    )
-    time.sleep(delay)
+    run_blocking(aio.back(device_id, delay))
 
 
 def home(device_id: str | None = None, delay: float | None = None) -> None:
@@ -204,17 +129,7 @@ def home(device_id: str | None = None, delay: float | None = None) -> None:
         device_id: Optional HDC device ID.
         delay: Delay in seconds after pressing home. If None, uses configured default.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_home_delay
-
-    hdc_prefix = _get_hdc_prefix(device_id)
-
-    # HarmonyOS uses uitest uiInput keyEvent Home
-    _run_hdc_command(
-        hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "Home"],
-        capture_output=True
-    )
-    time.sleep(delay)
+    run_blocking(aio.home(device_id, delay))
 
 
 def launch_app(
@@ -231,42 +146,17 @@ def launch_app(
     Returns:
         True if app was launched, False if app not found.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_launch_delay
-
-    if app_name not in APP_PACKAGES:
-        print(f"[HDC] App '{app_name}' not found in HarmonyOS app list")
-        print(f"[HDC] Available apps: {', '.join(sorted(APP_PACKAGES.keys())[:10])}...")
-        return False
-
-    hdc_prefix = _get_hdc_prefix(device_id)
-    bundle = APP_PACKAGES[app_name]
-
-    # Get the ability name for this bundle
-    # Default to "EntryAbility" if not specified in APP_ABILITIES
-    ability = APP_ABILITIES.get(bundle, "EntryAbility")
-
-    # HarmonyOS uses 'aa start' command to launch apps
-    # Format: aa start -b {bundle} -a {ability}
-    _run_hdc_command(
-        hdc_prefix
-        + [
-            "shell",
-            "aa",
-            "start",
-            "-b",
-            bundle,
-            "-a",
-            ability,
-        ],
-        capture_output=True,
-    )
-    time.sleep(delay)
-    return True
+    return run_blocking(aio.launch_app(app_name, device_id, delay))
 
 
-def _get_hdc_prefix(device_id: str | None) -> list:
-    """Get HDC command prefix with optional device specifier."""
-    if device_id:
-        return ["hdc", "-t", device_id]
-    return ["hdc"]
+def press_keys(keycodes: list[str | int], device_id: str | None = None) -> None:
+    """
+    Press a sequence of keys in a single hdc shell invocation.
+
+    Args:
+        keycodes: Android key codes, as names ("KEYCODE_ENTER") or numbers (66).
+            They are translated to HarmonyOS key codes; keys without a
+            HarmonyOS equivalent are skipped with a warning.
+        device_id: Optional HDC device ID.
+    """
+    run_blocking(aio.press_keys(keycodes, device_id))
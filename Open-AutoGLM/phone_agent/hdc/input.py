@@ -1,10 +1,7 @@
 """Input utilities for HarmonyOS device text input."""
 
-import base64
-import subprocess
-from typing import Optional
-
-from phone_agent.hdc.connection import _run_hdc_command
+from phone_agent.command_runner import run_blocking
+from phone_agent.hdc import aio
 
 
 def type_text(text: str, device_id: str | None = None) -> None:
@@ -18,49 +15,12 @@ def type_text(text: str, device_id: str | None = None) -> None:
     Note:
         HarmonyOS uses: hdc shell uitest uiInput text "文本内容"
         This command works without coordinates when input field is focused.
-        For multi-line text, the function splits by newlines and sends ENTER keyEvents.
+        For multi-line text, each line is typed and followed by an ENTER keyEvent.
+        All lines and ENTER keys are sent in a single hdc shell invocation.
         ENTER key code in HarmonyOS: 2054
         Recommendation: Click on the input field first to focus it, then use this function.
     """
-    hdc_prefix = _get_hdc_prefix(device_id)
-
-    # Handle multi-line text by splitting on newlines
-    if '\n' in text:
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            if line:  # Only process non-empty lines
-                # Escape special characters for shell
-                escaped_line = line.replace('"', '\\"').replace("$", "\\$")
-
-                _run_hdc_command(
-                    hdc_prefix + ["shell", "uitest", "uiInput", "text", escaped_line],
-                    capture_output=True,
-                    text=True,
-                )
-
-            # Send ENTER key event after each line except the last one
-            if i < len(lines) - 1:
-                try:
-                    _run_hdc_command(
-                        hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "2054"],
-                        capture_output=True,
-                        text=True,
-                    )
-                except Exception as e:
-                    print(f"[HDC] ENTER keyEvent failed: {e}")
-    else:
-        # Single line text - original logic
-        # Escape special characters for shell (keep quotes for proper text handling)
-        # The text will be wrapped in quotes in the command
-        escaped_text = text.replace('"', '\\"').replace("$", "\\$")
-
-        # HarmonyOS uitest uiInput text command
-        # Format: hdc shell uitest uiInput text "文本内容"
-        _run_hdc_command(
-            hdc_prefix + ["shell", "uitest", "uiInput", "text", escaped_text],
-            capture_output=True,
-            text=True,
-        )
+    run_blocking(aio.type_text(text, device_id))
 
 
 def clear_text(device_id: str | None = None) -> None:
@@ -74,19 +34,7 @@ def clear_text(device_id: str | None = None) -> None:
         This method uses repeated delete key events to clear text.
         For HarmonyOS, you might also use select all + delete for better efficiency.
     """
-    hdc_prefix = _get_hdc_prefix(device_id)
-    # Ctrl+A to select all (key code 2072 for Ctrl, 2017 for A)
-    # Then delete
-    _run_hdc_command(
-        hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "2072", "2017"],
-        capture_output=True,
-        text=True,
-    )
-    _run_hdc_command(
-        hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "2055"],  # Delete key
-        capture_output=True,
-        text=True,
-    )
+    run_blocking(aio.clear_text(device_id))
 
 
 def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
@@ -103,47 +51,49 @@ def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
         This is a placeholder. HarmonyOS may not support ADB Keyboard.
         If there's a similar tool for HarmonyOS, integrate it here.
     """
-    hdc_prefix = _get_hdc_prefix(device_id)
+    return run_blocking(aio.detect_and_set_adb_keyboard(device_id))
 
-    # Get current IME (if HarmonyOS supports this)
-    try:
-        result = _run_hdc_command(
-            hdc_prefix + ["shell", "settings", "get", "secure", "default_input_method"],
-            capture_output=True,
-            text=True,
-        )
-        current_ime = (result.stdout + result.stderr).strip()
 
-        # If ADB Keyboard equivalent exists for HarmonyOS, switch to it
-        # For now, we'll just return the current IME
-        return current_ime
-    except Exception:
-        return ""
+def get_current_ime(device_id: str | None = None) -> str:
+    """
+    Get the currently selected input method.
 
+    Args:
+        device_id: Optional HDC device ID for multi-device setups.
 
-def restore_keyboard(ime: str, device_id: str | None = None) -> None:
+    Returns:
+        The IME identifier, or an empty string if it cannot be queried.
     """
-    Restore the original keyboard IME.
+    return run_blocking(aio.get_current_ime(device_id))
+
+
+def wait_for_ime(
+    ime: str,
+    device_id: str | None = None,
+    timeout: float | None = None,
+    poll_interval: float | None = None,
+) -> bool:
+    """
+    Wait until the given IME is reported as the selected input method.
 
     Args:
-        ime: The IME identifier to restore.
+        ime: The IME identifier to wait for.
         device_id: Optional HDC device ID for multi-device setups.
-    """
-    if not ime:
-        return
+        timeout: Maximum time to wait in seconds. If None, uses configured default.
+        poll_interval: Time between checks in seconds. If None, uses configured default.
 
-    hdc_prefix = _get_hdc_prefix(device_id)
+    Returns:
+        True if the IME became active within the timeout, False otherwise.
+    """
+    return run_blocking(aio.wait_for_ime(ime, device_id, timeout, poll_interval))
 
-    try:
-        _run_hdc_command(
-            hdc_prefix + ["shell", "ime", "set", ime], capture_output=True, text=True
-        )
-    except Exception:
-        pass
 
+def restore_keyboard(ime: str, device_id: str | None = None) -> None:
+    """
+    Restore the original keyboard IME.
 
-def _get_hdc_prefix(device_id: str | None) -> list:
-    """Get HDC command prefix with optional device specifier."""
-    if device_id:
-        return ["hdc", "-t", device_id]
-    return ["hdc"]
+    Args:
+        ime: The IME identifier to restore.
+        device_id: Optional HDC device ID for multi-device setups.
+    """
+    run_blocking(aio.restore_keyboard(ime, device_id))
@@ -0,0 +1,221 @@
+"""Android to HarmonyOS key code mapping.
+
+The agent and its actions speak Android key codes ("KEYCODE_ENTER" or
+"66"); ``uitest uiInput keyEvent`` expects HarmonyOS KeyCode values
+(``@ohos.multimodalInput.keyCode``). This table covers every key the two
+platforms have in common.
+"""
+
+import string
+
+# Android KeyEvent values, by name without the KEYCODE_ prefix
+ANDROID_KEYCODES: dict[str, int] = {
+    "HOME": 3,
+    "BACK": 4,
+    "CALL": 5,
+    "ENDCALL": 6,
+    **{str(d): 7 + d for d in range(10)},
+    "STAR": 17,
+    "POUND": 18,
+    "DPAD_UP": 19,
+    "DPAD_DOWN": 20,
+    "DPAD_LEFT": 21,
+    "DPAD_RIGHT": 22,
+    "DPAD_CENTER": 23,
+    "VOLUME_UP": 24,
+    "VOLUME_DOWN": 25,
+    "POWER": 26,
+    "CAMERA": 27,
+    **{c: 29 + i for i, c in enumerate(string.ascii_uppercase)},
+    "COMMA": 55,
+    "PERIOD": 56,
+    "ALT_LEFT": 57,
+    "ALT_RIGHT": 58,
+    "SHIFT_LEFT": 59,
+    "SHIFT_RIGHT": 60,
+    "TAB": 61,
+    "SPACE": 62,
+    "SYM": 63,
+    "EXPLORER": 64,
+    "ENVELOPE": 65,
+    "ENTER": 66,
+    "DEL": 67,
+    "GRAVE": 68,
+    "MINUS": 69,
+    "EQUALS": 70,
+    "LEFT_BRACKET": 71,
+    "RIGHT_BRACKET": 72,
+    "BACKSLASH": 73,
+    "SEMICOLON": 74,
+    "APOSTROPHE": 75,
+    "SLASH": 76,
+    "AT": 77,
+    "PLUS": 81,
+    "MENU": 82,
+    "MEDIA_PLAY_PAUSE": 85,
+    "MEDIA_STOP": 86,
+    "MEDIA_NEXT": 87,
+    "MEDIA_PREVIOUS": 88,
+    "MEDIA_REWIND": 89,
+    "MEDIA_FAST_FORWARD": 90,
+    "MUTE": 91,
+    "PAGE_UP": 92,
+    "PAGE_DOWN": 93,
+    "ESCAPE": 111,
+    "FORWARD_DEL": 112,
+    "CTRL_LEFT": 113,
+    "CTRL_RIGHT": 114,
+    "CAPS_LOCK": 115,
+    "SCROLL_LOCK": 116,
+    "META_LEFT": 117,
+    "META_RIGHT": 118,
+    "FUNCTION": 119,
+    "SYSRQ": 120,
+    "BREAK": 121,
+    "MOVE_HOME": 122,
+    "MOVE_END": 123,
+    "INSERT": 124,
+    "FORWARD": 125,
+    "MEDIA_PLAY": 126,
+    "MEDIA_PAUSE": 127,
+    "MEDIA_CLOSE": 128,
+    "MEDIA_EJECT": 129,
+    "MEDIA_RECORD": 130,
+    **{f"F{n}": 130 + n for n in range(1, 13)},
+    "NUM_LOCK": 143,
+    **{f"NUMPAD_{d}": 144 + d for d in range(10)},
+    "NUMPAD_DIVIDE": 154,
+    "NUMPAD_MULTIPLY": 155,
+    "NUMPAD_SUBTRACT": 156,
+    "NUMPAD_ADD": 157,
+    "NUMPAD_DOT": 158,
+    "NUMPAD_COMMA": 159,
+    "NUMPAD_ENTER": 160,
+    "NUMPAD_EQUALS": 161,
+    "NUMPAD_LEFT_PAREN": 162,
+    "NUMPAD_RIGHT_PAREN": 163,
+    "VOLUME_MUTE": 164,
+    "BRIGHTNESS_DOWN": 220,
+    "BRIGHTNESS_UP": 221,
+}
+
+# HarmonyOS KeyCode values, by the same names
+HARMONY_KEYCODES: dict[str, int] = {
+    "HOME": 1,
+    "BACK": 2,
+    "MEDIA_PLAY_PAUSE": 10,
+    "MEDIA_STOP": 11,
+    "MEDIA_NEXT": 12,
+    "MEDIA_PREVIOUS": 13,
+    "MEDIA_REWIND": 14,
+    "MEDIA_FAST_FORWARD": 15,
+    "VOLUME_UP": 16,
+    "VOLUME_DOWN": 17,
+    "POWER": 18,
+    "CAMERA": 19,
+    "VOLUME_MUTE": 22,
+    "MUTE": 23,
+    "BRIGHTNESS_UP": 40,
+    "BRIGHTNESS_DOWN": 41,
+    **{str(d): 2000 + d for d in range(10)},
+    "STAR": 2010,
+    "POUND": 2011,
+    "DPAD_UP": 2012,
+    "DPAD_DOWN": 2013,
+    "DPAD_LEFT": 2014,
+    "DPAD_RIGHT": 2015,
+    "DPAD_CENTER": 2016,
+    **{c: 2017 + i for i, c in enumerate(string.ascii_uppercase)},
+    "COMMA": 2043,
+    "PERIOD": 2044,
+    "ALT_LEFT": 2045,
+    "ALT_RIGHT": 2046,
+    "SHIFT_LEFT": 2047,
+    "SHIFT_RIGHT": 2048,
+    "TAB": 2049,
+    "SPACE": 2050,
+    "SYM": 2051,
+    "EXPLORER": 2052,
+    "ENVELOPE": 2053,
+    "ENTER": 2054,
+    "DEL": 2055,
+    "GRAVE": 2056,
+    "MINUS": 2057,
+    "EQUALS": 2058,
+    "LEFT_BRACKET": 2059,
+    "RIGHT_BRACKET": 2060,
+    "BACKSLASH": 2061,
+    "SEMICOLON": 2062,
+    "APOSTROPHE": 2063,
+    "SLASH": 2064,
+    "AT": 2065,
+    "PLUS": 2066,
+    "MENU": 2067,
+    "PAGE_UP": 2068,
+    "PAGE_DOWN": 2069,
+    "ESCAPE": 2070,
+    "FORWARD_DEL": 2071,
+    "CTRL_LEFT": 2072,
+    "CTRL_RIGHT": 2073,
+    "CAPS_LOCK": 2074,
+    "SCROLL_LOCK": 2075,
+    "META_LEFT": 2076,
+    "META_RIGHT": 2077,
+    "FUNCTION": 2078,
+    "SYSRQ": 2079,
+    "BREAK": 2080,
+    "MOVE_HOME": 2081,
+    "MOVE_END": 2082,
+    "INSERT": 2083,
+    "FORWARD": 2084,
+    "MEDIA_PLAY": 2085,
+    "MEDIA_PAUSE": 2086,
+    "MEDIA_CLOSE": 2087,
+    "MEDIA_EJECT": 2088,
+    "MEDIA_RECORD": 2089,
+    **{f"F{n}": 2089 + n for n in range(1, 13)},
+    "NUM_LOCK": 2102,
+    **{f"NUMPAD_{d}": 2103 + d for d in range(10)},
+    "NUMPAD_DIVIDE": 2113,
+    "NUMPAD_MULTIPLY": 2114,
+    "NUMPAD_SUBTRACT": 2115,
+    "NUMPAD_ADD": 2116,
+    "NUMPAD_DOT": 2117,
+    "NUMPAD_COMMA": 2118,
+    "NUMPAD_ENTER": 2119,
+    "NUMPAD_EQUALS": 2120,
+    "NUMPAD_LEFT_PAREN": 2121,
+    "NUMPAD_RIGHT_PAREN": 2122,
+}
+
+# Android key code value -> HarmonyOS key code value
+ANDROID_TO_HARMONY: dict[int, int] = {
+    value: HARMONY_KEYCODES[name]
+    for name, value in ANDROID_KEYCODES.items()
+    if name in HARMONY_KEYCODES
+}
+
+
+def to_harmony_keycode(keycode: str | int) -> int | None:
+    """
+    Convert an Android key code to the HarmonyOS equivalent.
+
+    Args:
+        keycode: Android key code as a name ("KEYCODE_ENTER", "ENTER") or a
+            number (66, "66").
+
+    Returns:
+        The HarmonyOS key code, or None if the key has no equivalent.
+
+    Example:
+        >>> to_harmony_keycode("KEYCODE_ENTER")
+        2054
+        >>> to_harmony_keycode(4)
+        2
+    """
+    key = str(keycode).strip().upper()
+    if key.startswith("KEYCODE_"):
+        key = key[len("KEYCODE_") :]
+    elif key.isdigit():
+        return ANDROID_TO_HARMONY.get(int(key))
+    return HARMONY_KEYCODES.get(key) if key in ANDROID_KEYCODES else None
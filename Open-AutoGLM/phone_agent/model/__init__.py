@@ -1,5 +1,46 @@
 """Model client module for AI inference."""
 
-from phone_agent.model.client import ModelClient, ModelConfig
+from phone_agent.model.async_client import (
+    ActionComplete,
+    AsyncModelClient,
+    StreamEvent,
+    StreamStalledError,
+    ThinkingDelta,
+    Timing,
+    Usage,
+    get_stall_events,
+    request_labels,
+)
+from phone_agent.model.batching import BatchDispatcher, configure_batching
+from phone_agent.model.cascade import ModelCascade
+from phone_agent.model.client import ModelClient, ModelConfig, ModelEndpoint
+from phone_agent.model.rate_limit import RateLimiter, configure_rate_limit
+from phone_agent.model.response_cache import ResponseCache, get_response_cache
+from phone_agent.model.retry import CircuitOpenError, Retry, RetryPolicy
+from phone_agent.model.router import ModelRouter
 
-__all__ = ["ModelClient", "ModelConfig"]
+__all__ = [
+    "ModelClient",
+    "ModelConfig",
+    "ModelEndpoint",
+    "ModelRouter",
+    "ModelCascade",
+    "RateLimiter",
+    "configure_rate_limit",
+    "BatchDispatcher",
+    "configure_batching",
+    "ResponseCache",
+    "get_response_cache",
+    "RetryPolicy",
+    "Retry",
+    "CircuitOpenError",
+    "AsyncModelClient",
+    "StreamEvent",
+    "ThinkingDelta",
+    "ActionComplete",
+    "Usage",
+    "Timing",
+    "StreamStalledError",
+    "request_labels",
+    "get_stall_events",
+]
@@ -0,0 +1,499 @@
+"""Asyncio model client with streaming events.
+
+``AsyncModelClient.stream`` yields typed events while the response arrives,
+so one event loop can run inference for many agents concurrently and
+forward thinking tokens (e.g. to a browser) as they are generated:
+
+- ThinkingDelta: a piece of thinking text that is safe to display
+- ActionComplete: the parsed thinking and action, once the action is known
+- Usage: token counts, when the server reports them
+- Timing: time to first token, to the end of thinking and in total
+
+Every wait on the server is bounded by the deadlines of ``ModelConfig``
+(first token, between chunks, whole response). When one expires the stream
+is closed and ``StreamStalledError`` raised, which the retry and routing
+layers treat like a dropped connection. Stalls are recorded with the
+provider and the labels set by ``request_labels``, e.g. the agent step.
+
+With ``ModelConfig.response_cache`` enabled, temperature 0 responses are
+cached and replayed through the same parser (see ``model.response_cache``).
+
+The blocking ``ModelClient`` is a thin wrapper that consumes the same events
+on a background event loop.
+
+Example:
+    >>> client = AsyncModelClient(ModelConfig(base_url="http://localhost:8000/v1"))
+    >>> async for event in client.stream(messages):
+    ...     if isinstance(event, ThinkingDelta):
+    ...         print(event.text, end="")
+    ...     elif isinstance(event, ActionComplete):
+    ...         print(event.action)
+"""
+
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Coroutine, Iterator, TypeVar
+
+from phone_agent import command_runner
+from phone_agent.model.batching import configure_batching, get_dispatcher
+from phone_agent.model.client import ModelConfig, ModelResponse
+from phone_agent.model.client_pool import get_async_openai_client
+from phone_agent.model.rate_limit import configure_rate_limit, get_rate_limiter
+from phone_agent.model.response_cache import (
+    CachedResponse,
+    cache_key,
+    get_response_cache,
+)
+from phone_agent.model.retry import Retry, stream_with_retry
+from phone_agent.model.stream_parser import StreamParser
+
+
+@dataclass
+class ThinkingDelta:
+    """Thinking text received since the previous delta."""
+
+    text: str
+
+
+@dataclass
+class ActionComplete:
+    """The parsed response, emitted once per request."""
+
+    thinking: str
+    action: str
+    raw_content: str
+    # Whether the stream was closed early after a complete action
+    stopped_early: bool = False
+    # Whether the response was replayed from the response cache
+    cached: bool = False
+
+
+@dataclass
+class Usage:
+    """Token usage reported by the server."""
+
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+
+@dataclass
+class Timing:
+    """Latency of the request, emitted last."""
+
+    time_to_first_token: float | None
+    time_to_thinking_end: float | None
+    total_time: float
+
+
+# Retry events only come from streams wrapped with model.retry.stream_with_retry
+StreamEvent = ThinkingDelta | ActionComplete | Usage | Timing | Retry
+
+
+class StreamStalledError(TimeoutError):
+    """The server stopped sending before a stream deadline."""
+
+    def __init__(self, provider: str, phase: str, waited: float):
+        self.provider = provider
+        self.phase = phase
+        self.waited = waited
+        super().__init__(
+            f"Model stream from {provider} stalled: no {phase} after {waited:.1f}s"
+        )
+
+
+# Labels such as the agent step, attached to stall records
+_request_labels: contextvars.ContextVar[dict[str, Any]] = contextvars.ContextVar(
+    "model_request_labels", default={}
+)
+
+# Most recent stalls, oldest first
+_stalls: deque[dict[str, Any]] = deque(maxlen=200)
+
+
+@contextmanager
+def request_labels(**labels: Any) -> Iterator[None]:
+    """
+    Attach labels to the model requests made in this block.
+
+    Example:
+        >>> with request_labels(step=3):
+        ...     model_client.request(messages)
+    """
+    token = _request_labels.set({**_request_labels.get(), **labels})
+    try:
+        yield
+    finally:
+        _request_labels.reset(token)
+
+
+def get_request_labels() -> dict[str, Any]:
+    """The labels set by the enclosing ``request_labels`` blocks."""
+    return dict(_request_labels.get())
+
+
+def get_stall_events() -> list[dict[str, Any]]:
+    """
+    Get the recorded stream stalls.
+
+    Returns:
+        Dicts with time, provider, model, phase ("first token", "token" or
+        "end of response"), seconds waited and the request labels.
+    """
+    return list(_stalls)
+
+
+class AsyncModelClient:
+    """
+    Asyncio client for OpenAI-compatible vision-language models.
+
+    Args:
+        config: Model configuration.
+    """
+
+    def __init__(self, config: ModelConfig | None = None):
+        self.config = config or ModelConfig()
+        if self.config.requests_per_second or self.config.max_concurrent_requests:
+            configure_rate_limit(
+                self.config.base_url,
+                self.config.api_key,
+                requests_per_second=self.config.requests_per_second,
+                max_concurrent=self.config.max_concurrent_requests,
+            )
+        if self.config.batch_window:
+            configure_batching(
+                self.config.base_url,
+                window=self.config.batch_window,
+                max_batch=self.config.batch_max_size,
+            )
+
+    async def stream(
+        self, messages: list[dict[str, Any]]
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Send a request and yield events as the response streams in.
+
+        Args:
+            messages: List of message dictionaries in OpenAI format.
+
+        Yields:
+            ThinkingDelta events, then one ActionComplete, an optional Usage
+            and a final Timing event. Time spent waiting for the provider's
+            batch dispatcher and rate limiter is not included in the timing. Errors are not
+            retried, see ``model.retry.stream_with_retry``. Cache hits
+            yield the same events without contacting the server.
+        """
+        cache = None
+        if self.config.response_cache and self.config.temperature == 0:
+            cache = get_response_cache(self.config.response_cache_dir)
+            key = cache_key(self.config, messages)
+            cached = cache.get(key)
+            if cached is not None:
+                async for event in self._parse(
+                    _replay(cached), cached, time.time(), cached=True
+                ):
+                    yield event
+                return
+
+        limiter = get_rate_limiter(self.config.base_url, self.config.api_key)
+        dispatcher = get_dispatcher(self.config.base_url)
+        if dispatcher is not None:
+            labels = _request_labels.get()
+            system = messages[0].get("content") if messages else None
+            batch_slot = dispatcher.slot(
+                priority=labels.get("priority", 0),
+                agent=labels.get("device"),
+                prefix=hash(str(system)),
+            )
+        else:
+            batch_slot = nullcontext()
+        # The slots are held until the stream is closed
+        async with batch_slot, limiter.slot():
+            received = CachedResponse()
+            start_time = time.time()
+            async for event in self._parse(
+                self._receive(messages, received), received, start_time
+            ):
+                if cache is not None and isinstance(event, ActionComplete):
+                    cache.put(key, received)
+                yield event
+
+    async def _receive(
+        self, messages: list[dict[str, Any]], received: CachedResponse
+    ) -> AsyncIterator[str]:
+        """Send the request and yield the content deltas, recording them."""
+        client = get_async_openai_client(self.config.base_url, self.config.api_key)
+        watchdog = _StreamWatchdog(self.config)
+        stream = await watchdog.wait(
+            client.chat.completions.create(
+                messages=messages,
+                model=self.config.model_name,
+                max_tokens=self.config.max_tokens,
+                temperature=self.config.temperature,
+                top_p=self.config.top_p,
+                frequency_penalty=self.config.frequency_penalty,
+                extra_body=self.config.extra_body,
+                stream=True,
+            )
+        )
+
+        try:
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await watchdog.wait(chunks.__anext__())
+                except StopAsyncIteration:
+                    return
+                usage = getattr(chunk, "usage", None)
+                if usage:
+                    received.usage = {
+                        "prompt_tokens": usage.prompt_tokens,
+                        "completion_tokens": usage.completion_tokens,
+                        "total_tokens": usage.total_tokens,
+                    }
+                if len(chunk.choices) == 0:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content is None:
+                    continue
+                watchdog.first_token_received = True
+                received.chunks.append(content)
+                yield content
+        finally:
+            # Closing the HTTP response makes the server abort the generation
+            await stream.close()
+
+    async def _parse(
+        self,
+        contents: AsyncIterator[str],
+        response: CachedResponse,
+        start_time: float,
+        cached: bool = False,
+    ) -> AsyncIterator[StreamEvent]:
+        """Turn content deltas into events; shared by live and cached responses."""
+        time_to_first_token = None
+        time_to_thinking_end = None
+        parser = StreamParser()
+        stopped_early = False
+
+        try:
+            async for content in contents:
+                if time_to_first_token is None:
+                    time_to_first_token = time.time() - start_time
+
+                was_in_action = parser.in_action
+                thinking = parser.feed(content)
+                if thinking:
+                    yield ThinkingDelta(thinking)
+
+                if parser.in_action and not was_in_action:
+                    time_to_thinking_end = time.time() - start_time
+
+                if parser.action_complete and self.config.stop_on_complete_action:
+                    stopped_early = True
+                    break
+        finally:
+            await contents.aclose()
+
+        if not parser.in_action:
+            thinking = parser.flush()
+            if thinking:
+                yield ThinkingDelta(thinking)
+
+        thinking, action = parser.result()
+        raw_content = parser.raw
+        if stopped_early:
+            raw_content = raw_content[: parser.raw_action_end]
+        yield ActionComplete(
+            thinking=thinking,
+            action=action,
+            raw_content=raw_content,
+            stopped_early=stopped_early,
+            cached=cached,
+        )
+
+        if response.usage is not None:
+            yield Usage(**response.usage)
+
+        yield Timing(
+            time_to_first_token=time_to_first_token,
+            time_to_thinking_end=time_to_thinking_end,
+            total_time=time.time() - start_time,
+        )
+
+    async def request(self, messages: list[dict[str, Any]]) -> ModelResponse:
+        """
+        Send a request, retrying transient errors, and wait for the response.
+
+        Args:
+            messages: List of message dictionaries in OpenAI format.
+
+        Returns:
+            ModelResponse containing thinking and action.
+        """
+        return response_from_events(
+            [event async for event in stream_with_retry(self, messages)]
+        )
+
+
+class _StreamWatchdog:
+    """Bound every wait on the server by the stream deadlines of a ModelConfig."""
+
+    def __init__(self, config: ModelConfig):
+        self.config = config
+        self.start = time.monotonic()
+        self.last_chunk = self.start
+        self.first_token_received = False
+
+    async def wait(self, awaitable: Any) -> Any:
+        """
+        Await the next server response or chunk.
+
+        Raises:
+            StreamStalledError: If a deadline expires first.
+        """
+        phase, timeout = self._deadline()
+        since = self.start if phase != "token" else self.last_chunk
+        try:
+            result = await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            waited = time.monotonic() - since
+            _stalls.append(
+                {
+                    "time": time.time(),
+                    "provider": self.config.base_url,
+                    "model": self.config.model_name,
+                    "phase": phase,
+                    "waited": waited,
+                    **_request_labels.get(),
+                }
+            )
+            raise StreamStalledError(self.config.base_url, phase, waited) from None
+        self.last_chunk = time.monotonic()
+        return result
+
+    def _deadline(self) -> tuple[str, float | None]:
+        if self.first_token_received:
+            phase, timeout = "token", self.config.token_timeout
+        else:
+            # Awaiting the response and the empty role chunks share one budget
+            phase, timeout = "first token", self.config.first_token_timeout
+            if timeout is not None:
+                timeout = max(timeout - (time.monotonic() - self.start), 0.0)
+        if self.config.stream_timeout is not None:
+            remaining = self.config.stream_timeout - (time.monotonic() - self.start)
+            if timeout is None or remaining < timeout:
+                phase, timeout = "end of response", max(remaining, 0.0)
+        return phase, timeout
+
+
+async def _replay(response: CachedResponse) -> AsyncIterator[str]:
+    """Yield the content deltas of a cached response."""
+    for content in response.chunks:
+        yield content
+
+
+def response_from_events(events: list[StreamEvent]) -> ModelResponse:
+    """Build a ModelResponse from the events of one request, including retries."""
+    retries = [e for e in events if isinstance(e, Retry)]
+    if retries:
+        # Output before the last retry belongs to failed attempts
+        events = events[events.index(retries[-1]) + 1 :]
+    result = next(e for e in events if isinstance(e, ActionComplete))
+    timing = next(e for e in events if isinstance(e, Timing))
+    return ModelResponse(
+        thinking=result.thinking,
+        action=result.action,
+        raw_content=result.raw_content,
+        time_to_first_token=timing.time_to_first_token,
+        time_to_thinking_end=timing.time_to_thinking_end,
+        total_time=timing.total_time,
+        stopped_early=result.stopped_early,
+        cached=result.cached,
+        retries=len(retries),
+        retry_time=sum(e.elapsed for e in retries),
+    )
+
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop on a daemon thread used by blocking callers."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="model-client-loop", daemon=True
+            ).start()
+        return _loop
+
+
+T = TypeVar("T")
+
+
+def run_blocking(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine from synchronous code on the shared background event loop.
+
+    Context variables such as request_labels carry over, and interrupting
+    the caller cancels the coroutine (see command_runner.run_blocking).
+
+    Args:
+        coro: Coroutine to run, e.g. ``AsyncModelClient.request(messages)``.
+
+    Returns:
+        The coroutine's result. Its exceptions are re-raised in the caller.
+    """
+    return command_runner.run_blocking(coro, loop=_background_loop())
+
+
+def iterate_blocking(events: AsyncIterator[StreamEvent]) -> Iterator[StreamEvent]:
+    """
+    Consume an async event stream from synchronous code.
+
+    The stream runs on a shared background event loop, so its pooled
+    connections are reused across calls. Stopping the iteration early
+    cancels the stream.
+
+    Args:
+        events: Async iterator, e.g. ``AsyncModelClient.stream(messages)``.
+
+    Yields:
+        The same events, in order. Exceptions are re-raised in the caller.
+    """
+    items: queue.Queue = queue.Queue()
+    done = object()
+    # Carry context variables such as request_labels over to the loop thread
+    context = contextvars.copy_context()
+
+    async def pump() -> None:
+        for var, value in context.items():
+            var.set(value)
+        try:
+            async for event in events:
+                items.put(event)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _background_loop())
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        future.cancel()
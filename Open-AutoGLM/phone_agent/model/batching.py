@@ -0,0 +1,300 @@
+"""Micro-batched dispatch of model requests from many agents.
+
+Self-hosted servers (vLLM, SGLang) batch whatever requests are in flight at
+each decoding step. When a fleet of agents sends its steps at slightly
+different times, requests trickle in one by one and each arrival interrupts
+the running batch with its own prefill. A ``BatchDispatcher`` holds
+requests for a short window and releases them together as one wave, so the
+server prefills them in the same step.
+
+Within a wave, requests with the same system prompt are released next to
+each other so the server's prefix cache is reused. With ``max_batch`` set,
+at most that many requests are in flight; when more are waiting, lower
+``priority`` values go first, and among equal priorities the agents take
+turns: the agent served longest ago goes next.
+
+Dispatchers are shared process-wide per base URL. Requests take their
+priority and agent from ``request_labels``::
+
+    >>> configure_batching("http://gpu-box:8000/v1", window=0.05, max_batch=16)
+    >>> with request_labels(device="emulator-5554", priority=0):
+    ...     response = await client.request(messages)
+    >>> print(format_batch_stats())
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+# Samples kept for the queueing delay percentiles
+_DELAY_WINDOW = 1000
+
+
+@dataclass
+class _Request:
+    """A request waiting for its wave."""
+
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+    priority: int
+    agent: Any
+    prefix: Any
+    enqueued: float = field(default_factory=time.monotonic)
+    released: bool = False
+
+
+class BatchDispatcher:
+    """
+    Release requests in waves, at most one wave per window.
+
+    Args:
+        window: Seconds the first request of a wave waits for others.
+        max_batch: Maximum requests in flight, or None for no limit. Also
+            the capacity used to report occupancy.
+    """
+
+    def __init__(self, window: float = 0.05, max_batch: int | None = None):
+        self._lock = threading.Lock()
+        self._pending: list[_Request] = []
+        self._in_flight = 0
+        self._timer_pending = False
+        # Wave number in which each agent last had a request released
+        self._last_served: dict[Any, int] = {}
+        self.batches = 0
+        self.requests = 0
+        self._sizes: deque[int] = deque(maxlen=_DELAY_WINDOW)
+        self._delays: deque[float] = deque(maxlen=_DELAY_WINDOW)
+        self.configure(window, max_batch)
+
+    def configure(self, window: float = 0.05, max_batch: int | None = None) -> None:
+        """Change the window and batch limit."""
+        with self._lock:
+            self.window = window
+            self.max_batch = max_batch
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: int = 0, agent: Any = None, prefix: Any = None
+    ) -> AsyncIterator[float]:
+        """
+        Wait for the request's wave and hold its place until the block ends.
+
+        Args:
+            priority: Lower values are released first when waves are full.
+            agent: Identity used for fairness, e.g. the device ID.
+            prefix: Requests with equal prefixes are released together.
+
+        Yields:
+            Seconds spent waiting.
+        """
+        waited = await self.admit(priority, agent, prefix)
+        try:
+            yield waited
+        finally:
+            self.done()
+
+    async def admit(
+        self, priority: int = 0, agent: Any = None, prefix: Any = None
+    ) -> float:
+        """
+        Wait until the request is released; call ``done`` when it finishes.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        loop = asyncio.get_running_loop()
+        request = _Request(loop, loop.create_future(), priority, agent, prefix)
+        with self._lock:
+            self._pending.append(request)
+            if self.max_batch is not None and len(self._pending) >= self._capacity():
+                # A full wave gains nothing from waiting longer
+                self._release()
+            else:
+                self._schedule(self.window)
+
+        try:
+            if not request.released:
+                await request.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if request.released:
+                    self._done_locked()
+                else:
+                    self._pending.remove(request)
+            raise
+        return time.monotonic() - request.enqueued
+
+    def done(self) -> None:
+        """Report that a released request has finished."""
+        with self._lock:
+            self._done_locked()
+
+    def get_stats(self) -> dict:
+        """Wave sizes, occupancy and queueing delay."""
+        with self._lock:
+            sizes = list(self._sizes)
+            delays = sorted(self._delays)
+        mean_size = statistics.mean(sizes) if sizes else 0.0
+        return {
+            "window": self.window,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "requests": self.requests,
+            "in_flight": self._in_flight,
+            "pending": len(self._pending),
+            "mean_batch_size": mean_size,
+            "max_batch_size": max(sizes) if sizes else 0,
+            "occupancy": mean_size / self.max_batch if self.max_batch else None,
+            "delay_mean": statistics.mean(delays) if delays else 0.0,
+            "delay_p50": _percentile(delays, 50),
+            "delay_p95": _percentile(delays, 95),
+            "delay_max": delays[-1] if delays else 0.0,
+        }
+
+    def _capacity(self) -> int:
+        if self.max_batch is None:
+            return len(self._pending)
+        return max(0, self.max_batch - self._in_flight)
+
+    def _done_locked(self) -> None:
+        self._in_flight -= 1
+        if self._pending:
+            # Gather the requests freed up during the next window into one wave
+            self._schedule(self.window)
+
+    def _schedule(self, delay: float) -> None:
+        """Release a wave after ``delay`` seconds; called with the lock held."""
+        if self._timer_pending:
+            return
+        self._timer_pending = True
+        loop = self._pending[0].loop
+
+        def on_timer() -> None:
+            with self._lock:
+                self._timer_pending = False
+                self._release()
+
+        loop.call_soon_threadsafe(loop.call_later, delay, on_timer)
+
+    def _release(self) -> None:
+        """Release the next wave; called with the lock held."""
+        capacity = self._capacity()
+        if not self._pending or capacity == 0:
+            return
+
+        # Priority first, then agents served longest ago, then each agent's
+        # oldest request before its others
+        rank: dict[Any, int] = {}
+        ordered = []
+        for request in sorted(self._pending, key=lambda r: r.enqueued):
+            turn = last_served = -1
+            if request.agent is not None:
+                turn = rank.get(request.agent, 0)
+                rank[request.agent] = turn + 1
+                last_served = self._last_served.get(request.agent, -1)
+            ordered.append(
+                (request.priority, last_served, turn, request.enqueued, request)
+            )
+        ordered.sort(key=lambda item: item[:4])
+        wave = [item[-1] for item in ordered[:capacity]]
+        for request in wave:
+            if request.agent is not None:
+                self._last_served[request.agent] = self.batches
+
+        # Keep requests sharing a prefix adjacent, in order of first appearance
+        groups: dict[Any, list[_Request]] = {}
+        for request in wave:
+            groups.setdefault(request.prefix, []).append(request)
+
+        now = time.monotonic()
+        for group in groups.values():
+            for request in group:
+                self._pending.remove(request)
+                request.released = True
+                self._in_flight += 1
+                self._delays.append(now - request.enqueued)
+                request.loop.call_soon_threadsafe(_wake, request.future)
+        self.batches += 1
+        self.requests += len(wave)
+        self._sizes.append(len(wave))
+
+        if self._pending and self._capacity():
+            self._schedule(self.window)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+_dispatchers: dict[str, BatchDispatcher] = {}
+_dispatchers_lock = threading.Lock()
+
+
+def get_dispatcher(base_url: str) -> BatchDispatcher | None:
+    """Get the dispatcher of a provider, or None if batching is not configured."""
+    return _dispatchers.get(base_url.rstrip("/"))
+
+
+def configure_batching(
+    base_url: str, window: float | None = 0.05, max_batch: int | None = None
+) -> BatchDispatcher | None:
+    """
+    Enable micro-batching for a provider.
+
+    Args:
+        base_url: API base URL.
+        window: Seconds a wave waits for more requests; None or 0 disables
+            batching for requests started from now on.
+        max_batch: Maximum requests in flight, or None.
+
+    Returns:
+        The provider's BatchDispatcher, or None if disabled.
+    """
+    key = base_url.rstrip("/")
+    with _dispatchers_lock:
+        if not window:
+            _dispatchers.pop(key, None)
+            return None
+        dispatcher = _dispatchers.get(key)
+        if dispatcher is None:
+            dispatcher = _dispatchers[key] = BatchDispatcher(window, max_batch)
+        else:
+            dispatcher.configure(window, max_batch)
+        return dispatcher
+
+
+def get_batch_stats() -> dict[str, dict]:
+    """Statistics of every dispatcher, keyed by base URL."""
+    with _dispatchers_lock:
+        dispatchers = list(_dispatchers.items())
+    return {base_url: dispatcher.get_stats() for base_url, dispatcher in dispatchers}
+
+
+def format_batch_stats() -> str:
+    """Format the dispatcher statistics as a table."""
+    lines = [
+        f"{'provider':<40} {'batches':>7} {'mean':>6} {'max':>4} {'occupancy':>9} "
+        f"{'delay p50':>10} {'delay p95':>10}"
+    ]
+    for name, stats in get_batch_stats().items():
+        occupancy = (
+            f"{stats['occupancy']:.0%}" if stats["occupancy"] is not None else "-"
+        )
+        lines.append(
+            f"{name:<40} {stats['batches']:>7} {stats['mean_batch_size']:>6.1f} "
+            f"{stats['max_batch_size']:>4} {occupancy:>9} "
+            f"{stats['delay_p50'] * 1000:>8.1f}ms {stats['delay_p95'] * 1000:>8.1f}ms"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,250 @@
+"""Model cascade: answer with a fast model, escalate when its answer is unusable.
+
+Most steps (launching an app, going back, tapping an obvious button) are
+easy, and a small local model answers them as well as the hosted one. A
+``ModelCascade`` sends each step to its tiers in order and returns the first
+answer that passes review. An answer is escalated to the next tier when:
+
+- its action cannot be parsed,
+- it names an action the agent does not know,
+- it repeats the previous action although that action changed nothing: the
+  agent reports unchanged screens through the ``screen_changed`` request
+  label (with ``ui_diff``); without it, an identical repeat of a tap-like
+  action counts as a no-op.
+
+Errors of a tier (e.g. the local server is down) also escalate. The last
+tier's answer is returned even if it fails review. Every tier records how
+often its answers were accepted and its latency.
+
+Example:
+    >>> config = ModelConfig(
+    ...     base_url="http://localhost:8000/v1",
+    ...     model_name="autoglm-phone-9b-awq",
+    ...     cascade=[ModelEndpoint("https://open.bigmodel.cn/api/paas/v4",
+    ...                            model_name="autoglm-phone", api_key="key")],
+    ... )
+    >>> cascade = ModelCascade(config)
+    >>> response = await cascade.request(messages)
+    >>> print(cascade.format_stats())
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from typing import Any, Awaitable, Callable
+
+from phone_agent.actions.handler import KNOWN_ACTIONS, parse_action
+from phone_agent.device_metrics import LatencyHistogram
+from phone_agent.model.async_client import AsyncModelClient, get_request_labels
+from phone_agent.model.client import ModelConfig, ModelResponse
+
+# Actions that are legitimately repeated (scrolling, waiting for a page,
+# backing out of nested screens)
+_REPEATABLE_ACTIONS = {"Swipe", "Wait", "Back"}
+
+_ANSWER_PATTERN = re.compile(r"<answer>(.*?)(?:</answer>|$)", re.S)
+
+
+@dataclass
+class TierStats:
+    """Outcomes and latency of one tier."""
+
+    requests: int = 0
+    accepted: int = 0
+    # Escalations by reason
+    escalated: Counter = field(default_factory=Counter)
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def to_dict(self) -> dict:
+        """Summary of the statistics."""
+        latency = self.latency.to_dict()
+        return {
+            "requests": self.requests,
+            "accepted": self.accepted,
+            "hit_rate": self.accepted / self.requests if self.requests else 0.0,
+            "escalated": dict(self.escalated),
+            "latency_mean": latency["mean"],
+            "latency_p50": latency["p50"],
+            "latency_p95": latency["p95"],
+        }
+
+
+@dataclass
+class _Tier:
+    """One model of the cascade."""
+
+    name: str
+    client: Any
+    stats: TierStats = field(default_factory=TierStats)
+
+
+def review_response(
+    response: ModelResponse, messages: list[dict[str, Any]]
+) -> str | None:
+    """
+    Check whether a response is usable.
+
+    Args:
+        response: The model's response.
+        messages: The messages it answered, to find the previous action.
+
+    Returns:
+        The reason to escalate, or None if the response is acceptable.
+    """
+    try:
+        action = parse_action(response.action)
+    except ValueError:
+        return "unparsable action"
+
+    if action.get("_metadata") != "do":
+        return None
+    name = action.get("action")
+    if name not in KNOWN_ACTIONS:
+        return f"unknown action {name!r}"
+
+    previous = _previous_action(messages)
+    if previous is None or " ".join(previous.split()) != " ".join(
+        response.action.split()
+    ):
+        return None
+    screen_changed = get_request_labels().get("screen_changed")
+    if screen_changed is False or (
+        screen_changed is None and name not in _REPEATABLE_ACTIONS
+    ):
+        return "repeated no-op"
+    return None
+
+
+def _previous_action(messages: list[dict[str, Any]]) -> str | None:
+    """The action of the last assistant message, if any."""
+    for message in reversed(messages):
+        if message.get("role") != "assistant":
+            continue
+        content = message.get("content")
+        if isinstance(content, list):
+            content = "".join(item.get("text", "") for item in content)
+        match = _ANSWER_PATTERN.search(content or "")
+        return (match.group(1) if match else content or "").strip()
+    return None
+
+
+class ModelCascade:
+    """
+    Ordered tiers of models, each step answered by the first acceptable one.
+
+    Args:
+        config: Model configuration. Its own model is the first tier,
+            ``cascade`` lists the tiers escalated to, in order.
+        first: Client for the first tier, e.g. a ModelRouter over the
+            config's endpoints. Defaults to an AsyncModelClient.
+    """
+
+    def __init__(self, config: ModelConfig, first: Any = None):
+        self.config = config
+        self.tiers = [_Tier(config.model_name, first or AsyncModelClient(config))]
+        for endpoint in config.cascade:
+            tier_config = replace(
+                config,
+                base_url=endpoint.base_url,
+                api_key=endpoint.api_key,
+                model_name=endpoint.model_name or config.model_name,
+                endpoints=[],
+                cascade=[],
+            )
+            if endpoint.requests_per_second is not None:
+                tier_config.requests_per_second = endpoint.requests_per_second
+            if endpoint.max_concurrent_requests is not None:
+                tier_config.max_concurrent_requests = endpoint.max_concurrent_requests
+            name = endpoint.name or tier_config.model_name
+            if any(tier.name == name for tier in self.tiers):
+                name = f"{name}#{len(self.tiers)}"
+            self.tiers.append(_Tier(name, AsyncModelClient(tier_config)))
+
+    def review(
+        self, tier: _Tier, response: ModelResponse, messages: list[dict[str, Any]]
+    ) -> str | None:
+        """
+        Review a tier's response and record the outcome.
+
+        Returns:
+            The reason to escalate, or None if the response is accepted.
+        """
+        reason = review_response(response, messages)
+        tier.stats.requests += 1
+        tier.stats.latency.observe(
+            (response.total_time or 0.0) + response.retry_time, ok=reason is None
+        )
+        if reason is None:
+            tier.stats.accepted += 1
+        else:
+            tier.stats.escalated[reason] += 1
+        response.tier = tier.name
+        return reason
+
+    def record_error(self, tier: _Tier, error: Exception) -> str:
+        """Record a failed request of a tier; returns the reason to escalate."""
+        tier.stats.requests += 1
+        tier.stats.escalated["error"] += 1
+        return f"error: {type(error).__name__}: {error}"
+
+    async def request(
+        self,
+        messages: list[dict[str, Any]],
+        send: Callable[[Any, list[dict[str, Any]]], Awaitable[ModelResponse]]
+        | None = None,
+        on_escalate: Callable[[str, str], None] | None = None,
+    ) -> ModelResponse:
+        """
+        Ask the tiers in order and return the first acceptable response.
+
+        Args:
+            messages: List of message dictionaries in OpenAI format.
+            send: Sends the messages to a tier's client and returns its
+                response, e.g. to print the stream. Defaults to the client's
+                ``request``.
+            on_escalate: Called with the next tier's name and the reason
+                before each escalation.
+
+        Returns:
+            ModelResponse of the tier that answered; ``tier`` names it.
+
+        Raises:
+            Exception: The error of the last tier, if it failed.
+        """
+        for index, tier in enumerate(self.tiers):
+            last = index == len(self.tiers) - 1
+            try:
+                if send is None:
+                    response = await tier.client.request(messages)
+                else:
+                    response = await send(tier.client, messages)
+            except Exception as e:
+                reason = self.record_error(tier, e)
+                if last:
+                    raise
+            else:
+                reason = self.review(tier, response, messages)
+                if reason is None or last:
+                    return response
+            if on_escalate is not None:
+                on_escalate(self.tiers[index + 1].name, reason)
+        raise RuntimeError("Model cascade has no tiers")
+
+    def get_stats(self) -> dict[str, dict]:
+        """Statistics per tier name."""
+        return {tier.name: tier.stats.to_dict() for tier in self.tiers}
+
+    def format_stats(self) -> str:
+        """Format the tier statistics as a table."""
+        lines = [
+            f"{'tier':<32} {'requests':>8} {'hit rate':>8} {'p50':>8} {'p95':>8}  escalated"
+        ]
+        for name, stats in self.get_stats().items():
+            escalated = ", ".join(
+                f"{reason}: {n}" for reason, n in stats["escalated"].items()
+            )
+            lines.append(
+                f"{name:<32} {stats['requests']:>8} {stats['hit_rate']:>8.0%} "
+                f"{stats['latency_p50']:>7.2f}s {stats['latency_p95']:>7.2f}s  {escalated or '-'}"
+            )
+        return "\n".join(lines)
@@ -1,13 +1,25 @@
 """Model client for AI inference using OpenAI-compatible API."""
 
 import json
-import time
 from dataclasses import dataclass, field
 from typing import Any
 
-from openai import OpenAI
-
 from phone_agent.config.i18n import get_message
+from phone_agent.model.retry import RetryPolicy
+
+
+@dataclass
+class ModelEndpoint:
+    """Another OpenAI-compatible endpoint, for routing or as a cascade tier."""
+
+    base_url: str
+    api_key: str = "EMPTY"
+    # Defaults to ModelConfig.model_name
+    model_name: str | None = None
+    name: str | None = None
+    # Rate limits of this endpoint; default to those of ModelConfig
+    requests_per_second: float | None = None
+    max_concurrent_requests: int | None = None
 
 
 @dataclass
@@ -23,6 +35,39 @@ class ModelConfig:
     frequency_penalty: float = 0.2
     extra_body: dict[str, Any] = field(default_factory=dict)
     lang: str = "cn"  # Language for UI messages: 'cn' or 'en'
+    # Close the stream as soon as the action expression is complete, which
+    # also cancels generation on the server
+    stop_on_complete_action: bool = True
+    # Further endpoints serving the same model; requests are routed to the
+    # fastest healthy one (see model.router)
+    endpoints: list[ModelEndpoint] = field(default_factory=list)
+    # Send a second request to another endpoint when the first has not
+    # produced a token within its p95 time to first token
+    hedge: bool = False
+    # Client-side limits for this base_url and api_key, shared by all clients
+    # in the process (see model.rate_limit); None means unlimited
+    requests_per_second: float | None = None
+    max_concurrent_requests: int | None = None
+    # Retries of transient errors and the provider's circuit breaker
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    # Stream deadlines in seconds, None to disable: until the first token
+    # (includes prompt prefill), between two chunks, and for the whole
+    # response. A stalled stream is aborted and retried.
+    first_token_timeout: float | None = 60.0
+    token_timeout: float | None = 30.0
+    stream_timeout: float | None = 300.0
+    # Replay identical temperature 0 requests from a cache (see
+    # model.response_cache), kept in memory and, with a directory, on disk
+    response_cache: bool = False
+    response_cache_dir: str | None = None
+    # Hold requests to this base_url for up to batch_window seconds and
+    # release them in waves of at most batch_max_size (see model.batching);
+    # useful when many agents in one process share a self-hosted server
+    batch_window: float | None = None
+    batch_max_size: int | None = None
+    # Models to escalate to, in order, when the answer of this one is
+    # unusable (see model.cascade)
+    cascade: list[ModelEndpoint] = field(default_factory=list)
 
 
 @dataclass
@@ -36,6 +81,15 @@ class ModelResponse:
     time_to_first_token: float | None = None  # Time to first token (seconds)
     time_to_thinking_end: float | None = None  # Time to thinking end (seconds)
     total_time: float | None = None  # Total inference time (seconds)
+    # Whether the stream was closed early after a complete action
+    stopped_early: bool = False
+    # Whether the response was replayed from the response cache
+    cached: bool = False
+    # Cascade tier that answered, if a cascade is configured
+    tier: str | None = None
+    # Failed attempts before this response and the time they cost
+    retries: int = 0
+    retry_time: float = 0.0
 
 
 class ModelClient:
@@ -47,106 +101,84 @@ class ModelClient:
     """
 
     def __init__(self, config: ModelConfig | None = None):
+        from phone_agent.model.async_client import AsyncModelClient
+        from phone_agent.model.router import ModelRouter
+
         self.config = config or ModelConfig()
-        self.client = OpenAI(base_url=self.config.base_url, api_key=self.config.api_key)
+        if self.config.endpoints:
+            self.async_client = ModelRouter(self.config)
+        else:
+            self.async_client = AsyncModelClient(self.config)
+        self.cascade = None
+        if self.config.cascade:
+            from phone_agent.model.cascade import ModelCascade
+
+            self.cascade = ModelCascade(self.config, first=self.async_client)
 
     def request(self, messages: list[dict[str, Any]]) -> ModelResponse:
         """
         Send a request to the model.
 
+        Thinking is printed as it streams in. The request runs on the
+        background event loop of AsyncModelClient. With a cascade, the
+        request is escalated to the next model while the answer is unusable.
+
         Args:
             messages: List of message dictionaries in OpenAI format.
 
         Returns:
             ModelResponse containing thinking and action.
-
-        Raises:
-            ValueError: If the response cannot be parsed.
         """
-        # Start timing
-        start_time = time.time()
-        time_to_first_token = None
-        time_to_thinking_end = None
-
-        stream = self.client.chat.completions.create(
-            messages=messages,
-            model=self.config.model_name,
-            max_tokens=self.config.max_tokens,
-            temperature=self.config.temperature,
-            top_p=self.config.top_p,
-            frequency_penalty=self.config.frequency_penalty,
-            extra_body=self.config.extra_body,
-            stream=True,
+        from phone_agent.model.async_client import run_blocking
+
+        if self.cascade is None:
+            return run_blocking(self._request(self.async_client, messages))
+        return run_blocking(
+            self.cascade.request(
+                messages, send=self._request, on_escalate=self._print_escalation
+            )
         )
 
-        raw_content = ""
-        buffer = ""  # Buffer to hold content that might be part of a marker
-        action_markers = ["finish(message=", "do(action="]
-        in_action_phase = False  # Track if we've entered the action phase
-        first_token_received = False
-
-        for chunk in stream:
-            if len(chunk.choices) == 0:
-                continue
-            if chunk.choices[0].delta.content is not None:
-                content = chunk.choices[0].delta.content
-                raw_content += content
-
-                # Record time to first token
-                if not first_token_received:
-                    time_to_first_token = time.time() - start_time
-                    first_token_received = True
-
-                if in_action_phase:
-                    # Already in action phase, just accumulate content without printing
-                    continue
-
-                buffer += content
-
-                # Check if any marker is fully present in buffer
-                marker_found = False
-                for marker in action_markers:
-                    if marker in buffer:
-                        # Marker found, print everything before it
-                        thinking_part = buffer.split(marker, 1)[0]
-                        print(thinking_part, end="", flush=True)
-                        print()  # Print newline after thinking is complete
-                        in_action_phase = True
-                        marker_found = True
-
-                        # Record time to thinking end
-                        if time_to_thinking_end is None:
-                            time_to_thinking_end = time.time() - start_time
-
-                        break
-
-                if marker_found:
-                    continue  # Continue to collect remaining content
-
-                # Check if buffer ends with a prefix of any marker
-                # If so, don't print yet (wait for more content)
-                is_potential_marker = False
-                for marker in action_markers:
-                    for i in range(1, len(marker)):
-                        if buffer.endswith(marker[:i]):
-                            is_potential_marker = True
-                            break
-                    if is_potential_marker:
-                        break
-
-                if not is_potential_marker:
-                    # Safe to print the buffer
-                    print(buffer, end="", flush=True)
-                    buffer = ""
-
-        # Calculate total time
-        total_time = time.time() - start_time
-
-        # Parse thinking and action from response
-        thinking, action = self._parse_response(raw_content)
+    def _print_escalation(self, tier: str, reason: str) -> None:
+        print(f"⚠️  {get_message('model_escalate', self.config.lang)} {tier}: {reason}")
+
+    async def _request(
+        self, client: Any, messages: list[dict[str, Any]]
+    ) -> ModelResponse:
+        """Stream one request from a client, printing thinking and metrics."""
+        from phone_agent.model.async_client import (
+            ActionComplete,
+            ThinkingDelta,
+            response_from_events,
+        )
+        from phone_agent.model.retry import Retry, stream_with_retry
 
-        # Print performance metrics
         lang = self.config.lang
+        events = []
+        printed_thinking = False
+        async for event in stream_with_retry(client, messages):
+            events.append(event)
+            if isinstance(event, ThinkingDelta):
+                print(event.text, end="", flush=True)
+                printed_thinking = True
+            elif isinstance(event, ActionComplete) and printed_thinking:
+                print()  # Print newline after thinking is complete
+            elif isinstance(event, Retry):
+                if printed_thinking:
+                    print()
+                printed_thinking = False
+                print(
+                    f"⚠️  {get_message('model_retry', lang)} "
+                    f"({event.attempt}/{self.config.retry.max_retries}, "
+                    f"{event.delay:.1f}s): {event.error}"
+                )
+
+        response = response_from_events(events)
+        time_to_first_token = response.time_to_first_token
+        time_to_thinking_end = response.time_to_thinking_end
+        total_time = response.total_time
+
+        # Print performance metrics
         print()
         print("=" * 50)
         print(f"⏱️  {get_message('performance_metrics', lang)}:")
@@ -162,58 +194,16 @@ class ModelClient:
         print(
             f"{get_message('total_inference_time', lang)}:          {total_time:.3f}s"
         )
+        if response.retries:
+            print(
+                f"{get_message('model_retries', lang)}: {response.retries} "
+                f"({response.retry_time:.3f}s)"
+            )
+        if response.cached:
+            print(get_message("model_cached", lang))
         print("=" * 50)
 
-        return ModelResponse(
-            thinking=thinking,
-            action=action,
-            raw_content=raw_content,
-            time_to_first_token=time_to_first_token,
-            time_to_thinking_end=time_to_thinking_end,
-            total_time=total_time,
-        )
-
-    def _parse_response(self, content: str) -> tuple[str, str]:
-        """
-        Parse the model response into thinking and action parts.
-
-        Parsing rules:
-        1. If content contains 'finish(message=', everything before is thinking,
-           everything from 'finish(message=' onwards is action.
-        2. If rule 1 doesn't apply but content contains 'do(action=',
-           everything before is thinking, everything from 'do(action=' onwards is action.
-        3. Fallback: If content contains '<answer>', use legacy parsing with XML tags.
-        4. Otherwise, return empty thinking and full content as action.
-
-        Args:
-            content: Raw response content.
-
-        Returns:
-            Tuple of (thinking, action).
-        """
-        # Rule 1: Check for finish(message=
-        if "finish(message=" in content:
-            parts = content.split("finish(message=", 1)
-            thinking = parts[0].strip()
-            action = "finish(message=" + parts[1]
-            return thinking, action
-
-        # Rule 2: Check for do(action=
-        if "do(action=" in content:
-            parts = content.split("do(action=", 1)
-            thinking = parts[0].strip()
-            action = "do(action=" + parts[1]
-            return thinking, action
-
-        # Rule 3: Fallback to legacy XML tag parsing
-        if "<answer>" in content:
-            parts = content.split("<answer>", 1)
-            thinking = parts[0].replace("<think>", "").replace("</think>", "").strip()
-            action = parts[1].replace("</answer>", "").strip()
-            return thinking, action
-
-        # Rule 4: No markers found, return content as action
-        return "", content
+        return response
 
 
 class MessageBuilder:
@@ -0,0 +1,138 @@
+"""Process-wide pool of OpenAI clients.
+
+Building an ``OpenAI`` client creates a new HTTP connection pool, so every
+new client pays fresh TCP and TLS handshakes to the provider. Clients are
+therefore shared per (base_url, api_key): successive tasks, concurrent
+agents and API checks all reuse the same warm keep-alive connections.
+HTTP/2 is negotiated when the ``h2`` package is installed and the provider
+supports it.
+
+Pool limits can be tuned with environment variables:
+
+- PHONE_AGENT_HTTP_MAX_CONNECTIONS (default 20)
+- PHONE_AGENT_HTTP_MAX_KEEPALIVE (default 10)
+- PHONE_AGENT_HTTP_KEEPALIVE_EXPIRY seconds (default 60)
+
+Example:
+    >>> from phone_agent.model.client_pool import get_openai_client
+    >>> client = get_openai_client("https://open.bigmodel.cn/api/paas/v4", "key")
+    >>> client is get_openai_client("https://open.bigmodel.cn/api/paas/v4/", "key")
+    True
+"""
+
+import asyncio
+import atexit
+import importlib.util
+import os
+import threading
+import weakref
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+MAX_CONNECTIONS = int(os.getenv("PHONE_AGENT_HTTP_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PHONE_AGENT_HTTP_MAX_KEEPALIVE", "10"))
+# Longer than the default 5s so connections survive the device actions
+# between two model calls
+KEEPALIVE_EXPIRY = float(os.getenv("PHONE_AGENT_HTTP_KEEPALIVE_EXPIRY", "60"))
+
+_clients: dict[tuple[str, str], OpenAI] = {}
+_clients_lock = threading.Lock()
+
+# Async connections belong to the event loop that opened them, so async
+# clients are pooled per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_openai_client(
+    base_url: str, api_key: str, timeout: float | None = None
+) -> OpenAI:
+    """
+    Get the shared OpenAI client for a provider endpoint and key.
+
+    Args:
+        base_url: API base URL.
+        api_key: API key.
+        timeout: Optional request timeout in seconds. The returned client
+            still shares the pooled connections.
+
+    Returns:
+        An OpenAI client backed by the shared connection pool.
+    """
+    key = (base_url.rstrip("/"), api_key)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = OpenAI(
+                base_url=key[0], api_key=api_key, http_client=_build_http_client()
+            )
+    if timeout is not None:
+        return client.with_options(timeout=timeout)
+    return client
+
+
+def get_async_openai_client(
+    base_url: str, api_key: str, timeout: float | None = None
+) -> AsyncOpenAI:
+    """
+    Get the shared AsyncOpenAI client for the running event loop.
+
+    Args:
+        base_url: API base URL.
+        api_key: API key.
+        timeout: Optional request timeout in seconds.
+
+    Returns:
+        An AsyncOpenAI client backed by the loop's shared connection pool.
+    """
+    loop = asyncio.get_running_loop()
+    key = (base_url.rstrip("/"), api_key)
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = AsyncOpenAI(
+                base_url=key[0],
+                api_key=api_key,
+                http_client=_build_http_client(async_client=True),
+                # Model streams are retried by model.retry, which also
+                # covers errors in the middle of a stream
+                max_retries=0,
+            )
+    if timeout is not None:
+        return client.with_options(timeout=timeout)
+    return client
+
+
+def close_openai_clients() -> None:
+    """Close all pooled clients and their connections."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+def _build_http_client(async_client: bool = False):
+    """Create a tuned httpx client, or None to use the openai default."""
+    try:
+        import httpx
+    except ImportError:
+        return None
+
+    client_class = DefaultAsyncHttpxClient if async_client else DefaultHttpxClient
+    return client_class(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+atexit.register(close_openai_clients)
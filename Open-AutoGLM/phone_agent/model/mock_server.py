@@ -0,0 +1,477 @@
+"""Local OpenAI-compatible mock of the model server.
+
+Serves ``/v1/models`` and ``/v1/chat/completions`` (streaming and not)
+without a GPU or network, for benchmarks and smoke tests of the agent, the
+web UI's key verification and the model client. Responses come from a
+script and are streamed with a configurable time to first token and token
+rate. Errors, dropped connections and stalls can be injected at random.
+
+A script is a JSON file with either a list of response strings or a
+conversation in the format of ``scripts/sample_messages.json``, whose
+assistant messages are replayed. Responses are used in order and repeat
+after the last one. Without a script the server answers with a Home
+action and then finishes, so an agent run ends after two steps.
+
+Usage:
+    python -m phone_agent.model.mock_server --port 8000 --ttft 0.5 --tps 40
+    python main.py --base-url http://127.0.0.1:8000/v1 --model autoglm-phone-9b "打开设置"
+
+Example:
+    >>> with MockModelServer(ttft=0.2, failure_rate=0.1) as server:
+    ...     client = ModelClient(ModelConfig(base_url=server.base_url))
+    ...     response = client.request(messages)
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from phone_agent.context import estimate_message_tokens
+
+DEFAULT_RESPONSES = [
+    '<think>先回到主屏幕，再查看当前状态。</think>\n<answer>do(action="Home")</answer>',
+    '<think>已经回到主屏幕，任务完成。</think>\n<answer>finish(message="任务已完成")</answer>',
+]
+
+# Pseudo tokens: a CJK character, or up to four other characters
+_TOKEN_PATTERN = re.compile(r"[^\x00-\x7f]|[\x00-\x7f]{1,4}", re.S)
+
+
+def load_responses(path: str) -> list[str]:
+    """
+    Load a response script.
+
+    Args:
+        path: JSON file with a list of strings, or a list of OpenAI messages
+            whose assistant messages are used.
+
+    Returns:
+        The responses in order.
+
+    Raises:
+        ValueError: If the file contains no responses.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    responses = []
+    for item in data if isinstance(data, list) else []:
+        if isinstance(item, str):
+            responses.append(item)
+        elif isinstance(item, dict) and item.get("role") == "assistant":
+            content = item.get("content")
+            if isinstance(content, list):
+                content = "".join(part.get("text", "") for part in content)
+            responses.append(content or "")
+    if not responses:
+        raise ValueError(
+            f"No responses in {path}: expected strings or assistant messages"
+        )
+    return responses
+
+
+def split_tokens(text: str) -> list[str]:
+    """Split a response into the pseudo tokens that are streamed."""
+    return _TOKEN_PATTERN.findall(text)
+
+
+class MockModelServer:
+    """
+    OpenAI-compatible mock server running on a background thread.
+
+    Args:
+        host: Address to bind.
+        port: Port to bind, 0 for a free one.
+        responses: Scripted responses, used in order and repeated.
+        models: Model names listed by ``/v1/models``; any name is accepted.
+        ttft: Seconds before the first token.
+        tokens_per_second: Streaming rate, None to send at once.
+        failure_rate: Share of requests answered with ``failure_status``.
+        failure_status: HTTP status of injected failures, e.g. 429 or 503.
+        drop_rate: Share of streams whose connection is closed midway.
+        stall_rate: Share of streams that pause for ``stall_time`` midway.
+        stall_time: Seconds a stalled stream pauses.
+        api_key: If set, requests with another bearer token get a 401.
+        seed: Seed for the failure injection.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        responses: list[str] | None = None,
+        models: list[str] | None = None,
+        ttft: float = 0.0,
+        tokens_per_second: float | None = None,
+        failure_rate: float = 0.0,
+        failure_status: int = 503,
+        drop_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_time: float = 60.0,
+        api_key: str | None = None,
+        seed: int | None = None,
+    ):
+        self.responses = responses or DEFAULT_RESPONSES
+        self.models = models or ["autoglm-phone-9b", "autoglm-phone"]
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.drop_rate = drop_rate
+        self.stall_rate = stall_rate
+        self.stall_time = stall_time
+        self.api_key = api_key
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_response = 0
+        self.stats = {
+            "requests": 0,
+            "failures": 0,
+            "drops": 0,
+            "stalls": 0,
+            "disconnects": 0,
+        }
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to configure clients with, e.g. http://127.0.0.1:8000/v1."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockModelServer":
+        """Serve on a daemon thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="mock-model-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self) -> None:
+        """Serve on the current thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self) -> "MockModelServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    @property
+    def _token_interval(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _take_response(self) -> str:
+        with self._lock:
+            response = self.responses[self._next_response % len(self.responses)]
+            self._next_response += 1
+            return response
+
+    def _roll(self, rate: float, stat: str) -> bool:
+        """Draw whether an injected fault happens and count it."""
+        with self._lock:
+            hit = rate > 0 and self._random.random() < rate
+            if hit:
+                self.stats[stat] += 1
+            return hit
+
+
+def _make_handler(server: MockModelServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") not in ("/v1/models", "/models"):
+                self._send_error(404, f"Unknown path {self.path}")
+                return
+            if not self._authorized():
+                return
+            created = int(time.time())
+            self._send_json(
+                200,
+                {
+                    "object": "list",
+                    "data": [
+                        {
+                            "id": name,
+                            "object": "model",
+                            "created": created,
+                            "owned_by": "mock",
+                        }
+                        for name in server.models
+                    ],
+                },
+            )
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_error(400, "Request body is not valid JSON")
+                return
+            if self.path.rstrip("/") not in (
+                "/v1/chat/completions",
+                "/chat/completions",
+            ):
+                self._send_error(404, f"Unknown path {self.path}")
+                return
+            if not self._authorized():
+                return
+
+            with server._lock:
+                server.stats["requests"] += 1
+            if server._roll(server.failure_rate, "failures"):
+                headers = {"Retry-After": "1"} if server.failure_status == 429 else None
+                self._send_error(server.failure_status, "Injected failure", headers)
+                return
+
+            content = server._take_response()
+            tokens = split_tokens(content)
+            max_tokens = body.get("max_tokens")
+            if max_tokens:
+                tokens = tokens[:max_tokens]
+            prompt_tokens = sum(
+                estimate_message_tokens(m) for m in body.get("messages", [])
+            )
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            }
+            finish_reason = "length" if "".join(tokens) != content else "stop"
+            model = body.get("model") or server.models[0]
+
+            try:
+                if body.get("stream"):
+                    include_usage = (body.get("stream_options") or {}).get(
+                        "include_usage"
+                    )
+                    self._stream(
+                        model, tokens, finish_reason, usage if include_usage else None
+                    )
+                else:
+                    time.sleep(
+                        server.ttft + max(len(tokens) - 1, 0) * server._token_interval
+                    )
+                    self._send_json(
+                        200,
+                        {
+                            "id": _completion_id(),
+                            "object": "chat.completion",
+                            "created": int(time.time()),
+                            "model": model,
+                            "choices": [
+                                {
+                                    "index": 0,
+                                    "message": {
+                                        "role": "assistant",
+                                        "content": "".join(tokens),
+                                    },
+                                    "finish_reason": finish_reason,
+                                }
+                            ],
+                            "usage": usage,
+                        },
+                    )
+            except (BrokenPipeError, ConnectionResetError):
+                # The client closed the stream, e.g. after a complete action
+                with server._lock:
+                    server.stats["disconnects"] += 1
+
+        def _stream(
+            self,
+            model: str,
+            tokens: list[str],
+            finish_reason: str,
+            usage: dict[str, int] | None,
+        ) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            completion_id = _completion_id()
+            created = int(time.time())
+
+            def chunk(delta: dict, finish: str | None = None, **extra: Any) -> None:
+                self._write_event(
+                    {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [
+                            {"index": 0, "delta": delta, "finish_reason": finish}
+                        ]
+                        if delta is not None
+                        else [],
+                        **extra,
+                    }
+                )
+
+            drop_at = stall_at = None
+            if server._roll(server.drop_rate, "drops"):
+                drop_at = len(tokens) // 2
+            elif server._roll(server.stall_rate, "stalls"):
+                stall_at = len(tokens) // 2
+
+            time.sleep(server.ttft)
+            chunk({"role": "assistant", "content": ""})
+            interval = server._token_interval
+            for index, token in enumerate(tokens):
+                if index == drop_at:
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                if index == stall_at:
+                    time.sleep(server.stall_time)
+                if index and interval:
+                    time.sleep(interval)
+                chunk({"content": token})
+            chunk({}, finish_reason)
+            if usage is not None:
+                chunk(None, usage=usage)
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+
+        def _write_event(self, data: dict) -> None:
+            self._write_chunk(
+                f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+            )
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def _authorized(self) -> bool:
+            if server.api_key is None:
+                return True
+            if self.headers.get("Authorization", "") == f"Bearer {server.api_key}":
+                return True
+            self._send_error(401, "Incorrect API key provided", code="invalid_api_key")
+            return False
+
+        def _send_json(
+            self, status: int, data: dict, headers: dict | None = None
+        ) -> None:
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_error(
+            self,
+            status: int,
+            message: str,
+            headers: dict | None = None,
+            code: str | None = None,
+        ) -> None:
+            self._send_json(
+                status,
+                {"error": {"message": message, "type": "mock_error", "code": code}},
+                headers,
+            )
+
+    return Handler
+
+
+def _completion_id() -> str:
+    return f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="OpenAI-compatible mock model server for offline benchmarks and tests",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Usage examples:
+  python -m phone_agent.model.mock_server --port 8000
+  python -m phone_agent.model.mock_server --port 8000 --ttft 0.8 --tps 30 --failure-rate 0.1
+  python -m phone_agent.model.mock_server --port 8000 --responses transcript.json
+        """,
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port (default: 8000)")
+    parser.add_argument(
+        "--responses",
+        type=str,
+        default=None,
+        help="JSON list of responses, or a transcript whose assistant messages are replayed",
+    )
+    parser.add_argument(
+        "--model", action="append", default=None, help="Model name to list (repeatable)"
+    )
+    parser.add_argument(
+        "--ttft", type=float, default=0.3, help="Time to first token (s)"
+    )
+    parser.add_argument(
+        "--tps", type=float, default=50.0, help="Tokens per second, 0 = instant"
+    )
+    parser.add_argument(
+        "--failure-rate", type=float, default=0.0, help="Share of failed requests"
+    )
+    parser.add_argument(
+        "--failure-status",
+        type=int,
+        default=503,
+        help="HTTP status of failures (default: 503)",
+    )
+    parser.add_argument(
+        "--drop-rate", type=float, default=0.0, help="Share of dropped streams"
+    )
+    parser.add_argument(
+        "--stall-rate", type=float, default=0.0, help="Share of stalled streams"
+    )
+    parser.add_argument(
+        "--stall-time", type=float, default=60.0, help="Stall duration (s)"
+    )
+    parser.add_argument("--apikey", type=str, default=None, help="Require this API key")
+    parser.add_argument(
+        "--seed", type=int, default=None, help="Seed for failure injection"
+    )
+    args = parser.parse_args()
+
+    server = MockModelServer(
+        host=args.host,
+        port=args.port,
+        responses=load_responses(args.responses) if args.responses else None,
+        models=args.model,
+        ttft=args.ttft,
+        tokens_per_second=args.tps or None,
+        failure_rate=args.failure_rate,
+        failure_status=args.failure_status,
+        drop_rate=args.drop_rate,
+        stall_rate=args.stall_rate,
+        stall_time=args.stall_time,
+        api_key=args.apikey,
+        seed=args.seed,
+    )
+    print(f"Mock model server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped. {server.stats}")
@@ -0,0 +1,291 @@
+"""Client-side rate limiting of model requests, per provider.
+
+Several agents sharing one API key easily exceed the provider's quota in
+bursts and get 429 responses. A ``RateLimiter`` combines a token bucket for
+requests per second with a cap on concurrent streams. Limiters are shared
+process-wide per (base_url, api_key), so every ``ModelClient`` and
+``AsyncModelClient`` talking to the same provider account draws from the
+same budget. Waiting requests are served strictly first come, first served,
+and the time each request waited is recorded so quotas can be sized.
+
+Example:
+    >>> from phone_agent.model.rate_limit import configure_rate_limit, get_rate_limiter
+    >>> configure_rate_limit("https://open.bigmodel.cn/api/paas/v4", "key",
+    ...                      requests_per_second=2, max_concurrent=4)
+    >>> limiter = get_rate_limiter("https://open.bigmodel.cn/api/paas/v4", "key")
+    >>> async with limiter.slot():
+    ...     ...  # send the request
+    >>> print(format_rate_limit_stats())
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from phone_agent.device_metrics import LatencyHistogram
+
+
+@dataclass
+class _Waiter:
+    """A request queued for a slot."""
+
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+    granted: bool = False
+
+
+class RateLimiter:
+    """
+    Token bucket plus concurrency limit, shared by threads and event loops.
+
+    Args:
+        requests_per_second: Sustained request rate, or None for no limit.
+        burst: Bucket size, i.e. how many requests may start at once after an
+            idle period. Defaults to max(1, requests_per_second).
+        max_concurrent: Maximum number of requests in flight, or None.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float | None = None,
+        burst: float | None = None,
+        max_concurrent: int | None = None,
+    ):
+        self._lock = threading.Lock()
+        self._waiters: deque[_Waiter] = deque()
+        self._active = 0
+        self._timer_pending = False
+        self.wait_times = LatencyHistogram()
+        self.requests_per_second: float | None = None
+        self.burst: float | None = None
+        self.max_concurrent: int | None = None
+        # Starts full: configure() clamps it to the burst
+        self._tokens = float("inf")
+        self._refilled_at = time.monotonic()
+        self.configure(requests_per_second, burst, max_concurrent)
+
+    def configure(
+        self,
+        requests_per_second: float | None = None,
+        burst: float | None = None,
+        max_concurrent: int | None = None,
+    ) -> None:
+        """
+        Change the limits; queued requests are re-evaluated.
+
+        Setting the current limits again is a no-op. Otherwise the tokens
+        left are kept, capped at the new burst, so reconfiguring does not
+        grant a fresh burst.
+        """
+        burst = burst or max(1.0, requests_per_second or 1.0)
+        with self._lock:
+            limits = (requests_per_second, burst, max_concurrent)
+            if limits == (self.requests_per_second, self.burst, self.max_concurrent):
+                return
+            # Credit the tokens earned at the old rate before switching
+            self._refill()
+            self.requests_per_second, self.burst, self.max_concurrent = limits
+            self._tokens = min(self._tokens, self.burst)
+            self._dispatch()
+
+    @property
+    def active(self) -> int:
+        """Number of requests holding a slot."""
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    async def acquire(self) -> float:
+        """
+        Wait for a slot.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop, loop.create_future())
+        with self._lock:
+            self._waiters.append(waiter)
+            self._dispatch()
+
+        try:
+            if not waiter.granted:
+                await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked()
+                else:
+                    self._waiters.remove(waiter)
+                    self._dispatch()
+            raise
+
+        waited = time.monotonic() - start
+        self.wait_times.observe(waited)
+        return waited
+
+    def release(self) -> None:
+        """Give back a slot obtained with ``acquire``."""
+        with self._lock:
+            self._release_locked()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """
+        Hold a slot for the duration of the block.
+
+        Yields:
+            Seconds spent waiting for the slot.
+        """
+        waited = await self.acquire()
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def get_stats(self) -> dict:
+        """Limits, current load and the distribution of wait times."""
+        waits = self.wait_times.to_dict()
+        return {
+            "requests_per_second": self.requests_per_second,
+            "max_concurrent": self.max_concurrent,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "requests": waits["count"],
+            "wait_mean": waits["mean"],
+            "wait_p50": waits["p50"],
+            "wait_p95": waits["p95"],
+            "wait_max": waits["max"],
+        }
+
+    def _release_locked(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.requests_per_second:
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._refilled_at) * self.requests_per_second,
+            )
+        self._refilled_at = now
+
+    def _dispatch(self) -> None:
+        """Grant slots to queued requests in order; called with the lock held."""
+        self._refill()
+        while self._waiters:
+            if self.max_concurrent is not None and self._active >= self.max_concurrent:
+                return  # release() dispatches again
+            if self.requests_per_second and self._tokens < 1:
+                self._schedule_refill()
+                return
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self._active += 1
+            if self.requests_per_second:
+                self._tokens -= 1
+            waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+
+    def _schedule_refill(self) -> None:
+        """Dispatch again once the next token is available."""
+        if self._timer_pending:
+            return
+        self._timer_pending = True
+        delay = (1 - self._tokens) / self.requests_per_second
+        loop = self._waiters[0].loop
+
+        def on_timer() -> None:
+            with self._lock:
+                self._timer_pending = False
+                self._dispatch()
+
+        loop.call_soon_threadsafe(loop.call_later, delay, on_timer)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_limiters: dict[tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(base_url: str, api_key: str) -> RateLimiter:
+    """
+    Get the shared limiter of a provider account.
+
+    Args:
+        base_url: API base URL.
+        api_key: API key; quotas are usually per key.
+
+    Returns:
+        The RateLimiter for this provider and key (unlimited until configured).
+    """
+    key = (base_url.rstrip("/"), api_key)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter()
+        return limiter
+
+
+def configure_rate_limit(
+    base_url: str,
+    api_key: str,
+    requests_per_second: float | None = None,
+    burst: float | None = None,
+    max_concurrent: int | None = None,
+) -> RateLimiter:
+    """
+    Set the limits of a provider account.
+
+    Args:
+        base_url: API base URL.
+        api_key: API key.
+        requests_per_second: Sustained request rate, or None for no limit.
+        burst: Requests allowed at once after an idle period.
+        max_concurrent: Maximum concurrent streams, or None.
+
+    Returns:
+        The configured RateLimiter.
+    """
+    limiter = get_rate_limiter(base_url, api_key)
+    limiter.configure(requests_per_second, burst, max_concurrent)
+    return limiter
+
+
+def get_rate_limit_stats() -> dict[str, dict]:
+    """Statistics of every limiter, keyed by base URL."""
+    with _limiters_lock:
+        limiters = list(_limiters.items())
+    stats = {}
+    for (base_url, api_key), limiter in limiters:
+        name = base_url
+        if name in stats:
+            name = f"{base_url} (key ...{api_key[-4:]})"
+        stats[name] = limiter.get_stats()
+    return stats
+
+
+def format_rate_limit_stats() -> str:
+    """Format the limiter statistics as a table."""
+    lines = [
+        f"{'provider':<40} {'requests':>8} {'queued':>6} "
+        f"{'wait p50':>9} {'wait p95':>9} {'wait max':>9}"
+    ]
+    for name, stats in get_rate_limit_stats().items():
+        lines.append(
+            f"{name:<40} {stats['requests']:>8} {stats['queued']:>6} "
+            f"{stats['wait_p50']:>8.3f}s {stats['wait_p95']:>8.3f}s {stats['wait_max']:>8.3f}s"
+        )
+    return "\n".join(lines)
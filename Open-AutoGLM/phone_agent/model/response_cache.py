@@ -0,0 +1,260 @@
+"""Cache of model responses for deterministic (temperature 0) requests.
+
+Regression runs replay the same tasks against the same screens, and with
+greedy sampling the model answers identically every time. ``ResponseCache``
+stores the streamed content of a response under a digest of the model
+name, the sampling parameters and the messages (screenshots enter the
+digest as their SHA-256). Recent entries are kept in an in-memory LRU;
+with a directory, entries are also written to disk as one JSON file each,
+so later runs start warm.
+
+``AsyncModelClient`` replays a hit through the same ``StreamParser`` path
+as a live response, so callers see the usual events. Caches are shared
+process-wide per directory.
+
+The prompts state the current date (in the system prompt, or in the first
+user message with ``stable_prefix``). The date is left out of the digest,
+so a replay on a later day reuses the entries of earlier runs.
+
+Example:
+    >>> config = ModelConfig(response_cache=True, response_cache_dir="~/.cache/autoglm")
+    >>> client = AsyncModelClient(config)
+    >>> response = await client.request(messages)  # sent to the server
+    >>> response = await client.request(messages)  # replayed from the cache
+    >>> print(get_response_cache("~/.cache/autoglm").get_stats())
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any
+
+from phone_agent.config import prompts_en, prompts_zh
+
+# Entries kept in memory per cache
+DEFAULT_MAX_ENTRIES = 256
+
+_DATA_URL_PREFIX = "data:"
+
+
+def _date_line_prefix(prompts: Any) -> str:
+    """The text of a prompt module's date line before the date itself."""
+    day = datetime(2000, 1, 1)
+    return prompts.get_date_line(day).removesuffix(prompts.format_date(day))
+
+
+# A date line up to the end of its line; the prefix is kept, the date dropped
+_DATE_LINE_PREFIXES = [
+    _date_line_prefix(prompts) for prompts in (prompts_zh, prompts_en)
+]
+_DATE_LINE_PATTERN = re.compile(
+    f"({'|'.join(map(re.escape, _DATE_LINE_PREFIXES))})[^\n]*"
+)
+
+
+@dataclass
+class CachedResponse:
+    """The streamed content of one response."""
+
+    # Content deltas in the order they arrived
+    chunks: list[str] = field(default_factory=list)
+    # Token usage reported by the server, if any
+    usage: dict[str, int] | None = None
+
+
+def cache_key(config: Any, messages: list[dict[str, Any]]) -> str:
+    """
+    Digest identifying a request.
+
+    Args:
+        config: ModelConfig of the client; the model name and sampling
+            parameters are part of the key.
+        messages: List of message dictionaries in OpenAI format. The date
+            line of the system prompt or the first user message is ignored.
+
+    Returns:
+        Hex SHA-256 digest.
+    """
+    first_user = next(
+        (i for i, m in enumerate(messages) if m.get("role") == "user"), None
+    )
+    normalized = []
+    for index, message in enumerate(messages):
+        if message.get("role") == "system" or index == first_user:
+            message = _strip_date(message)
+        normalized.append(_hash_images(message))
+
+    request = {
+        "model": config.model_name,
+        "max_tokens": config.max_tokens,
+        "temperature": config.temperature,
+        "top_p": config.top_p,
+        "frequency_penalty": config.frequency_penalty,
+        "extra_body": config.extra_body,
+        "messages": normalized,
+    }
+    encoded = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _strip_date(message: dict[str, Any]) -> dict[str, Any]:
+    """Copy of a message with the date of its date line removed."""
+    content = message.get("content")
+    if isinstance(content, str):
+        return {**message, "content": _DATE_LINE_PATTERN.sub(r"\1", content)}
+    if isinstance(content, list):
+        items = [
+            {**item, "text": _DATE_LINE_PATTERN.sub(r"\1", item["text"])}
+            if item.get("type") == "text"
+            else item
+            for item in content
+        ]
+        return {**message, "content": items}
+    return message
+
+
+def _hash_images(message: dict[str, Any]) -> dict[str, Any]:
+    """Copy of a message with inline images replaced by their digest."""
+    content = message.get("content")
+    if not isinstance(content, list):
+        return message
+    items = []
+    for item in content:
+        url = (
+            item.get("image_url", {}).get("url", "")
+            if item.get("type") == "image_url"
+            else ""
+        )
+        if url.startswith(_DATA_URL_PREFIX):
+            digest = hashlib.sha256(url.encode("ascii", "replace")).hexdigest()
+            item = {"type": "image_url", "image_url": {"url": f"sha256:{digest}"}}
+        items.append(item)
+    return {**message, "content": items}
+
+
+class ResponseCache:
+    """
+    In-memory LRU of responses, optionally backed by a directory.
+
+    Args:
+        directory: Directory for the on-disk store, or None for memory only.
+        max_entries: Entries kept in memory.
+    """
+
+    def __init__(
+        self, directory: str | None = None, max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, key: str) -> CachedResponse | None:
+        """Look up a response, from memory or disk."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._load(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        """Store a response in memory and on disk."""
+        with self._lock:
+            self._remember(key, entry)
+        self._save(key, entry)
+
+    def clear(self) -> None:
+        """Forget the in-memory entries; files on disk are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Hit and miss counts."""
+        lookups = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _load(self, key: str) -> CachedResponse | None:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return CachedResponse(chunks=list(data["chunks"]), usage=data.get("usage"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Warning: Ignoring unreadable response cache entry {key}: {e}")
+            return None
+
+    def _save(self, key: str, entry: CachedResponse) -> None:
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Failed to write response cache entry {key}: {e}")
+
+
+_caches: dict[str | None, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(directory: str | None = None) -> ResponseCache:
+    """
+    Get the shared cache of a directory.
+
+    Args:
+        directory: Directory of the on-disk store, or None for the
+            process-wide memory-only cache.
+
+    Returns:
+        The ResponseCache for this directory.
+    """
+    key = os.path.abspath(os.path.expanduser(directory)) if directory else None
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = ResponseCache(key)
+        return cache
@@ -0,0 +1,287 @@
+"""Retries with backoff and a circuit breaker for model requests.
+
+``stream_with_retry`` wraps the event stream of an ``AsyncModelClient`` or
+``ModelRouter``. When a request fails with a retryable error (connection
+errors, timeouts, 408/409/429 and 5xx responses) it waits with jittered
+exponential backoff, or as long as the server's Retry-After header asks,
+and sends the request again. This is safe mid-stream: a ``Retry`` event
+tells the consumer to discard the thinking received so far, and nothing
+else is emitted before the request succeeds.
+
+A ``CircuitBreaker`` per provider opens after several consecutive failed
+attempts, so further requests fail immediately with ``CircuitOpenError``
+instead of waiting through retries while the provider is down. After a
+cool-down one trial request is let through.
+
+Example:
+    >>> policy = RetryPolicy(max_retries=3)
+    >>> async for event in stream_with_retry(client, messages, policy):
+    ...     if isinstance(event, Retry):
+    ...         print(f"retrying in {event.delay:.1f}s: {event.error}")
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+import openai
+
+# Status codes worth retrying: timeouts, conflicts, rate limits, server errors
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+@dataclass
+class RetryPolicy:
+    """How model requests are retried."""
+
+    # Retries after the first attempt; 0 disables retrying
+    max_retries: int = 3
+    # Backoff before retry n is uniform in [0, min(max_delay, base_delay * 2**n)]
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    # Give up instead of waiting when the server asks for a longer Retry-After
+    max_retry_after: float = 60.0
+    # Consecutive failed attempts that open the provider's circuit breaker
+    circuit_failure_threshold: int = 5
+    # Seconds the circuit stays open before a trial request
+    circuit_reset_timeout: float = 30.0
+
+
+@dataclass
+class Retry:
+    """A failed attempt that will be retried; discard partial output."""
+
+    attempt: int
+    error: str
+    # Time spent in the failed attempt and the wait before the next one
+    elapsed: float
+    delay: float
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without contacting the provider while its circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Closed: requests pass. After ``failure_threshold`` consecutive failures
+    it opens and requests fail fast for ``reset_timeout`` seconds. Then it is
+    half-open: one trial request passes; success closes the circuit, failure
+    opens it again.
+
+    Args:
+        failure_threshold: Consecutive failures that open the circuit.
+        reset_timeout: Seconds before a trial request is allowed.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        """Current state: "closed", "open" or "half-open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return "open"
+            return "half-open"
+
+    def check(self) -> None:
+        """
+        Ask to send a request.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with the
+                trial request already in flight.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial_running:
+                raise CircuitOpenError(
+                    f"Model provider unavailable after {self._failures} consecutive "
+                    f"failures, retrying in {max(remaining, 0):.1f}s"
+                )
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        """Report a successful request."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Report a failed request."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def abandon(self) -> None:
+        """Report a request that was cancelled before it succeeded or failed."""
+        with self._lock:
+            self._trial_running = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(
+    base_url: str, policy: RetryPolicy | None = None
+) -> CircuitBreaker:
+    """
+    Get the shared circuit breaker of a provider.
+
+    Args:
+        base_url: API base URL.
+        policy: Thresholds used when the breaker is created.
+
+    Returns:
+        The CircuitBreaker for this base URL.
+    """
+    policy = policy or RetryPolicy()
+    key = base_url.rstrip("/")
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker(
+                policy.circuit_failure_threshold, policy.circuit_reset_timeout
+            )
+        return breaker
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error from a model request is transient."""
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    if isinstance(error, (openai.APIConnectionError, ConnectionError, TimeoutError)):
+        return True
+    # Transport errors raised while reading the stream are not wrapped by openai
+    return type(error).__module__.split(".")[0].startswith(("httpx", "httpcore"))
+
+
+def retry_after(error: BaseException) -> float | None:
+    """Seconds the server asked to wait (Retry-After header), if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+def backoff_delay(
+    policy: RetryPolicy, retry: int, error: BaseException
+) -> float | None:
+    """
+    Delay before the given retry (0-based), or None to give up.
+
+    Uses the server's Retry-After when present, otherwise full-jitter
+    exponential backoff.
+    """
+    requested = retry_after(error)
+    if requested is not None:
+        return requested if requested <= policy.max_retry_after else None
+    return random.uniform(0, min(policy.max_delay, policy.base_delay * 2**retry))
+
+
+async def stream_with_retry(
+    client: Any,
+    messages: list[dict[str, Any]],
+    policy: RetryPolicy | None = None,
+    breaker: CircuitBreaker | None = None,
+) -> AsyncIterator[Any]:
+    """
+    Stream a request, retrying transient failures.
+
+    Args:
+        client: AsyncModelClient or ModelRouter.
+        messages: List of message dictionaries in OpenAI format.
+        policy: Retry policy. Defaults to the client's ``config.retry``.
+        breaker: Circuit breaker. Defaults to the shared breaker of the
+            client's base URL; a ModelRouter keeps one per endpoint itself,
+            so none is used for it by default.
+
+    Yields:
+        The client's events, with a ``Retry`` event before each retry.
+
+    Raises:
+        CircuitOpenError: If the provider's circuit is open.
+        Exception: The last error once retries are exhausted or the error is
+            not retryable.
+    """
+    policy = policy or client.config.retry
+    if breaker is None:
+        from phone_agent.model.router import ModelRouter
+
+        # A router records the outcome of each endpoint in its own breaker
+        if not isinstance(client, ModelRouter):
+            breaker = get_circuit_breaker(client.config.base_url, policy)
+
+    for attempt in range(policy.max_retries + 1):
+        if breaker is not None:
+            breaker.check()
+        start = time.monotonic()
+        finished = False
+        try:
+            async for event in client.stream(messages):
+                yield event
+            finished = True
+        except Exception as e:
+            finished = True
+            if not is_retryable(e):
+                if breaker is not None:
+                    breaker.record_success()  # The provider is up and answered
+                raise
+            if breaker is not None:
+                breaker.record_failure()
+            delay = backoff_delay(policy, attempt, e)
+            if attempt == policy.max_retries or delay is None:
+                raise
+            yield Retry(
+                attempt=attempt + 1,
+                error=f"{type(e).__name__}: {e}",
+                elapsed=time.monotonic() - start + delay,
+                delay=delay,
+            )
+            await asyncio.sleep(delay)
+            continue
+        finally:
+            if not finished and breaker is not None:
+                # Cancelled by the consumer
+                breaker.abandon()
+        if breaker is not None:
+            breaker.record_success()
+        return
@@ -0,0 +1,421 @@
+"""Latency-aware routing across several model endpoints.
+
+``ModelRouter`` holds the primary endpoint of a ``ModelConfig`` plus its
+``endpoints`` and keeps a rolling window of time to first token (TTFT) and
+errors for each of them. Every request goes to the fastest healthy endpoint;
+endpoints without measurements are tried first so that all of them get
+measured. If a request fails before streaming anything, the next endpoint is
+tried. Each endpoint reports to the circuit breaker of its own base URL (see
+``model.retry``), and endpoints whose circuit is open are skipped.
+
+With ``hedge`` enabled, a second request is sent to the next endpoint when
+the first has not produced anything within the p95 TTFT of its endpoint.
+Whichever answers first is used and the other stream is closed, which also
+cancels its generation on the server.
+
+Example:
+    >>> config = ModelConfig(
+    ...     base_url="https://open.bigmodel.cn/api/paas/v4",
+    ...     api_key="key",
+    ...     model_name="autoglm-phone",
+    ...     endpoints=[ModelEndpoint("http://localhost:8000/v1", model_name="autoglm-phone-9b")],
+    ...     hedge=True,
+    ... )
+    >>> router = ModelRouter(config)
+    >>> async for event in router.stream(messages):
+    ...     ...
+    >>> print(router.format_stats())
+"""
+
+import asyncio
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator
+from urllib.parse import urlsplit
+
+from phone_agent.model.async_client import (
+    AsyncModelClient,
+    StreamEvent,
+    Timing,
+    response_from_events,
+)
+from phone_agent.model.client import ModelConfig, ModelResponse
+from phone_agent.model.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    get_circuit_breaker,
+    is_retryable,
+    stream_with_retry,
+)
+
+# Number of recent requests per endpoint used for the statistics
+WINDOW = 50
+
+# An endpoint with this many consecutive failures, or failing more than
+# MAX_ERROR_RATE of its recent requests, is skipped for COOLDOWN seconds
+MAX_CONSECUTIVE_ERRORS = 3
+MAX_ERROR_RATE = 0.5
+COOLDOWN = 30.0
+
+# Endpoints without a measurement for this many seconds are probed again,
+# so a provider that had a latency spike gets another chance
+PROBE_INTERVAL = 60.0
+
+# Samples needed before the error rate and the p95 TTFT are trusted; until
+# then hedging waits DEFAULT_HEDGE_DELAY
+MIN_SAMPLES = 5
+DEFAULT_HEDGE_DELAY = 5.0
+
+_DONE = object()
+
+
+@dataclass
+class EndpointStats:
+    """Rolling TTFT and error statistics of one endpoint."""
+
+    ttfts: deque = field(default_factory=lambda: deque(maxlen=WINDOW))
+    outcomes: deque = field(default_factory=lambda: deque(maxlen=WINDOW))
+    requests: int = 0
+    errors: int = 0
+    hedges_won: int = 0
+    consecutive_errors: int = 0
+    cooldown_until: float = 0.0
+    last_sample: float = 0.0
+
+    def observe(self, ttft: float) -> None:
+        """Record a successful request."""
+        self.requests += 1
+        self.ttfts.append(ttft)
+        self.outcomes.append(True)
+        self.consecutive_errors = 0
+        self.last_sample = time.monotonic()
+
+    def observe_error(self) -> None:
+        """Record a failed request."""
+        self.requests += 1
+        self.errors += 1
+        self.outcomes.append(False)
+        self.consecutive_errors += 1
+        self.last_sample = time.monotonic()
+        if self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS or (
+            len(self.outcomes) >= MIN_SAMPLES and self.error_rate > MAX_ERROR_RATE
+        ):
+            self.cooldown_until = self.last_sample + COOLDOWN
+
+    @property
+    def error_rate(self) -> float:
+        """Share of failed requests in the window."""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the endpoint should receive requests (it is not cooling down)."""
+        return time.monotonic() >= self.cooldown_until
+
+    @property
+    def stale(self) -> bool:
+        """Whether the endpoint has no recent TTFT measurement."""
+        return not self.ttfts or time.monotonic() - self.last_sample > PROBE_INTERVAL
+
+    def ttft_percentile(self, pct: float) -> float | None:
+        """TTFT percentile over the window, or None without samples."""
+        if not self.ttfts:
+            return None
+        ordered = sorted(self.ttfts)
+        index = min(len(ordered) - 1, int(pct / 100 * len(ordered)))
+        return ordered[index]
+
+    def to_dict(self) -> dict:
+        """Summary of the statistics."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.error_rate,
+            "healthy": self.healthy,
+            "hedges_won": self.hedges_won,
+            "ttft_p50": statistics.median(self.ttfts) if self.ttfts else None,
+            "ttft_p95": self.ttft_percentile(95),
+        }
+
+
+@dataclass
+class _Route:
+    """An endpoint with its client and statistics."""
+
+    name: str
+    client: AsyncModelClient
+    breaker: CircuitBreaker
+    stats: EndpointStats = field(default_factory=EndpointStats)
+
+
+class _Attempt:
+    """One in-flight request whose events are forwarded to a shared queue."""
+
+    def __init__(
+        self, route: _Route, messages: list[dict[str, Any]], queue: asyncio.Queue
+    ):
+        self.route = route
+        self.hedged = False
+        self.start = time.monotonic()
+        # Whether the outcome was reported to the endpoint's circuit breaker
+        self.recorded = False
+        self.task = asyncio.create_task(
+            self._pump(route.client.stream(messages), queue)
+        )
+        self.task.add_done_callback(self._on_done)
+
+    async def _pump(
+        self, events: AsyncIterator[StreamEvent], queue: asyncio.Queue
+    ) -> None:
+        try:
+            async for event in events:
+                await queue.put((self, event))
+        except Exception as e:
+            self.recorded = True
+            if is_retryable(e):
+                self.route.breaker.record_failure()
+            else:
+                self.route.breaker.record_success()  # The provider is up and answered
+            await queue.put((self, e))
+        else:
+            self.recorded = True
+            self.route.breaker.record_success()
+            await queue.put((self, _DONE))
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if not self.recorded:
+            # Cancelled, e.g. the losing attempt of a hedge
+            self.route.breaker.abandon()
+
+    def cancel(self) -> None:
+        # Cancelling runs the stream's cleanup, which closes the HTTP response
+        self.task.cancel()
+
+
+class ModelRouter:
+    """
+    Route requests to the fastest healthy endpoint, optionally hedged.
+
+    Has the same ``stream`` and ``request`` methods as AsyncModelClient.
+
+    Args:
+        config: Model configuration. ``base_url``/``api_key``/``model_name``
+            form the first endpoint, ``endpoints`` the others, and ``hedge``
+            enables hedged requests.
+    """
+
+    def __init__(self, config: ModelConfig):
+        self.config = config
+        self.hedge = config.hedge
+        self._routes = [
+            _Route(
+                _endpoint_name(config.base_url),
+                AsyncModelClient(config),
+                get_circuit_breaker(config.base_url, config.retry),
+            )
+        ]
+        for endpoint in config.endpoints:
+            endpoint_config = replace(
+                config,
+                base_url=endpoint.base_url,
+                api_key=endpoint.api_key,
+                model_name=endpoint.model_name or config.model_name,
+                endpoints=[],
+            )
+            if endpoint.requests_per_second is not None:
+                endpoint_config.requests_per_second = endpoint.requests_per_second
+            if endpoint.max_concurrent_requests is not None:
+                endpoint_config.max_concurrent_requests = (
+                    endpoint.max_concurrent_requests
+                )
+            name = endpoint.name or _endpoint_name(endpoint.base_url)
+            if any(route.name == name for route in self._routes):
+                name = f"{name}#{len(self._routes)}"
+            self._routes.append(
+                _Route(
+                    name,
+                    AsyncModelClient(endpoint_config),
+                    get_circuit_breaker(endpoint.base_url, config.retry),
+                )
+            )
+
+    def rank(self) -> list[str]:
+        """
+        Endpoint names in the order they would be tried.
+
+        Healthy endpoints come first, endpoints without a recent
+        measurement before measured ones, then by median TTFT. Endpoints
+        cooling down come last.
+        """
+        return [route.name for route in self._ranked()]
+
+    def get_stats(self) -> dict[str, dict]:
+        """Statistics per endpoint name."""
+        return {route.name: route.stats.to_dict() for route in self._routes}
+
+    def format_stats(self) -> str:
+        """Format the endpoint statistics as a table."""
+        lines = [
+            f"{'endpoint':<32} {'requests':>8} {'errors':>6} {'hedged':>6} "
+            f"{'p50':>8} {'p95':>8}  status"
+        ]
+        for name, stats in self.get_stats().items():
+            p50 = f"{stats['ttft_p50']:.3f}s" if stats["ttft_p50"] is not None else "-"
+            p95 = f"{stats['ttft_p95']:.3f}s" if stats["ttft_p95"] is not None else "-"
+            lines.append(
+                f"{name:<32} {stats['requests']:>8} {stats['errors']:>6} "
+                f"{stats['hedges_won']:>6} {p50:>8} {p95:>8}  "
+                f"{'healthy' if stats['healthy'] else 'unhealthy'}"
+            )
+        return "\n".join(lines)
+
+    async def stream(
+        self, messages: list[dict[str, Any]]
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Send a request to the best endpoint and yield its events.
+
+        Args:
+            messages: List of message dictionaries in OpenAI format.
+
+        Yields:
+            The events of the endpoint that answered first, see
+            ``AsyncModelClient.stream``.
+
+        Raises:
+            CircuitOpenError: If the circuit of every endpoint is open.
+            Exception: The error of the last endpoint tried, if all failed
+                before streaming anything, or an error after streaming began.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        backups = self._ranked()
+        first = self._start(backups, messages, queue)
+        if first is None:
+            raise CircuitOpenError("Every model endpoint has an open circuit")
+        attempts = [first]
+        hedge_at = self._hedge_deadline(first.route) if backups else None
+        winner = None
+
+        try:
+            # Wait for the first event of any attempt
+            while winner is None:
+                timeout = (
+                    None if hedge_at is None else max(0.0, hedge_at - time.monotonic())
+                )
+                try:
+                    attempt, item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    hedge_at = None
+                    # None if a failover already used up the other endpoints
+                    hedged = self._start(backups, messages, queue)
+                    if hedged is not None:
+                        hedged.hedged = True
+                        attempts.append(hedged)
+                    continue
+
+                if isinstance(item, Exception) or item is _DONE:
+                    attempt.route.stats.observe_error()
+                    attempts.remove(attempt)
+                    if not attempts:
+                        # Fail over to the next endpoint
+                        failover = self._start(backups, messages, queue)
+                        if failover is None:
+                            if item is _DONE:
+                                raise RuntimeError(
+                                    "Model stream ended without a response"
+                                )
+                            raise item
+                        attempts.append(failover)
+                        if not backups:
+                            hedge_at = None
+                    continue
+                winner = attempt
+
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.cancel()
+                    # Its TTFT is at least the time waited so far; without
+                    # this sample a spiking endpoint would look fast
+                    attempt.route.stats.observe(time.monotonic() - attempt.start)
+            if winner.hedged:
+                winner.route.stats.hedges_won += 1
+
+            # Forward the winner's events
+            while True:
+                if isinstance(item, Exception):
+                    winner.route.stats.observe_error()
+                    raise item
+                if item is _DONE:
+                    return
+                if isinstance(item, Timing):
+                    winner.route.stats.observe(
+                        item.time_to_first_token
+                        if item.time_to_first_token is not None
+                        else item.total_time
+                    )
+                yield item
+
+                attempt, item = await queue.get()
+                while attempt is not winner:
+                    attempt, item = await queue.get()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def request(self, messages: list[dict[str, Any]]) -> ModelResponse:
+        """
+        Send a request, retrying transient errors, and wait for the response.
+
+        Args:
+            messages: List of message dictionaries in OpenAI format.
+
+        Returns:
+            ModelResponse containing thinking and action.
+        """
+        return response_from_events(
+            [event async for event in stream_with_retry(self, messages)]
+        )
+
+    def _start(
+        self,
+        backups: list[_Route],
+        messages: list[dict[str, Any]],
+        queue: asyncio.Queue,
+    ) -> _Attempt | None:
+        """Start a request on the next endpoint whose circuit lets it through."""
+        while backups:
+            route = backups.pop(0)
+            try:
+                route.breaker.check()
+            except CircuitOpenError:
+                continue
+            return _Attempt(route, messages, queue)
+        return None
+
+    def _ranked(self) -> list[_Route]:
+        def key(item: tuple[int, _Route]) -> tuple:
+            index, route = item
+            stats = route.stats
+            median = 0.0 if stats.stale else statistics.median(stats.ttfts)
+            return (not stats.healthy, not stats.stale, median, index)
+
+        return [route for _, route in sorted(enumerate(self._routes), key=key)]
+
+    def _hedge_deadline(self, route: _Route) -> float | None:
+        """Monotonic time at which to send a hedged request, or None."""
+        if not self.hedge:
+            return None
+        delay = DEFAULT_HEDGE_DELAY
+        if len(route.stats.ttfts) >= MIN_SAMPLES:
+            delay = route.stats.ttft_percentile(95)
+        return time.monotonic() + delay
+
+
+def _endpoint_name(base_url: str) -> str:
+    """Short endpoint name, e.g. "open.bigmodel.cn/api/paas/v4"."""
+    parts = urlsplit(base_url)
+    return (parts.netloc + parts.path).rstrip("/") or base_url
@@ -0,0 +1,314 @@
+"""Incremental parser for streamed model responses.
+
+The model answers with free-form thinking followed by an action, optionally
+wrapped in ``<think>``/``<answer>`` tags::
+
+    <think>The search box is at the top</think><answer>do(action="Tap", element=[500, 80])</answer>
+
+``StreamParser`` splits the stream into thinking and action while it
+arrives. The action markers and tags are matched with an Aho-Corasick
+automaton whose state carries over between chunks, so each chunk costs
+O(len(chunk)) no matter how much text came before it. The automaton state
+also tells how many trailing characters may still turn out to be a marker,
+which is exactly the text that must not be printed yet.
+
+Example:
+    >>> parser = StreamParser()
+    >>> parser.feed("<think>Open the app do(act")
+    'Open the app '
+    >>> parser.feed('ion="Back")</answer>')
+    ''
+    >>> parser.result()
+    ('Open the app', 'do(action="Back")')
+"""
+
+import ast
+from collections import deque
+
+ACTION_MARKERS = ("finish(message=", "do(action=")
+
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</think>"
+_ANSWER_OPEN = "<answer>"
+_ANSWER_CLOSE = "</answer>"
+
+# Actions whose string argument is copied verbatim and may contain unescaped quotes
+_RAW_TEXT_ACTIONS = ('do(action="Type"', 'do(action="Type_Name"', "finish(")
+
+# Parser phases
+_THINKING = "thinking"
+_ANSWER = "answer"  # inside <answer> before an action marker
+_ACTION = "action"
+_DONE = "done"
+
+
+class _Automaton:
+    """Aho-Corasick automaton over a fixed set of patterns."""
+
+    def __init__(self, patterns: tuple[str, ...]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.depth: list[int] = [0]
+        self.output: list[str | None] = [None]
+
+        for pattern in patterns:
+            state = 0
+            for ch in pattern:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.depth.append(self.depth[state] + 1)
+                    self.output.append(None)
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.output[state] = pattern
+
+        # Breadth-first fail links; inherit the output of the fail state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                if self.output[child] is None:
+                    self.output[child] = self.output[self.fail[child]]
+
+    def step(self, state: int, ch: str) -> int:
+        while state and ch not in self.goto[state]:
+            state = self.fail[state]
+        return self.goto[state].get(ch, 0)
+
+
+_AUTOMATON = _Automaton(
+    ACTION_MARKERS + (_THINK_OPEN, _THINK_CLOSE, _ANSWER_OPEN, _ANSWER_CLOSE)
+)
+
+
+class _ActionScanner:
+    """
+    Decide incrementally whether an action expression is complete.
+
+    Tracks parenthesis depth outside string literals. A ``do(...)`` call is
+    complete once its closing parenthesis arrives and it parses as a Python
+    expression. Type and finish carry free text that may contain unbalanced
+    quotes, so their closing parenthesis only counts once the next
+    non-whitespace character opens a tag such as ``</answer>``.
+    """
+
+    def __init__(self):
+        self.end: int | None = None
+        self.failed = False
+        self._depth = 0
+        self._quote: str | None = None
+        self._escaped = False
+        self._close: int | None = None
+        # Text up to the closing parenthesis, needed to check the expression
+        self._chars: list[str] = []
+
+    def feed(self, ch: str) -> None:
+        if self.end is not None or self.failed:
+            return
+
+        if self._close is not None:
+            # Raw-text action: wait for the first character after the call
+            if ch == "<":
+                self.end = self._close
+            elif not ch.isspace():
+                self.failed = True
+            return
+
+        self._chars.append(ch)
+        if self._quote:
+            if self._escaped:
+                self._escaped = False
+            elif ch == "\\":
+                self._escaped = True
+            elif ch == self._quote:
+                self._quote = None
+        elif ch in "\"'":
+            self._quote = ch
+        elif ch in "([{":
+            self._depth += 1
+        elif ch in ")]}":
+            self._depth -= 1
+            if self._depth == 0:
+                self._closed(len(self._chars))
+
+    def _closed(self, close: int) -> None:
+        expression = "".join(self._chars)
+        self._chars = []
+        if expression.startswith(_RAW_TEXT_ACTIONS):
+            self._close = close
+            return
+        expression = (
+            expression.replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+        )
+        try:
+            ast.parse(expression, mode="eval")
+        except SyntaxError:
+            self.failed = True
+            return
+        self.end = close
+
+
+def find_action_end(action: str) -> int | None:
+    """
+    Check whether a streamed action expression is complete.
+
+    Args:
+        action: Response text starting at "do(action=" or "finish(message=".
+
+    Returns:
+        Length of the complete action, or None if more content is needed.
+
+    Example:
+        >>> find_action_end('do(action="Back")</answer>')
+        17
+        >>> find_action_end('finish(message="Done")') is None
+        True
+    """
+    scanner = _ActionScanner()
+    for ch in action:
+        scanner.feed(ch)
+        if scanner.end is not None:
+            return scanner.end
+    return None
+
+
+class StreamParser:
+    """
+    Split a streamed model response into thinking and action.
+
+    Rules, applied as the text arrives:
+
+    1. The action starts at the first "finish(message=" or "do(action="
+       marker; everything before it is thinking.
+    2. ``<think>``, ``</think>`` and ``<answer>`` tags are dropped from the
+       thinking, and the action ends at ``</answer>``.
+    3. Without a marker, the content of ``<answer>`` is the action.
+    4. Without a marker or ``<answer>``, the whole content is the action.
+    """
+
+    def __init__(self):
+        self._state = 0
+        self._phase = _THINKING
+        self._raw: list[str] = []
+        self._raw_length = 0
+        self._thinking: list[str] = []
+        self._answer: list[str] = []
+        self._action: list[str] = []
+        self._printed = 0
+        self._action_start: int | None = None
+        self._scanner: _ActionScanner | None = None
+
+    @property
+    def in_action(self) -> bool:
+        """Whether an action marker has been seen."""
+        return self._scanner is not None
+
+    @property
+    def action_complete(self) -> bool:
+        """Whether the action expression is syntactically complete."""
+        return self._scanner is not None and self._scanner.end is not None
+
+    @property
+    def raw_action_end(self) -> int | None:
+        """Offset in the raw content just past the complete action."""
+        if not self.action_complete:
+            return None
+        return self._action_start + self._scanner.end
+
+    @property
+    def raw(self) -> str:
+        """All content fed so far."""
+        return "".join(self._raw)
+
+    def feed(self, chunk: str) -> str:
+        """
+        Process the next chunk of the stream.
+
+        Args:
+            chunk: Newly received text.
+
+        Returns:
+            Thinking text that is now safe to print (it cannot be the start
+            of a marker any more).
+        """
+        self._raw.append(chunk)
+        for ch in chunk:
+            self._raw_length += 1
+            self._state = _AUTOMATON.step(self._state, ch)
+            match = _AUTOMATON.output[self._state]
+
+            if self._phase == _ACTION:
+                self._action.append(ch)
+                self._scanner.feed(ch)
+                if self._scanner.end is not None:
+                    # Anything after the complete expression is padding
+                    del self._action[self._scanner.end :]
+                    self._phase = _DONE
+                elif match == _ANSWER_CLOSE:
+                    del self._action[-len(_ANSWER_CLOSE) :]
+                    self._phase = _DONE
+                continue
+            if self._phase == _DONE:
+                continue
+
+            target = self._thinking if self._phase == _THINKING else self._answer
+            target.append(ch)
+            if match is None:
+                continue
+
+            del target[-len(match) :]
+            if match in ACTION_MARKERS:
+                if self._phase == _ANSWER:
+                    self._thinking.extend(self._answer)
+                    self._answer.clear()
+                self._phase = _ACTION
+                self._action_start = self._raw_length - len(match)
+                self._action.extend(match)
+                self._scanner = _ActionScanner()
+                for marker_ch in match:
+                    self._scanner.feed(marker_ch)
+            elif match == _ANSWER_OPEN and self._phase == _THINKING:
+                self._phase = _ANSWER
+            elif match == _ANSWER_CLOSE and self._phase == _ANSWER:
+                self._phase = _DONE
+
+        return self._printable()
+
+    def flush(self) -> str:
+        """Return the thinking text still held back at the end of the stream."""
+        if self._phase != _THINKING:
+            return ""
+        text = "".join(self._thinking[self._printed :])
+        self._printed = len(self._thinking)
+        return text
+
+    def result(self) -> tuple[str, str]:
+        """
+        Get the parsed response.
+
+        Returns:
+            Tuple of (thinking, action).
+        """
+        if self._scanner is not None:
+            return "".join(self._thinking).strip(), "".join(self._action)
+        if self._answer or self._phase in (_ANSWER, _DONE):
+            return "".join(self._thinking).strip(), "".join(self._answer).strip()
+        return "", self.raw
+
+    def _printable(self) -> str:
+        if self._phase == _THINKING:
+            # Hold back the characters that may still become a marker
+            limit = len(self._thinking) - _AUTOMATON.depth[self._state]
+        else:
+            limit = len(self._thinking)
+        if limit <= self._printed:
+            return ""
+        text = "".join(self._thinking[self._printed : limit])
+        self._printed = limit
+        return text
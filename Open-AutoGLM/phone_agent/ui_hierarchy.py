@@ -0,0 +1,472 @@
+"""UI hierarchy snapshots and step-to-step diffing.
+
+The accessibility tree is pulled with ``uiautomator dump`` (ADB),
+``uitest dumpLayout`` (HDC) or WebDriverAgent ``/source`` (iOS) and reduced
+to a flat list of meaningful nodes: anything with text, a description or an
+ID, and anything clickable, scrollable or focused. Comparing two snapshots
+is much cheaper than comparing screenshots and tells whether an action had
+any effect, which input field has focus and whether a list was scrolled.
+
+Example:
+    >>> from phone_agent.ui_hierarchy import UIStateTracker, dump_hierarchy
+    >>> tracker = UIStateTracker()
+    >>> tracker.update(dump_hierarchy("emulator-5554"))
+    >>> # ... perform an action ...
+    >>> diff = tracker.update(dump_hierarchy("emulator-5554"))
+    >>> diff.changed
+    True
+    >>> print(diff.summary())
+    UI changed: 12 elements added, 9 removed
+"""
+
+import hashlib
+import json
+import re
+import subprocess
+import xml.etree.ElementTree as ET
+from collections import Counter
+from dataclasses import dataclass, field
+
+from phone_agent.command_runner import run_command
+from phone_agent.device_factory import DeviceType
+
+_BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+# Remote paths used for layout dumps
+_ADB_DUMP_PATH = "/sdcard/phone_agent_ui.xml"
+_HDC_DUMP_PATH = "/data/local/tmp/phone_agent_ui.json"
+
+# Element types that accept text input
+_INPUT_TYPES = (
+    "EditText",
+    "TextField",
+    "TextInput",
+    "SearchField",
+    "TextView",
+    "TextArea",
+)
+
+# iOS element types that scroll
+_IOS_SCROLLABLE = ("ScrollView", "Table", "CollectionView", "WebView")
+
+
+@dataclass(frozen=True)
+class UINode:
+    """A meaningful element of the UI hierarchy."""
+
+    cls: str
+    text: str = ""
+    resource_id: str = ""
+    description: str = ""
+    bounds: tuple[int, int, int, int] = (0, 0, 0, 0)
+    clickable: bool = False
+    scrollable: bool = False
+    focused: bool = False
+    # For scrollable nodes: label and top edge of the first labelled descendant
+    scroll_anchor: tuple[str, int] | None = None
+
+    @property
+    def key(self) -> tuple:
+        """Identity used when diffing snapshots."""
+        return (self.cls, self.resource_id, self.text, self.description, self.bounds)
+
+    @property
+    def label(self) -> str:
+        """Best human-readable name of the node."""
+        return self.text or self.description or self.resource_id or self.cls
+
+    @property
+    def is_input(self) -> bool:
+        """Whether the node is a text input field."""
+        return any(t in self.cls for t in _INPUT_TYPES)
+
+
+@dataclass
+class UISnapshot:
+    """Compact representation of one UI hierarchy dump."""
+
+    nodes: list[UINode] = field(default_factory=list)
+
+    @property
+    def signature(self) -> str:
+        """Stable digest of the snapshot; equal snapshots have equal signatures."""
+        digest = hashlib.blake2b(digest_size=16)
+        for node in self.nodes:
+            digest.update(repr((node.key, node.focused, node.scroll_anchor)).encode())
+        return digest.hexdigest()
+
+    def focused_input(self) -> UINode | None:
+        """The focused text input field, if any."""
+        for node in self.nodes:
+            if node.focused and node.is_input:
+                return node
+        return None
+
+    def scroll_positions(self) -> dict[tuple, tuple[str, int]]:
+        """Scroll anchors of all scrollable containers, keyed by container."""
+        return {
+            (n.cls, n.resource_id, n.bounds): n.scroll_anchor
+            for n in self.nodes
+            if n.scrollable and n.scroll_anchor is not None
+        }
+
+
+@dataclass
+class UIDiff:
+    """Difference between two consecutive UI snapshots."""
+
+    added: list[UINode] = field(default_factory=list)
+    removed: list[UINode] = field(default_factory=list)
+    focus_changed: bool = False
+    focused_input: UINode | None = None
+    # Container label -> vertical scroll offset in pixels (None if unknown)
+    scrolled: dict[str, int | None] = field(default_factory=dict)
+
+    @property
+    def changed(self) -> bool:
+        """Whether anything meaningful changed."""
+        return bool(self.added or self.removed or self.focus_changed or self.scrolled)
+
+    def summary(self) -> str:
+        """One-line description suitable for logs and prompts."""
+        if not self.changed:
+            return "UI unchanged since the previous step"
+        parts = []
+        if self.added or self.removed:
+            parts.append(
+                f"{len(self.added)} elements added, {len(self.removed)} removed"
+            )
+        for name, offset in self.scrolled.items():
+            parts.append(
+                f"scrolled {name}" + (f" by {offset}px" if offset is not None else "")
+            )
+        if self.focus_changed:
+            parts.append(
+                f"focused input: {self.focused_input.label}"
+                if self.focused_input
+                else "input focus lost"
+            )
+        return "UI changed: " + "; ".join(parts)
+
+
+def diff_snapshots(previous: UISnapshot, current: UISnapshot) -> UIDiff:
+    """
+    Compare two UI snapshots.
+
+    Args:
+        previous: Snapshot taken before the action.
+        current: Snapshot taken after the action.
+
+    Returns:
+        UIDiff describing what changed.
+    """
+    before = Counter(n.key for n in previous.nodes)
+    after = Counter(n.key for n in current.nodes)
+
+    diff = UIDiff(
+        added=_take(current.nodes, after - before),
+        removed=_take(previous.nodes, before - after),
+    )
+
+    old_focus = previous.focused_input()
+    diff.focused_input = current.focused_input()
+    diff.focus_changed = (old_focus.key if old_focus else None) != (
+        diff.focused_input.key if diff.focused_input else None
+    )
+
+    old_scroll = previous.scroll_positions()
+    for container, anchor in current.scroll_positions().items():
+        old_anchor = old_scroll.get(container)
+        if old_anchor is None or old_anchor == anchor:
+            continue
+        name = container[1] or container[0]
+        # Same first item at a different height: the exact offset is known
+        offset = anchor[1] - old_anchor[1] if anchor[0] == old_anchor[0] else None
+        diff.scrolled[name] = offset
+
+    return diff
+
+
+def _take(nodes: list[UINode], counts: Counter) -> list[UINode]:
+    """Pick nodes in order until each key's count is used up."""
+    taken = []
+    for node in nodes:
+        if counts[node.key] > 0:
+            counts[node.key] -= 1
+            taken.append(node)
+    return taken
+
+
+class UIStateTracker:
+    """
+    Remembers the last snapshot and diffs each new one against it.
+
+    Example:
+        >>> tracker = UIStateTracker()
+        >>> tracker.update(snapshot)  # First snapshot, returns None
+        >>> tracker.update(snapshot).changed
+        False
+    """
+
+    def __init__(self):
+        self.previous: UISnapshot | None = None
+
+    def update(self, snapshot: UISnapshot | None) -> UIDiff | None:
+        """
+        Record a new snapshot.
+
+        Args:
+            snapshot: The new snapshot, or None if the dump failed.
+
+        Returns:
+            Diff against the previous snapshot, or None if either is missing.
+        """
+        previous, self.previous = self.previous, snapshot
+        if previous is None or snapshot is None:
+            return None
+        if previous.signature == snapshot.signature:
+            return UIDiff()
+        return diff_snapshots(previous, snapshot)
+
+    def reset(self) -> None:
+        """Forget the previous snapshot."""
+        self.previous = None
+
+
+def dump_hierarchy(
+    device_id: str | None = None, device_type: DeviceType = DeviceType.ADB
+) -> UISnapshot | None:
+    """
+    Dump and parse the UI hierarchy of an Android or HarmonyOS device.
+
+    Args:
+        device_id: Optional device ID.
+        device_type: Device type (ADB or HDC).
+
+    Returns:
+        UISnapshot, or None if the dump failed (e.g. the UI never became idle).
+    """
+    try:
+        if device_type == DeviceType.HDC:
+            return parse_hdc_layout(_dump_hdc(device_id))
+        return parse_uiautomator_xml(_dump_adb(device_id))
+    except (ValueError, ET.ParseError, subprocess.TimeoutExpired, OSError):
+        return None
+
+
+def dump_ios_hierarchy(
+    wda_url: str = "http://localhost:8100", session_id: str | None = None
+) -> UISnapshot | None:
+    """
+    Fetch and parse the UI hierarchy from WebDriverAgent.
+
+    Args:
+        wda_url: WebDriverAgent URL.
+        session_id: Optional WDA session ID.
+
+    Returns:
+        UISnapshot, or None if the request failed.
+    """
+    try:
+        from phone_agent.xctest.session import get_wda_session
+
+        response = get_wda_session(wda_url, session_id).get("source", timeout=10)
+        if response.status_code != 200:
+            return None
+        return parse_wda_source(response.json().get("value", ""))
+    except ImportError:
+        print("Note: requests library not installed. Install: pip install requests")
+    except Exception as e:
+        print(f"WDA source failed: {e}")
+    return None
+
+
+def _dump_adb(device_id: str | None) -> str:
+    """Run uiautomator and return the XML in one adb round trip."""
+    prefix = ["adb", "-s", device_id] if device_id else ["adb"]
+    result = run_command(
+        prefix
+        + [
+            "shell",
+            f"uiautomator dump {_ADB_DUMP_PATH} >/dev/null && cat {_ADB_DUMP_PATH}",
+        ],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    start = result.stdout.find("<?xml")
+    if start < 0:
+        raise ValueError(f"uiautomator dump failed: {result.stdout.strip()}")
+    return result.stdout[start:]
+
+
+def _dump_hdc(device_id: str | None) -> str:
+    """Run uitest dumpLayout and return the JSON in one hdc round trip."""
+    from phone_agent.hdc.connection import _run_hdc_command
+
+    prefix = ["hdc", "-t", device_id] if device_id else ["hdc"]
+    result = _run_hdc_command(
+        prefix
+        + [
+            "shell",
+            f"uitest dumpLayout -p {_HDC_DUMP_PATH} >/dev/null && cat {_HDC_DUMP_PATH}",
+        ],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    start = result.stdout.find("{")
+    if start < 0:
+        raise ValueError(f"uitest dumpLayout failed: {result.stdout.strip()}")
+    return result.stdout[start:]
+
+
+def _parse_bounds(value: str) -> tuple[int, int, int, int]:
+    match = _BOUNDS.search(value or "")
+    if not match:
+        return (0, 0, 0, 0)
+    return tuple(int(v) for v in match.groups())
+
+
+def _is_true(value) -> bool:
+    return str(value).lower() == "true"
+
+
+def _keep(node: UINode) -> bool:
+    """Whether a node carries information worth diffing."""
+    return bool(
+        node.text
+        or node.description
+        or node.resource_id
+        or node.clickable
+        or node.scrollable
+        or node.focused
+    )
+
+
+def _first_label(nodes: list[UINode]) -> tuple[str, int] | None:
+    for node in nodes:
+        if node.text or node.description:
+            return (node.text or node.description, node.bounds[1])
+    return None
+
+
+def parse_uiautomator_xml(xml_text: str) -> UISnapshot:
+    """
+    Parse ``uiautomator dump`` XML.
+
+    Args:
+        xml_text: The dumped XML document.
+
+    Returns:
+        UISnapshot of the meaningful nodes in document order.
+    """
+
+    def walk(element: ET.Element) -> list[UINode]:
+        subtree: list[UINode] = []
+        for child in element:
+            if child.tag != "node":
+                continue
+            a = child.attrib
+            # The status bar clock and notifications change on their own
+            if a.get("package") == "com.android.systemui":
+                continue
+            descendants = walk(child)
+            scrollable = _is_true(a.get("scrollable"))
+            node = UINode(
+                cls=a.get("class", "").rsplit(".", 1)[-1],
+                text=a.get("text", ""),
+                resource_id=a.get("resource-id", "").rsplit("/", 1)[-1],
+                description=a.get("content-desc", ""),
+                bounds=_parse_bounds(a.get("bounds", "")),
+                clickable=_is_true(a.get("clickable")),
+                scrollable=scrollable,
+                focused=_is_true(a.get("focused")),
+                scroll_anchor=_first_label(descendants) if scrollable else None,
+            )
+            subtree.append(node)
+            subtree.extend(descendants)
+        return subtree
+
+    nodes = [n for n in walk(ET.fromstring(xml_text)) if _keep(n)]
+    return UISnapshot(nodes=nodes)
+
+
+def parse_hdc_layout(json_text: str) -> UISnapshot:
+    """
+    Parse ``uitest dumpLayout`` JSON.
+
+    Args:
+        json_text: The dumped JSON document.
+
+    Returns:
+        UISnapshot of the meaningful nodes in document order.
+    """
+
+    def walk(element: dict) -> list[UINode]:
+        subtree: list[UINode] = []
+        for child in element.get("children", []):
+            descendants = walk(child)
+            a = child.get("attributes", {})
+            scrollable = _is_true(a.get("scrollable"))
+            node = UINode(
+                cls=a.get("type", ""),
+                text=a.get("text", ""),
+                resource_id=a.get("id", ""),
+                description=a.get("description", ""),
+                bounds=_parse_bounds(a.get("bounds", "")),
+                clickable=_is_true(a.get("clickable")),
+                scrollable=scrollable,
+                focused=_is_true(a.get("focused")),
+                scroll_anchor=_first_label(descendants) if scrollable else None,
+            )
+            subtree.append(node)
+            subtree.extend(descendants)
+        return subtree
+
+    root = json.loads(json_text)
+    nodes = [n for n in walk({"children": [root]}) if _keep(n)]
+    return UISnapshot(nodes=nodes)
+
+
+def parse_wda_source(xml_text: str) -> UISnapshot:
+    """
+    Parse WebDriverAgent ``/source`` XML.
+
+    Args:
+        xml_text: The XML page source.
+
+    Returns:
+        UISnapshot of the meaningful, visible nodes in document order.
+    """
+
+    def walk(element: ET.Element) -> list[UINode]:
+        subtree: list[UINode] = []
+        for child in element:
+            descendants = walk(child)
+            a = child.attrib
+            if a.get("visible", "true") != "true":
+                continue
+            cls = a.get("type", child.tag).replace("XCUIElementType", "")
+            x, y = int(a.get("x", 0)), int(a.get("y", 0))
+            w, h = int(a.get("width", 0)), int(a.get("height", 0))
+            scrollable = cls in _IOS_SCROLLABLE
+            node = UINode(
+                cls=cls,
+                text=a.get("value") or a.get("label", ""),
+                resource_id=a.get("name", ""),
+                description=a.get("label", ""),
+                bounds=(x, y, x + w, y + h),
+                clickable=cls in ("Button", "Cell", "Link", "Switch"),
+                scrollable=scrollable,
+                focused=_is_true(a.get("hasKeyboardFocus") or a.get("focused")),
+                scroll_anchor=_first_label(descendants) if scrollable else None,
+            )
+            subtree.append(node)
+            subtree.extend(descendants)
+        return subtree
+
+    nodes = [n for n in walk(ET.fromstring(xml_text)) if _keep(n)]
+    return UISnapshot(nodes=nodes)
@@ -22,6 +22,7 @@ from phone_agent.xctest.input import (
     type_text,
 )
 from phone_agent.xctest.screenshot import get_screenshot
+from phone_agent.xctest.session import ScreenGeometry, WDASession, get_wda_session
 
 __all__ = [
     # Screenshot
@@ -38,6 +39,10 @@ __all__ = [
     "double_tap",
     "long_press",
     "launch_app",
+    # Session
+    "WDASession",
+    "ScreenGeometry",
+    "get_wda_session",
     # Connection management
     "XCTestConnection",
     "DeviceInfo",
@@ -1,31 +1,9 @@
 """Device control utilities for iOS automation via WebDriverAgent."""
 
-import subprocess
 import time
-from typing import Optional
 
 from phone_agent.config.apps_ios import APP_PACKAGES_IOS as APP_PACKAGES
-
-SCALE_FACTOR = 3 # 3 for most modern iPhone 
-
-def _get_wda_session_url(wda_url: str, session_id: str | None, endpoint: str) -> str:
-    """
-    Get the correct WDA URL for a session endpoint.
-
-    Args:
-        wda_url: Base WDA URL.
-        session_id: Optional session ID.
-        endpoint: The endpoint path.
-
-    Returns:
-        Full URL for the endpoint.
-    """
-    base = wda_url.rstrip("/")
-    if session_id:
-        return f"{base}/session/{session_id}/{endpoint}"
-    else:
-        # Try to use WDA endpoints without session when possible
-        return f"{base}/{endpoint}"
+from phone_agent.xctest.session import get_wda_session
 
 
 def get_current_app(
@@ -42,11 +20,9 @@ def get_current_app(
         The app name if recognized, otherwise "System Home".
     """
     try:
-        import requests
-
         # Get active app info from WDA using activeAppInfo endpoint
-        response = requests.get(
-            f"{wda_url.rstrip('/')}/wda/activeAppInfo", timeout=5, verify=False
+        response = get_wda_session(wda_url, session_id).get(
+            "wda/activeAppInfo", session=False, timeout=5
         )
 
         if response.status_code == 200:
@@ -90,9 +66,8 @@ def tap(
         delay: Delay in seconds after tap.
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "actions")
+        wda = get_wda_session(wda_url, session_id)
+        px, py = wda.to_points(x, y)
 
         # W3C WebDriver Actions API for tap/click
         actions = {
@@ -102,7 +77,7 @@ def tap(
                     "id": "finger1",
                     "parameters": {"pointerType": "touch"},
                     "actions": [
-                        {"type": "pointerMove", "duration": 0, "x": x / SCALE_FACTOR, "y": y / SCALE_FACTOR},
+                        {"type": "pointerMove", "duration": 0, "x": px, "y": py},
                         {"type": "pointerDown", "button": 0},
                         {"type": "pause", "duration": 0.1},
                         {"type": "pointerUp", "button": 0},
@@ -111,7 +86,7 @@ def tap(
             ]
         }
 
-        requests.post(url, json=actions, timeout=15, verify=False)
+        wda.post("actions", json=actions, timeout=15)
 
         time.sleep(delay)
 
@@ -139,9 +114,8 @@ def double_tap(
         delay: Delay in seconds after double tap.
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "actions")
+        wda = get_wda_session(wda_url, session_id)
+        px, py = wda.to_points(x, y)
 
         # W3C WebDriver Actions API for double tap
         actions = {
@@ -151,7 +125,7 @@ def double_tap(
                     "id": "finger1",
                     "parameters": {"pointerType": "touch"},
                     "actions": [
-                        {"type": "pointerMove", "duration": 0, "x": x / SCALE_FACTOR, "y": y / SCALE_FACTOR},
+                        {"type": "pointerMove", "duration": 0, "x": px, "y": py},
                         {"type": "pointerDown", "button": 0},
                         {"type": "pause", "duration": 100},
                         {"type": "pointerUp", "button": 0},
@@ -164,7 +138,7 @@ def double_tap(
             ]
         }
 
-        requests.post(url, json=actions, timeout=10, verify=False)
+        wda.post("actions", json=actions, timeout=10)
 
         time.sleep(delay)
 
@@ -194,9 +168,8 @@ def long_press(
         delay: Delay in seconds after long press.
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "actions")
+        wda = get_wda_session(wda_url, session_id)
+        px, py = wda.to_points(x, y)
 
         # W3C WebDriver Actions API for long press
         # Convert duration to milliseconds
@@ -209,7 +182,7 @@ def long_press(
                     "id": "finger1",
                     "parameters": {"pointerType": "touch"},
                     "actions": [
-                        {"type": "pointerMove", "duration": 0, "x": x / SCALE_FACTOR, "y": y / SCALE_FACTOR},
+                        {"type": "pointerMove", "duration": 0, "x": px, "y": py},
                         {"type": "pointerDown", "button": 0},
                         {"type": "pause", "duration": duration_ms},
                         {"type": "pointerUp", "button": 0},
@@ -218,7 +191,7 @@ def long_press(
             ]
         }
 
-        requests.post(url, json=actions, timeout=int(duration + 10), verify=False)
+        wda.post("actions", json=actions, timeout=int(duration + 10))
 
         time.sleep(delay)
 
@@ -252,26 +225,26 @@ def swipe(
         delay: Delay in seconds after swipe.
     """
     try:
-        import requests
-
         if duration is None:
             # Calculate duration based on distance
             dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
             duration = dist_sq / 1000000  # Convert to seconds
             duration = max(0.3, min(duration, 2.0))  # Clamp between 0.3-2 seconds
 
-        url = _get_wda_session_url(wda_url, session_id, "wda/dragfromtoforduration")
+        wda = get_wda_session(wda_url, session_id)
+        from_x, from_y = wda.to_points(start_x, start_y)
+        to_x, to_y = wda.to_points(end_x, end_y)
 
         # WDA dragfromtoforduration API payload
         payload = {
-            "fromX": start_x / SCALE_FACTOR,
-            "fromY": start_y / SCALE_FACTOR,
-            "toX": end_x / SCALE_FACTOR,
-            "toY": end_y / SCALE_FACTOR,
+            "fromX": from_x,
+            "fromY": from_y,
+            "toX": to_x,
+            "toY": to_y,
             "duration": duration,
         }
 
-        requests.post(url, json=payload, timeout=int(duration + 10), verify=False)
+        wda.post("wda/dragfromtoforduration", json=payload, timeout=int(duration + 10))
 
         time.sleep(delay)
 
@@ -299,20 +272,19 @@ def back(
         by swiping from the left edge of the screen.
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "wda/dragfromtoforduration")
+        wda = get_wda_session(wda_url, session_id)
+        geometry = wda.geometry
 
-        # Swipe from left edge to simulate back gesture
+        # Swipe from left edge to simulate back gesture (coordinates in points)
         payload = {
             "fromX": 0,
-            "fromY": 640,
-            "toX": 400,
-            "toY": 640,
+            "fromY": geometry.height / 2,
+            "toX": geometry.width * 0.8,
+            "toY": geometry.height / 2,
             "duration": 0.3,
         }
 
-        requests.post(url, json=payload, timeout=10, verify=False)
+        wda.post("wda/dragfromtoforduration", json=payload, timeout=10)
 
         time.sleep(delay)
 
@@ -336,11 +308,9 @@ def home(
         delay: Delay in seconds after pressing home.
     """
     try:
-        import requests
-
-        url = f"{wda_url.rstrip('/')}/wda/homescreen"
-
-        requests.post(url, timeout=10, verify=False)
+        get_wda_session(wda_url, session_id).post(
+            "wda/homescreen", session=False, timeout=10
+        )
 
         time.sleep(delay)
 
@@ -372,13 +342,9 @@ def launch_app(
         return False
 
     try:
-        import requests
-
         bundle_id = APP_PACKAGES[app_name]
-        url = _get_wda_session_url(wda_url, session_id, "wda/apps/launch")
-
-        response = requests.post(
-            url, json={"bundleId": bundle_id}, timeout=10, verify=False
+        response = get_wda_session(wda_url, session_id).post(
+            "wda/apps/launch", json={"bundleId": bundle_id}, timeout=10
         )
 
         time.sleep(delay)
@@ -396,7 +362,9 @@ def get_screen_size(
     wda_url: str = "http://localhost:8100", session_id: str | None = None
 ) -> tuple[int, int]:
     """
-    Get the screen dimensions.
+    Get the screen dimensions in points.
+
+    The size is probed once per WDA session and cached.
 
     Args:
         wda_url: WebDriverAgent URL.
@@ -405,27 +373,8 @@ def get_screen_size(
     Returns:
         Tuple of (width, height). Returns (375, 812) as default if unable to fetch.
     """
-    try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "window/size")
-
-        response = requests.get(url, timeout=5, verify=False)
-
-        if response.status_code == 200:
-            data = response.json()
-            value = data.get("value", {})
-            width = value.get("width", 375)
-            height = value.get("height", 812)
-            return width, height
-
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
-    except Exception as e:
-        print(f"Error getting screen size: {e}")
-
-    # Default iPhone screen size (iPhone X and later)
-    return 375, 812
+    geometry = get_wda_session(wda_url, session_id).geometry
+    return geometry.width, geometry.height
 
 
 def press_button(
@@ -444,11 +393,9 @@ def press_button(
         delay: Delay in seconds after pressing.
     """
     try:
-        import requests
-
-        url = f"{wda_url.rstrip('/')}/wda/pressButton"
-
-        requests.post(url, json={"name": button_name}, timeout=10, verify=False)
+        get_wda_session(wda_url, session_id).post(
+            "wda/pressButton", session=False, json={"name": button_name}, timeout=10
+        )
 
         time.sleep(delay)
 
@@ -72,11 +72,11 @@ def _get_screenshot_wda(
         Screenshot object or None if failed.
     """
     try:
-        import requests
+        from phone_agent.xctest.session import get_wda_session
 
-        url = f"{wda_url.rstrip('/')}/screenshot"
-
-        response = requests.get(url, timeout=timeout, verify=False)
+        response = get_wda_session(wda_url, session_id).get(
+            "screenshot", session=False, timeout=timeout
+        )
 
         if response.status_code == 200:
             data = response.json()
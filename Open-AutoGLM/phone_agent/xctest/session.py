@@ -0,0 +1,290 @@
+"""Reusable WebDriverAgent session with cached screen geometry.
+
+Every WDA call used to open a new HTTP connection, most of them went to
+session-less endpoints, and coordinates were converted with a hard-coded
+scale of 3. ``WDASession`` keeps one keep-alive HTTP connection and one WDA
+session per WDA URL, probes the window size and point-to-pixel scale once per
+session, and transparently creates a new session when WDA has been restarted
+and rejects the old id. Every request is recorded in ``device_metrics``.
+
+Example:
+    >>> from phone_agent.xctest.session import get_wda_session
+    >>> session = get_wda_session("http://localhost:8100")
+    >>> session.geometry.scale
+    3.0
+    >>> session.to_points(540, 1200)
+    (180.0, 400.0)
+"""
+
+import base64
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any
+from urllib.parse import urlsplit
+
+from phone_agent import device_metrics
+
+# Used when WDA cannot report the scale and no screenshot can be taken
+_DEFAULT_SCALE = 3.0
+
+# Default iPhone window size in points (iPhone X and later)
+_DEFAULT_WINDOW_SIZE = (375, 812)
+
+
+@dataclass(frozen=True)
+class ScreenGeometry:
+    """Screen size in points and the point-to-pixel scale."""
+
+    width: int
+    height: int
+    scale: float
+
+    @property
+    def pixel_size(self) -> tuple[int, int]:
+        """Screen size in pixels, as seen in screenshots."""
+        return round(self.width * self.scale), round(self.height * self.scale)
+
+
+class WDASession:
+    """
+    A WebDriverAgent session shared by all calls to the same WDA server.
+
+    Args:
+        wda_url: WebDriverAgent URL.
+        session_id: Existing session ID to use. If None, a session is created
+            on first use.
+    """
+
+    def __init__(
+        self, wda_url: str = "http://localhost:8100", session_id: str | None = None
+    ):
+        self.wda_url = wda_url.rstrip("/")
+        self._session_id = session_id
+        self._geometry: ScreenGeometry | None = None
+        self._expired: set[str] = set()
+        self._create_failed = False
+        self._http = None
+        self._lock = threading.RLock()
+
+    @property
+    def session_id(self) -> str | None:
+        """The current session ID, or None if WDA refused to create one."""
+        return self.ensure()
+
+    @property
+    def geometry(self) -> ScreenGeometry:
+        """Window size and scale, probed once per session."""
+        with self._lock:
+            if self._geometry is None:
+                self._geometry = self._probe_geometry()
+            return self._geometry
+
+    def ensure(self) -> str | None:
+        """
+        Create a session if there is none yet.
+
+        Returns:
+            The session ID, or None if creation failed. Requests then fall
+            back to session-less endpoints.
+        """
+        with self._lock:
+            if self._session_id is None and not self._create_failed:
+                self._session_id = self._create_session()
+                self._create_failed = self._session_id is None
+            return self._session_id
+
+    def adopt(self, session_id: str | None) -> None:
+        """
+        Use an externally created session ID.
+
+        IDs this object has already seen rejected by WDA are ignored, so
+        callers holding a stale ID keep using the recreated session.
+        """
+        with self._lock:
+            if not session_id or session_id == self._session_id:
+                return
+            if session_id in self._expired:
+                return
+            self._session_id = session_id
+            self._geometry = None
+
+    def reset(self) -> None:
+        """Forget the session and geometry; the next request creates a new session."""
+        with self._lock:
+            if self._session_id:
+                self._expired.add(self._session_id)
+            self._session_id = None
+            self._geometry = None
+            self._create_failed = False
+
+    def to_points(self, x: float, y: float) -> tuple[float, float]:
+        """Convert screenshot pixel coordinates to WDA point coordinates."""
+        scale = self.geometry.scale
+        return x / scale, y / scale
+
+    def get(self, endpoint: str, **kwargs: Any):
+        """Send a GET request, see ``request``."""
+        return self.request("GET", endpoint, **kwargs)
+
+    def post(self, endpoint: str, **kwargs: Any):
+        """Send a POST request, see ``request``."""
+        return self.request("POST", endpoint, **kwargs)
+
+    def request(self, method: str, endpoint: str, session: bool = True, **kwargs: Any):
+        """
+        Send a request to WDA over the shared keep-alive connection.
+
+        Args:
+            method: HTTP method.
+            endpoint: Endpoint path, e.g. "actions" or "wda/keys".
+            session: Address the endpoint inside the session
+                (``/session/<id>/<endpoint>``). If WDA reports the session as
+                invalid, a new one is created and the request retried once.
+            **kwargs: Additional arguments for ``requests.Session.request``.
+
+        Returns:
+            The ``requests.Response``.
+        """
+        kwargs.setdefault("verify", False)
+        if not session:
+            return self._send(method, f"{self.wda_url}/{endpoint}", **kwargs)
+
+        session_id = self.ensure()
+        response = self._send(method, self._url(session_id, endpoint), **kwargs)
+        if session_id and _is_invalid_session(response):
+            print(f"WDA session {session_id} expired, creating a new one")
+            self.reset()
+            response = self._send(method, self._url(self.ensure(), endpoint), **kwargs)
+        return response
+
+    def _url(self, session_id: str | None, endpoint: str) -> str:
+        if session_id:
+            return f"{self.wda_url}/session/{session_id}/{endpoint}"
+        return f"{self.wda_url}/{endpoint}"
+
+    def _send(self, method: str, url: str, **kwargs: Any):
+        if self._http is None:
+            import requests
+
+            self._http = requests.Session()
+
+        start = time.monotonic()
+        ok = False
+        try:
+            response = self._http.request(method, url, **kwargs)
+            ok = response.status_code < 400
+            return response
+        finally:
+            device_metrics.record(
+                "wda",
+                self.wda_url,
+                _operation(method, url),
+                time.monotonic() - start,
+                ok,
+            )
+
+    def _create_session(self) -> str | None:
+        try:
+            response = self._send(
+                "POST",
+                f"{self.wda_url}/session",
+                json={"capabilities": {}},
+                timeout=30,
+                verify=False,
+            )
+            if response.status_code in (200, 201):
+                data = response.json()
+                return data.get("sessionId") or data.get("value", {}).get("sessionId")
+            print(f"Failed to create WDA session: {response.text}")
+        except ImportError:
+            print("Error: requests library required. Install: pip install requests")
+        except Exception as e:
+            print(f"Error creating WDA session: {e}")
+        return None
+
+    def _probe_geometry(self) -> ScreenGeometry:
+        width, height = _DEFAULT_WINDOW_SIZE
+        try:
+            response = self.get("window/size", timeout=5)
+            if response.status_code == 200:
+                value = response.json().get("value", {})
+                width = value.get("width", width)
+                height = value.get("height", height)
+        except Exception as e:
+            print(f"Error getting screen size: {e}")
+
+        scale = self._probe_scale(width)
+        return ScreenGeometry(width=width, height=height, scale=scale)
+
+    def _probe_scale(self, width: int) -> float:
+        try:
+            response = self.get("wda/screen", timeout=5)
+            if response.status_code == 200:
+                scale = response.json().get("value", {}).get("scale")
+                if scale:
+                    return float(scale)
+        except Exception:
+            pass
+
+        # Older WDA builds lack /wda/screen: compare a screenshot with the window
+        try:
+            from PIL import Image
+
+            response = self.get("screenshot", session=False, timeout=10)
+            if response.status_code == 200:
+                data = base64.b64decode(response.json().get("value", ""))
+                with Image.open(BytesIO(data)) as img:
+                    return float(round(img.width / width))
+        except Exception:
+            pass
+
+        print(
+            f"Warning: could not determine screen scale, assuming {_DEFAULT_SCALE:g}x"
+        )
+        return _DEFAULT_SCALE
+
+
+def _operation(method: str, url: str) -> str:
+    """Metrics label for a request, e.g. "POST actions" or "GET element/clear"."""
+    path = urlsplit(url).path.strip("/").split("/")
+    if len(path) >= 2 and path[0] == "session":
+        path = path[2:] or ["session"]
+    # Element ids vary per call; keep the label stable
+    if len(path) >= 2 and path[0] == "element" and path[1] != "active":
+        path[1] = "<id>"
+    return f"{method} {'/'.join(path) or '/'}"
+
+
+def _is_invalid_session(response) -> bool:
+    """Whether WDA rejected the request because the session no longer exists."""
+    return response.status_code == 404 and "invalid session id" in response.text.lower()
+
+
+_sessions: dict[str, WDASession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_wda_session(
+    wda_url: str = "http://localhost:8100", session_id: str | None = None
+) -> WDASession:
+    """
+    Get the shared session for a WDA server.
+
+    Args:
+        wda_url: WebDriverAgent URL.
+        session_id: Optional session ID to adopt (ignored if WDA has already
+            rejected it).
+
+    Returns:
+        The WDASession for this URL.
+    """
+    key = wda_url.rstrip("/")
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = WDASession(key, session_id)
+            return session
+    session.adopt(session_id)
+    return session
@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phone_agent.config import get_system_prompt
+from phone_agent.model import AsyncModelClient, ModelConfig, request_labels
+from phone_agent.model.batching import configure_batching, get_dispatcher
+from phone_agent.model.client import MessageBuilder
+from phone_agent.model.mock_server import MockModelServer
+
+
+async def run_agent(client, args, index: int, latencies: list[float]) -> None:
+    """Simulate one device: act on the phone, then ask the model for the next step."""
+    rng = random.Random(index)
+    messages = [
+        MessageBuilder.create_system_message(get_system_prompt(args.lang)),
+        MessageBuilder.create_user_message(
+            f"Task #{index}\n\n{MessageBuilder.build_screen_info('Settings')}"
+        ),
+    ]
+    for step in range(args.steps):
+        # Device actions take a varying amount of time, so requests drift apart
+        await asyncio.sleep(rng.uniform(0, args.action_time))
+        start = time.monotonic()
+        with request_labels(step=step, device=f"device-{index}"):
+            await client.request(messages)
+        latencies.append(time.monotonic() - start)
+
+
+async def run(args, base_url: str, window: float) -> None:
+    config = ModelConfig(base_url=base_url, api_key=args.apikey, model_name=args.model)
+    if window:
+        configure_batching(base_url, window=window, max_batch=args.max_batch)
+    client = AsyncModelClient(config)
+
+    latencies: list[float] = []
+    start = time.monotonic()
+    await asyncio.gather(
+        *(run_agent(client, args, index, latencies) for index in range(args.agents))
+    )
+    elapsed = time.monotonic() - start
+
+    line = (
+        f"window {window * 1000:>5.0f}ms  step latency p50 {statistics.median(latencies):.3f}s "
+        f"max {max(latencies):.3f}s  throughput {len(latencies) / elapsed:.1f} req/s"
+    )
+    dispatcher = get_dispatcher(base_url)
+    if window and dispatcher is not None:
+        stats = dispatcher.get_stats()
+        occupancy = (
+            f"{stats['occupancy']:.0%}" if stats["occupancy"] is not None else "-"
+        )
+        line += (
+            f"  batch mean {stats['mean_batch_size']:.1f} occupancy {occupancy} "
+            f"queue p95 {stats['delay_p95'] * 1000:.0f}ms"
+        )
+        # The next window setting starts with a fresh dispatcher
+        configure_batching(base_url, window=None)
+    print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure step latency and batch occupancy of micro-batched dispatch",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Usage examples:
+  python scripts/bench_batching.py --agents 20
+  python scripts/bench_batching.py --base-url http://gpu-box:8000/v1 --model autoglm-phone-9b --agents 20 --windows 0,20,50,100
+
+Without --base-url the bundled mock server is used; it shows the queueing
+cost of each window but not the server-side batching gain, so tune against
+the real server.
+        """,
+    )
+    parser.add_argument("--base-url", type=str, default=None, help="Model API base URL")
+    parser.add_argument(
+        "--apikey", type=str, default="EMPTY", help="API key (default: EMPTY)"
+    )
+    parser.add_argument(
+        "--model", type=str, default="autoglm-phone-9b", help="Model name"
+    )
+    parser.add_argument("--lang", type=str, default="cn", choices=["cn", "en"])
+    parser.add_argument(
+        "--agents", type=int, default=20, help="Simulated devices (default: 20)"
+    )
+    parser.add_argument(
+        "--steps", type=int, default=5, help="Steps per device (default: 5)"
+    )
+    parser.add_argument(
+        "--action-time", type=float, default=1.0, help="Max seconds per device action"
+    )
+    parser.add_argument(
+        "--windows",
+        type=str,
+        default="0,20,50,100",
+        help="Comma-separated batch windows in milliseconds, 0 = no batching",
+    )
+    parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=None,
+        help="Maximum requests in flight per wave",
+    )
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = MockModelServer(ttft=0.3, tokens_per_second=200).start()
+        base_url = server.base_url
+
+    print(f"{args.agents} agents x {args.steps} steps against {base_url}")
+    print("=" * 60)
+    for window_ms in args.windows.split(","):
+        asyncio.run(run(args, base_url, float(window_ms) / 1000))
+    print("=" * 60)
+
+    if server is not None:
+        server.stop()
@@ -0,0 +1,107 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phone_agent.hdc import connection as hdc_connection
+from phone_agent.hdc.aio import _get_hdc_prefix
+from phone_agent.hdc.connection import _run_hdc_command
+from phone_agent.hdc.input import type_text
+
+
+def legacy_type_text(text: str, device_id: str | None = None) -> None:
+    """Previous implementation: one hdc process per line and per ENTER key."""
+    hdc_prefix = _get_hdc_prefix(device_id)
+    lines = text.split("\n")
+    for i, line in enumerate(lines):
+        if line:
+            escaped_line = line.replace('"', '\\"').replace("$", "\\$")
+            _run_hdc_command(
+                hdc_prefix + ["shell", "uitest", "uiInput", "text", escaped_line],
+                capture_output=True,
+                text=True,
+            )
+        if i < len(lines) - 1:
+            _run_hdc_command(
+                hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "2054"],
+                capture_output=True,
+                text=True,
+            )
+
+
+def measure(
+    func, text: str, device_id: str | None, repeat: int
+) -> tuple[list[float], int]:
+    """Run func repeatedly, returning per-call durations and hdc spawns per call."""
+    spawns = 0
+    original_run = hdc_connection.run_command
+    original_run_async = hdc_connection.run_command_async
+
+    def counting_run(*args, **kwargs):
+        nonlocal spawns
+        spawns += 1
+        return original_run(*args, **kwargs)
+
+    async def counting_run_async(*args, **kwargs):
+        nonlocal spawns
+        spawns += 1
+        return await original_run_async(*args, **kwargs)
+
+    hdc_connection.run_command = counting_run
+    hdc_connection.run_command_async = counting_run_async
+    durations = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(text, device_id)
+            durations.append(time.perf_counter() - start)
+    finally:
+        hdc_connection.run_command = original_run
+        hdc_connection.run_command_async = original_run_async
+
+    return durations, spawns // max(repeat, 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark multi-line text input on a HarmonyOS device",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Usage examples:
+  python scripts/bench_hdc_type_text.py --lines 10
+  python scripts/bench_hdc_type_text.py --device-id 192.168.1.100:5555 --lines 10 --repeat 5
+
+Focus an input field on the device before running; both implementations type into it.
+        """,
+    )
+
+    parser.add_argument("--device-id", type=str, default=None, help="HDC device ID")
+    parser.add_argument(
+        "--lines", type=int, default=10, help="Number of lines to type (default: 10)"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Repetitions per implementation (default: 3)",
+    )
+
+    args = parser.parse_args()
+
+    text = "\n".join(f"line {i} \"quoted\" $HOME 'single'" for i in range(args.lines))
+
+    print(f"Typing {args.lines} lines, {args.repeat} repetitions each")
+    print("=" * 60)
+
+    for name, func in (("legacy", legacy_type_text), ("single call", type_text)):
+        durations, spawns = measure(func, text, args.device_id, args.repeat)
+        print(
+            f"{name:<12} spawns/call: {spawns:>3}  "
+            f"median: {statistics.median(durations):.3f}s  "
+            f"min: {min(durations):.3f}s  max: {max(durations):.3f}s"
+        )
+
+    print("=" * 60)
@@ -0,0 +1,163 @@
+import argparse
+import base64
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phone_agent.config import prompts_en, prompts_zh
+from phone_agent.context import ConversationContext
+from phone_agent.model.client import MessageBuilder
+from phone_agent.model.client_pool import get_openai_client
+
+# Stand-in for the model's reasoning, long enough to make history matter
+THINKING = (
+    "The current screen shows the list of chats. The target contact is not "
+    "visible yet, so I need to scroll further down and check the next page "
+    "of results before deciding which element to tap. "
+) * 3
+
+
+def build_system_prompt(layout: str, lang: str, day: datetime) -> str:
+    prompts = prompts_en if lang == "en" else prompts_zh
+    if layout == "stable":
+        return prompts.STABLE_SYSTEM_PROMPT
+    return prompts.get_date_line(day) + "\n" + prompts.INSTRUCTIONS
+
+
+def time_to_first_token(client, model: str, messages: list[dict]) -> float:
+    """Stream a one-token completion and return the time to its first chunk."""
+    start = time.perf_counter()
+    stream = client.chat.completions.create(
+        messages=messages, model=model, max_tokens=1, temperature=0.0, stream=True
+    )
+    try:
+        for chunk in stream:
+            if chunk.choices:
+                break
+        return time.perf_counter() - start
+    finally:
+        stream.close()
+
+
+def run_task(
+    client, args, layout: str, task_index: int, image_base64: str | None
+) -> list[float]:
+    """Replay one task step by step and return the TTFT of every step."""
+    prompts = prompts_en if args.lang == "en" else prompts_zh
+    # Tasks of the benchmark stand for tasks run on consecutive days
+    day = datetime.today() + timedelta(days=task_index)
+    context = ConversationContext(
+        token_budget=args.budget,
+        keep_turns=args.keep_turns,
+        stable_prefix=layout == "stable",
+    )
+    context.set_system(
+        MessageBuilder.create_system_message(
+            build_system_prompt(layout, args.lang, day)
+        )
+    )
+
+    task = f"Find the chat with contact #{layout}-{task_index} and send them a greeting"
+    if layout == "stable":
+        task = f"{prompts.get_date_line(day)}\n{task}"
+
+    ttfts = []
+    for step in range(args.steps):
+        screen_info = MessageBuilder.build_screen_info("WeChat")
+        text = (
+            f"{task}\n\n{screen_info}"
+            if step == 0
+            else f"** Screen Info **\n\n{screen_info}"
+        )
+        context.add_user(
+            MessageBuilder.create_user_message(text=text, image_base64=image_base64),
+            app="WeChat",
+            task=task if step == 0 else None,
+        )
+        ttfts.append(time_to_first_token(client, args.model, context.messages))
+        context.strip_images()
+
+        action = f'do(action="Swipe", start=[500, 800], end=[500, {200 + step}])'
+        context.add_assistant(
+            MessageBuilder.create_assistant_message(
+                f"<think>{THINKING}</think><answer>{action}</answer>"
+            ),
+            action=action,
+        )
+    return ttfts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare time to first token of the legacy and prefix-stable message layouts",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Usage examples:
+  python scripts/bench_prefix_cache.py --base-url http://localhost:8000/v1 --model autoglm-phone-9b
+  python scripts/bench_prefix_cache.py --base-url http://localhost:8000/v1 --model autoglm-phone-9b --image screen.png --steps 20
+
+Run against a server with prefix caching enabled (vLLM --enable-prefix-caching,
+SGLang's radix cache is on by default). Each simulated task stands for a task
+run on a different day, so the legacy layout's dated system prompt changes
+between tasks while the stable layout's does not.
+        """,
+    )
+
+    parser.add_argument(
+        "--base-url", type=str, required=True, help="Model API base URL"
+    )
+    parser.add_argument(
+        "--apikey", type=str, default="EMPTY", help="API key (default: EMPTY)"
+    )
+    parser.add_argument(
+        "--model", type=str, default="autoglm-phone-9b", help="Model name"
+    )
+    parser.add_argument("--lang", type=str, default="cn", choices=["cn", "en"])
+    parser.add_argument(
+        "--tasks", type=int, default=3, help="Tasks per layout (default: 3)"
+    )
+    parser.add_argument(
+        "--steps", type=int, default=12, help="Steps per task (default: 12)"
+    )
+    parser.add_argument(
+        "--budget", type=int, default=3000, help="Context token budget (default: 3000)"
+    )
+    parser.add_argument(
+        "--keep-turns", type=int, default=4, help="Steps kept verbatim (default: 4)"
+    )
+    parser.add_argument(
+        "--image",
+        type=str,
+        default=None,
+        help="PNG sent as the screenshot of every step",
+    )
+
+    args = parser.parse_args()
+
+    image_base64 = None
+    if args.image:
+        with open(args.image, "rb") as f:
+            image_base64 = base64.b64encode(f.read()).decode("utf-8")
+
+    client = get_openai_client(args.base_url, args.apikey)
+
+    print(
+        f"{args.tasks} tasks x {args.steps} steps per layout, budget {args.budget} tokens"
+    )
+    print("=" * 60)
+
+    for layout in ("legacy", "stable"):
+        ttfts = []
+        for task_index in range(args.tasks):
+            ttfts.extend(run_task(client, args, layout, task_index, image_base64))
+        print(
+            f"{layout:<8} TTFT median: {statistics.median(ttfts) * 1000:>7.1f}ms  "
+            f"mean: {statistics.mean(ttfts) * 1000:>7.1f}ms  "
+            f"max: {max(ttfts) * 1000:>7.1f}ms"
+        )
+
+    print("=" * 60)
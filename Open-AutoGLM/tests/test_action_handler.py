@@ -0,0 +1,7 @@
+from phone_agent.actions.handler import ACTION_HANDLERS, KNOWN_ACTIONS, ActionHandler
+
+
+def test_every_known_action_has_a_handler():
+    assert KNOWN_ACTIONS == set(ACTION_HANDLERS)
+    for method_name in ACTION_HANDLERS.values():
+        assert callable(getattr(ActionHandler, method_name))
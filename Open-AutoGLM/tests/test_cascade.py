@@ -0,0 +1,50 @@
+import asyncio
+
+from phone_agent.model.cascade import ModelCascade
+from phone_agent.model.client import ModelClient, ModelConfig, ModelEndpoint
+from phone_agent.model.mock_server import MockModelServer
+
+_MESSAGES = [{"role": "user", "content": "打开设置"}]
+_UNKNOWN_ACTION = '<think>飞过去。</think>\n<answer>do(action="Fly")</answer>'
+
+
+def _config(primary: MockModelServer, backup: MockModelServer) -> ModelConfig:
+    return ModelConfig(
+        base_url=primary.base_url,
+        cascade=[ModelEndpoint(backup.base_url, name="backup")],
+        lang="en",
+    )
+
+
+def test_cascade_escalates_unknown_action():
+    escalations = []
+    with (
+        MockModelServer(responses=[_UNKNOWN_ACTION]) as primary,
+        MockModelServer() as backup,
+    ):
+        cascade = ModelCascade(_config(primary, backup))
+        response = asyncio.run(
+            cascade.request(
+                _MESSAGES, on_escalate=lambda *args: escalations.append(args)
+            )
+        )
+
+    assert response.tier == "backup"
+    assert escalations == [("backup", "unknown action 'Fly'")]
+    stats = cascade.get_stats()
+    assert stats["autoglm-phone-9b"]["escalated"] == {"unknown action 'Fly'": 1}
+    assert stats["backup"]["accepted"] == 1
+
+
+def test_model_client_runs_the_cascade(capsys):
+    with (
+        MockModelServer(responses=[_UNKNOWN_ACTION]) as primary,
+        MockModelServer() as backup,
+    ):
+        client = ModelClient(_config(primary, backup))
+        response = client.request(_MESSAGES)
+
+    assert response.tier == "backup"
+    assert response.action == 'do(action="Home")'
+    assert "escalating to backup: unknown action 'Fly'" in capsys.readouterr().out
+    assert client.cascade.get_stats()["backup"]["requests"] == 1
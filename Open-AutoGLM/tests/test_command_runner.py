@@ -0,0 +1,46 @@
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from phone_agent.command_runner import (
+    CancellationToken,
+    CommandCancelledError,
+    Deadline,
+    command_scope,
+    run_blocking,
+    run_command_async,
+)
+
+_SLEEP = [sys.executable, "-c", "import time; time.sleep(5)"]
+
+
+def test_run_blocking_returns_the_result():
+    result = run_blocking(
+        run_command_async(
+            [sys.executable, "-c", "print(42)"], text=True, capture_output=True
+        )
+    )
+    assert result.stdout.strip() == "42"
+
+
+def test_run_blocking_keeps_the_scope_deadline():
+    with command_scope(deadline=Deadline(0.3)):
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_blocking(run_command_async(_SLEEP))
+
+
+def test_run_blocking_keeps_the_scope_token():
+    token = CancellationToken()
+    token.cancel()
+    with command_scope(token=token):
+        with pytest.raises(CommandCancelledError):
+            run_blocking(run_command_async(_SLEEP))
+
+
+def test_run_blocking_works_inside_a_running_loop():
+    async def main():
+        return run_blocking(asyncio.sleep(0, result="done"))
+
+    assert asyncio.run(main()) == "done"
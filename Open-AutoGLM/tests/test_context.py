@@ -0,0 +1,96 @@
+from phone_agent.context import (
+    IMAGE_TOKENS,
+    ConversationContext,
+    estimate_message_tokens,
+    estimate_tokens,
+)
+from phone_agent.model.client import MessageBuilder
+
+_TASK = "Open Settings and turn on WiFi"
+
+
+def _step(context: ConversationContext, step: int) -> None:
+    text = f"{_TASK}\n\nscreen {step}" if step == 1 else f"screen {step} " + "x" * 400
+    context.add_user(
+        MessageBuilder.create_user_message(text, image_base64="aGVsbG8="),
+        app="Settings",
+        task=_TASK if step == 1 else None,
+    )
+    context.strip_images()
+    context.add_assistant(
+        MessageBuilder.create_assistant_message("thinking " * 50),
+        action=f'do(action="Tap", element=[{step}, {step}])',
+    )
+
+
+def _changes(counts: list[int]) -> int:
+    return sum(a != b for a, b in zip(counts, counts[1:]))
+
+
+def _roles(context: ConversationContext) -> list[str]:
+    return [message["role"] for message in context.messages]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("打开设置") == 4
+
+
+def test_tokens_follow_the_messages():
+    context = ConversationContext()
+    context.set_system(MessageBuilder.create_system_message("You are an agent."))
+    context.add_user(MessageBuilder.create_user_message("screen", image_base64="aGk="))
+    with_image = context.tokens
+    context.strip_images()
+    assert context.tokens == with_image - IMAGE_TOKENS
+    context.add_assistant(
+        MessageBuilder.create_assistant_message("answer"), action='do(action="Back")'
+    )
+    assert context.tokens == sum(map(estimate_message_tokens, context.messages))
+
+
+def test_no_budget_keeps_every_step():
+    context = ConversationContext(token_budget=None)
+    for step in range(1, 21):
+        _step(context, step)
+    assert context.compacted_steps == 0
+    assert len(context) == 40
+
+
+def test_compaction_keeps_recent_turns_and_alternates_roles():
+    context = ConversationContext(token_budget=1000, keep_turns=2)
+    context.set_system(MessageBuilder.create_system_message("You are an agent."))
+    for step in range(1, 11):
+        _step(context, step)
+
+    assert context.compacted_steps > 0
+    kept = 10 - context.compacted_steps
+    assert kept >= 2
+    assert _roles(context) == ["system"] + ["user", "assistant"] * kept
+    first_user = context.messages[1]["content"][0]["text"]
+    assert first_user.startswith(_TASK)
+    assert '1. [Settings] do(action="Tap", element=[1, 1]) -> ok' in first_user
+    # The estimate stays close to the messages actually sent
+    actual = sum(map(estimate_message_tokens, context.messages))
+    assert abs(context.tokens - actual) <= 8
+
+
+def test_stable_prefix_compacts_in_batches():
+    def compacted_per_step(stable_prefix: bool) -> list[int]:
+        context = ConversationContext(
+            token_budget=1500, keep_turns=2, stable_prefix=stable_prefix
+        )
+        counts = []
+        for step in range(1, 16):
+            _step(context, step)
+            counts.append(context.compacted_steps)
+        return counts
+
+    gradual = compacted_per_step(False)
+    batched = compacted_per_step(True)
+    # Each compaction rewrites the prefix; batching does that less often
+    assert _changes(batched) < _changes(gradual)
+    # After a batch only keep_turns steps are left verbatim
+    first = next(i for i, count in enumerate(batched) if count)
+    assert batched[first] == first + 1 - 2
@@ -0,0 +1,35 @@
+from phone_agent import device_metrics
+from phone_agent.device_metrics import (
+    command_labels,
+    load_device_metrics,
+    record,
+    reset_device_metrics,
+)
+
+
+def test_command_labels():
+    assert command_labels(
+        ["adb", "-s", "emulator-5554", "shell", "input", "tap", "1", "2"]
+    ) == (
+        "adb",
+        "emulator-5554",
+        "input tap",
+    )
+
+
+def test_recording_refreshes_the_snapshot(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.json"
+    monkeypatch.setenv("PHONE_AGENT_METRICS_FILE", str(path))
+    monkeypatch.setattr(device_metrics, "_last_snapshot", 0.0)
+    reset_device_metrics()
+
+    record("adb", "emulator-5554", "input tap", 0.2)
+    rows = load_device_metrics()
+    assert [(r["device"], r["operation"], r["count"]) for r in rows] == [
+        ("emulator-5554", "input tap", 1)
+    ]
+
+    # Within the interval the snapshot is left alone
+    record("adb", "emulator-5554", "input tap", 0.2)
+    assert load_device_metrics()[0]["count"] == 1
+    reset_device_metrics()
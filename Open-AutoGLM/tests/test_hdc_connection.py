@@ -0,0 +1,31 @@
+import shlex
+import subprocess
+
+import pytest
+
+from phone_agent.hdc.connection import _build_shell_sequence
+
+_TEXT = 'it\'s "quoted"; echo injected $HOME \\ done'
+
+
+def test_shell_sequence_joins_commands():
+    line = _build_shell_sequence(
+        [["uitest", "uiInput", "click", "1", "2"], ["sleep", "1"]]
+    )
+    assert line == "uitest uiInput click 1 2; sleep 1"
+
+
+def test_shell_sequence_quotes_arguments():
+    line = _build_shell_sequence([["uitest", "uiInput", "text", _TEXT]])
+    assert shlex.split(line) == ["uitest", "uiInput", "text", _TEXT]
+
+
+def test_shell_sequence_runs_verbatim_in_a_shell():
+    line = _build_shell_sequence(
+        [["printf", "%s\\n", _TEXT], ["printf", "%s\\n", "a  b", ""]]
+    )
+    try:
+        result = subprocess.run(["sh", "-c", line], capture_output=True, text=True)
+    except FileNotFoundError:
+        pytest.skip("no POSIX shell")
+    assert result.stdout == f"{_TEXT}\na  b\n\n"
@@ -0,0 +1,38 @@
+import pytest
+
+from phone_agent.hdc.keycodes import (
+    ANDROID_KEYCODES,
+    HARMONY_KEYCODES,
+    to_harmony_keycode,
+)
+
+
+@pytest.mark.parametrize(
+    "keycode, expected",
+    [
+        ("ENTER", 2054),
+        ("enter", 2054),
+        ("KEYCODE_ENTER", 2054),
+        ("keycode_back", 2),
+        ("KEYCODE_A", 2017),
+        ("KEYCODE_0", 2000),
+        ("66", 2054),
+        (" 66 ", 2054),
+        (66, 2054),
+        (7, 2000),
+    ],
+)
+def test_to_harmony_keycode(keycode, expected):
+    assert to_harmony_keycode(keycode) == expected
+
+
+@pytest.mark.parametrize("keycode", ["KEYCODE_NOPE", "NOPE", "", "0", "99999", 0])
+def test_unmapped_keycode(keycode):
+    assert to_harmony_keycode(keycode) is None
+
+
+def test_names_and_numbers_agree():
+    for name, value in ANDROID_KEYCODES.items():
+        expected = HARMONY_KEYCODES.get(name)
+        assert to_harmony_keycode(f"KEYCODE_{name}") == expected
+        assert to_harmony_keycode(value) == expected
@@ -0,0 +1,71 @@
+import subprocess
+
+import pytest
+
+from phone_agent.actions import ime_session
+from phone_agent.actions.ime_session import IMESession
+from phone_agent.adb.aio import _parse_current_package
+
+
+class _FakeDevice:
+    def __init__(self):
+        self.package: str | None = "com.example.notes"
+        self.calls: list[str] = []
+
+    def get_current_package(self, device_id=None):
+        if self.package == "timeout":
+            raise subprocess.TimeoutExpired("dumpsys", 1)
+        return self.package
+
+    def detect_and_set_adb_keyboard(self, device_id=None):
+        self.calls.append("set")
+        return "com.example/.Ime"
+
+    def restore_keyboard(self, ime, device_id=None):
+        self.calls.append(f"restore {ime}")
+
+
+@pytest.fixture
+def device(monkeypatch):
+    device = _FakeDevice()
+    monkeypatch.setattr(ime_session, "get_device_factory", lambda: device)
+    return device
+
+
+def test_session_survives_steps_in_the_same_app(device):
+    session = IMESession()
+    session.ensure_active()
+    session.check_foreground()
+    session.ensure_active()
+    assert session.active
+    assert device.calls == ["set"]
+
+
+def test_switching_between_unlisted_apps_restores(device):
+    session = IMESession()
+    session.ensure_active()
+    # Neither app is in the app table, both map to the same display name
+    device.package = "com.example.mail"
+    session.check_foreground()
+    assert not session.active
+    assert device.calls == ["set", "restore com.example/.Ime"]
+
+
+@pytest.mark.parametrize("package", [None, "timeout"])
+def test_unknown_package_keeps_the_session(device, package):
+    session = IMESession()
+    session.ensure_active()
+    device.package = package
+    session.check_foreground()
+    assert session.active
+
+
+def test_parse_current_package():
+    output = (
+        "  mCurrentFocus=Window{1a2b u0 InputMethod}\n"
+        "  mFocusedApp=ActivityRecord{7d3f u0 com.tencent.mm/.ui.LauncherUI t12}\n"
+    )
+    assert _parse_current_package(output) == "com.tencent.mm"
+    output = "  mCurrentFocus=Window{1a2b u0 com.example/com.example.Main}\n"
+    assert _parse_current_package(output) == "com.example"
+    assert _parse_current_package("  mCurrentFocus=null\n  mFocusedApp=null\n") is None
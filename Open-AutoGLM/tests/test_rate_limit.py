@@ -0,0 +1,31 @@
+import asyncio
+
+from phone_agent.model.rate_limit import RateLimiter
+
+
+async def _acquire(limiter: RateLimiter, count: int) -> None:
+    for _ in range(count):
+        await limiter.acquire()
+        limiter.release()
+
+
+def test_new_limiter_starts_with_a_full_burst():
+    limiter = RateLimiter(requests_per_second=1, burst=3)
+    asyncio.run(_acquire(limiter, 3))
+    assert limiter.wait_times.to_dict()["max"] < 0.5
+
+
+def test_configure_with_same_limits_keeps_tokens():
+    limiter = RateLimiter(requests_per_second=0.5, burst=2)
+    asyncio.run(_acquire(limiter, 2))
+    limiter.configure(requests_per_second=0.5, burst=2)
+    assert limiter._tokens < 1
+
+
+def test_configure_caps_tokens_at_new_burst():
+    limiter = RateLimiter(requests_per_second=0.5, burst=10)
+    asyncio.run(_acquire(limiter, 1))
+    limiter.configure(requests_per_second=0.5, burst=4)
+    assert limiter._tokens <= 4
+    limiter.configure(requests_per_second=0.5, burst=8)
+    assert limiter._tokens <= 4.1
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+
+from phone_agent.config import prompts_en, prompts_zh
+from phone_agent.model.client import ModelConfig
+from phone_agent.model.response_cache import cache_key
+
+DAYS = [datetime(2025, 12, 12), datetime(2026, 3, 1)]
+
+
+def _messages(prompts, day: datetime, task: str, stable: bool) -> list[dict]:
+    screen = [
+        {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+        {"type": "text", "text": f"{task}\n\n** Screen Info **"},
+    ]
+    if stable:
+        # The date line goes with the task in the first user message
+        screen[1]["text"] = f"{prompts.get_date_line(day)}\n{screen[1]['text']}"
+        system = prompts.STABLE_SYSTEM_PROMPT
+    else:
+        system = f"{prompts.get_date_line(day)}\n{prompts.INSTRUCTIONS}"
+    return [{"role": "system", "content": system}, {"role": "user", "content": screen}]
+
+
+@pytest.mark.parametrize("prompts", [prompts_zh, prompts_en])
+@pytest.mark.parametrize("stable", [False, True])
+def test_same_task_on_different_days_has_same_key(prompts, stable):
+    config = ModelConfig(temperature=0.0)
+    keys = {
+        cache_key(config, _messages(prompts, day, "打开设置", stable)) for day in DAYS
+    }
+    assert len(keys) == 1
+
+
+def test_different_tasks_have_different_keys():
+    config = ModelConfig(temperature=0.0)
+    day = DAYS[0]
+    first = cache_key(config, _messages(prompts_zh, day, "打开设置", stable=True))
+    second = cache_key(config, _messages(prompts_zh, day, "打开微信", stable=True))
+    assert first != second
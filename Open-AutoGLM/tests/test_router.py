@@ -0,0 +1,77 @@
+import asyncio
+
+import openai
+import pytest
+
+from phone_agent.model import router as router_module
+from phone_agent.model.async_client import ActionComplete
+from phone_agent.model.client import ModelConfig, ModelEndpoint
+from phone_agent.model.mock_server import MockModelServer
+from phone_agent.model.retry import RetryPolicy, get_circuit_breaker
+from phone_agent.model.router import ModelRouter
+
+
+async def _collect(router: ModelRouter) -> list:
+    messages = [{"role": "user", "content": "打开设置"}]
+    return [event async for event in router.stream(messages)]
+
+
+def test_hedge_after_failover_used_up_backups(monkeypatch):
+    # The hedge timer of the failed primary fires while the only backup,
+    # reached by failover, is still waiting for its first token
+    monkeypatch.setattr(router_module, "DEFAULT_HEDGE_DELAY", 1.0)
+    with (
+        MockModelServer(failure_rate=1.0, failure_status=400) as primary,
+        MockModelServer(ttft=2.0) as backup,
+    ):
+        config = ModelConfig(
+            base_url=primary.base_url,
+            endpoints=[ModelEndpoint(backup.base_url)],
+            hedge=True,
+        )
+        router = ModelRouter(config)
+        events = asyncio.run(_collect(router))
+
+    assert any(isinstance(event, ActionComplete) for event in events)
+    stats = router.get_stats()
+    assert stats[router_module._endpoint_name(primary.base_url)]["errors"] == 1
+    assert stats[router_module._endpoint_name(backup.base_url)]["errors"] == 0
+
+
+def test_open_circuit_of_primary_routes_to_backup():
+    with MockModelServer() as primary, MockModelServer() as backup:
+        breaker = get_circuit_breaker(primary.base_url)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        router = ModelRouter(
+            ModelConfig(
+                base_url=primary.base_url, endpoints=[ModelEndpoint(backup.base_url)]
+            )
+        )
+        response = asyncio.run(
+            router.request([{"role": "user", "content": "打开设置"}])
+        )
+
+        assert response.action
+        assert primary.stats["requests"] == 0
+        assert backup.stats["requests"] == 1
+
+
+def test_backup_failures_do_not_open_the_primary_circuit():
+    # The primary answers (with a client error), only the backup is down
+    with (
+        MockModelServer(failure_rate=1.0, failure_status=400) as primary,
+        MockModelServer(failure_rate=1.0, failure_status=503) as backup,
+    ):
+        config = ModelConfig(
+            base_url=primary.base_url,
+            endpoints=[ModelEndpoint(backup.base_url)],
+            retry=RetryPolicy(max_retries=0),
+        )
+        router = ModelRouter(config)
+        for _ in range(config.retry.circuit_failure_threshold + 1):
+            with pytest.raises(openai.APIStatusError):
+                asyncio.run(router.request([{"role": "user", "content": "打开设置"}]))
+
+    assert get_circuit_breaker(primary.base_url).state == "closed"
+    assert get_circuit_breaker(backup.base_url).state == "open"
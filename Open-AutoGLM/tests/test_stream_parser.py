@@ -0,0 +1,77 @@
+import itertools
+
+import pytest
+
+from phone_agent.model.stream_parser import StreamParser, find_action_end
+
+_RESPONSES = {
+    "tags": (
+        '<think>Open the app</think>\n<answer>do(action="Tap", element=[500, 80])'
+        "</answer>",
+        ("Open the app", 'do(action="Tap", element=[500, 80])'),
+    ),
+    "no tags": (
+        'The search box is at the top. do(action="Back")',
+        ("The search box is at the top.", 'do(action="Back")'),
+    ),
+    "trailing text": (
+        '先打开设置 do(action="Launch", app="设置")\n然后点击',
+        ("先打开设置", 'do(action="Launch", app="设置")'),
+    ),
+    "finish with parenthesis": (
+        '<think>done</think><answer>finish(message="a)b")</answer>',
+        ("done", 'finish(message="a)b")'),
+    ),
+    "type with unbalanced quotes": (
+        'Typing. do(action="Type", text="it\'s 5" tall)")</answer>',
+        ("Typing.", 'do(action="Type", text="it\'s 5" tall)")'),
+    ),
+    "answer without marker": (
+        "<think>hm</think><answer>Tap the button</answer>",
+        ("hm", "Tap the button"),
+    ),
+    "no marker": ("just some text", ("", "just some text")),
+}
+
+
+def _parse(chunks):
+    parser = StreamParser()
+    printed = "".join(parser.feed(chunk) for chunk in chunks) + parser.flush()
+    return parser.result(), printed
+
+
+def _splits(text, pieces):
+    for cuts in itertools.combinations(range(1, len(text)), pieces - 1):
+        bounds = (0, *cuts, len(text))
+        yield [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("name", _RESPONSES)
+def test_parse(name):
+    text, expected = _RESPONSES[name]
+    assert _parse([text])[0] == expected
+
+
+@pytest.mark.parametrize("name", _RESPONSES)
+def test_chunking_does_not_change_the_result(name):
+    text, _ = _RESPONSES[name]
+    whole = _parse([text])
+    assert _parse(list(text)) == whole
+    for chunks in itertools.chain(_splits(text, 2), _splits(text, 3)):
+        assert _parse(chunks) == whole, chunks
+
+
+def test_thinking_is_printed_without_markers():
+    parser = StreamParser()
+    printed = parser.feed("<think>Open the app do(act")
+    assert printed == "Open the app "
+    assert parser.feed('ion="Back")</answer>') == ""
+    assert not parser.flush()
+    assert parser.action_complete
+
+
+def test_find_action_end():
+    assert find_action_end('do(action="Back")</answer>') == 17
+    assert find_action_end('do(action="Tap", element=[1, 2]') is None
+    assert find_action_end('finish(message="a)b")') is None
+    assert find_action_end('finish(message="a)b") </answer>') == 21
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from phone_agent.model.async_client import StreamStalledError, _StreamWatchdog
+from phone_agent.model.client import ModelConfig
+
+
+def test_first_token_waits_share_one_budget():
+    config = ModelConfig(first_token_timeout=0.3, stream_timeout=None)
+
+    async def main():
+        watchdog = _StreamWatchdog(config)
+        # The response headers and an empty role chunk arrive in time...
+        await watchdog.wait(asyncio.sleep(0.2))
+        # ...but together with this wait they exceed the first-token deadline
+        await watchdog.wait(asyncio.sleep(0.2))
+
+    with pytest.raises(StreamStalledError) as info:
+        asyncio.run(main())
+    assert info.value.phase == "first token"
+
+
+def test_token_deadline_restarts_with_every_chunk():
+    config = ModelConfig(token_timeout=0.3, stream_timeout=None)
+
+    async def main():
+        watchdog = _StreamWatchdog(config)
+        watchdog.first_token_received = True
+        for _ in range(3):
+            await watchdog.wait(asyncio.sleep(0.2))
+
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+import pytest
+
+from phone_agent.adb.watchdog import ConnectionWatchdog, is_remote_address
+
+_ADDRESS = "10.0.0.1:5555"
+
+
+@pytest.fixture
+def watchdog(monkeypatch):
+    watchdog = ConnectionWatchdog(adb_path="adb")
+    # Probes are driven by the tests instead of the background thread
+    monkeypatch.setattr(watchdog, "start", lambda: None)
+    return watchdog
+
+
+def test_is_remote_address():
+    assert is_remote_address(_ADDRESS)
+    assert is_remote_address("phone.local:5555")
+    assert not is_remote_address("emulator-5554")
+    assert not is_remote_address(None)
+
+
+def test_watched_device_is_online_until_the_first_probe(watchdog, capsys):
+    watchdog.watch(_ADDRESS)
+    assert watchdog.is_watching(_ADDRESS)
+    assert watchdog.wait_until_online(_ADDRESS, timeout=0)
+    assert "offline" not in capsys.readouterr().out
+
+
+def test_failed_probe_blocks_until_reconnected(watchdog, monkeypatch):
+    watchdog.watch(_ADDRESS)
+    monkeypatch.setattr(watchdog, "_probe", lambda address: False)
+    watchdog._check(_ADDRESS)
+    assert not watchdog.wait_until_online(_ADDRESS, timeout=0)
+    assert watchdog.get_metrics()[_ADDRESS]["online"] is False
+
+    monkeypatch.setattr(watchdog, "_probe", lambda address: True)
+    watchdog._check(_ADDRESS)
+    assert watchdog.wait_until_online(_ADDRESS, timeout=0)
+    assert watchdog.get_metrics()[_ADDRESS]["reconnects"] == 1
+
+
+def test_unwatch_releases_waiters(watchdog, monkeypatch):
+    watchdog.watch(_ADDRESS)
+    monkeypatch.setattr(watchdog, "_probe", lambda address: False)
+    watchdog._check(_ADDRESS)
+    watchdog.unwatch(_ADDRESS)
+    assert watchdog.wait_until_online(_ADDRESS, timeout=0)
+
+
+def test_unwatched_device_does_not_block(watchdog):
+    assert watchdog.wait_until_online("10.0.0.2:5555", timeout=0)
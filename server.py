@@ -21,6 +21,7 @@ OPEN_AUTOGLM_DIR = BASE_DIR / "Open-AutoGLM"
 PLATFORM_TOOLS_DIR = BASE_DIR / "platform-tools"
 APK_DIR = BASE_DIR / "apk"
 CONFIG_FILE = BASE_DIR / "config.json"
+DEVICE_METRICS_FILE = BASE_DIR / "device_metrics.json"
 
 app = Flask(__name__, static_folder='static')
 CORS(app)
@@ -53,6 +54,11 @@ def get_default_config():
                 "model": "autoglm-phone-9b",
                 "api_key": ""
             }
+        },
+        # 备用服务商：任务按首 Token 延迟和错误率在当前服务商与备用服务商间路由
+        "routing": {
+            "fallback_providers": [],
+            "hedge": False
         }
     }
 
@@ -81,6 +87,7 @@ def load_config():
                 for provider in default['providers']:
                     if provider not in config['providers']:
                         config['providers'][provider] = default['providers'][provider]
+            config.setdefault('routing', default['routing'])
             return config
     return default
 
@@ -92,6 +99,27 @@ def get_current_provider_config():
     return config['providers'].get(provider, config['providers']['bigmodel'])
 
 
+def get_routing_endpoints(config):
+    """获取备用服务商的端点参数列表（BASE_URL,MODEL,API_KEY），跳过未配置 Key 的服务商"""
+    current_provider = config.get('current_provider', 'bigmodel')
+    endpoints = []
+    for provider in config.get('routing', {}).get('fallback_providers', []):
+        if provider == current_provider:
+            continue
+        provider_config = config.get('providers', {}).get(provider)
+        if not provider_config or not provider_config.get('base_url'):
+            continue
+        api_key = provider_config.get('api_key', '')
+        if not api_key and provider != 'custom':
+            continue
+        endpoints.append(','.join([
+            provider_config['base_url'],
+            provider_config.get('model', ''),
+            api_key or 'EMPTY',
+        ]))
+    return endpoints
+
+
 def save_config(config):
     """保存配置文件"""
     with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
@@ -122,6 +150,55 @@ def restart_adb_server():
     return result
 
 
+def get_capability_cache():
+    """获取设备能力缓存（Open-AutoGLM 依赖未安装时返回 None）"""
+    try:
+        if str(OPEN_AUTOGLM_DIR) not in sys.path:
+            sys.path.insert(0, str(OPEN_AUTOGLM_DIR))
+        from phone_agent.capabilities import get_capability_cache as _get_cache
+        return _get_cache()
+    except ImportError:
+        return None
+
+
+def get_device_capabilities(refresh=False):
+    """从缓存读取当前设备能力，未命中时一次性探测并缓存"""
+    cache = get_capability_cache()
+    if cache is None:
+        return None
+    return cache.get(adb_path=get_adb_path(), refresh=refresh)
+
+
+def invalidate_device_capabilities():
+    """设备状态变化后清除能力缓存"""
+    cache = get_capability_cache()
+    if cache is not None:
+        cache.invalidate()
+
+
+def get_connection_watchdog():
+    """获取 WiFi 设备连接看门狗（Open-AutoGLM 依赖未安装时返回 None）"""
+    try:
+        if str(OPEN_AUTOGLM_DIR) not in sys.path:
+            sys.path.insert(0, str(OPEN_AUTOGLM_DIR))
+        from phone_agent.adb.watchdog import get_connection_watchdog as _get_watchdog
+        return _get_watchdog(get_adb_path())
+    except ImportError:
+        return None
+
+
+def get_openai_client(base_url, api_key, timeout=None):
+    """获取按 (base_url, api_key) 复用连接池的 OpenAI 客户端"""
+    try:
+        if str(OPEN_AUTOGLM_DIR) not in sys.path:
+            sys.path.insert(0, str(OPEN_AUTOGLM_DIR))
+        from phone_agent.model.client_pool import get_openai_client as _get_client
+        return _get_client(base_url, api_key, timeout=timeout)
+    except ImportError:
+        from openai import OpenAI
+        return OpenAI(base_url=base_url, api_key=api_key, timeout=timeout)
+
+
 def run_command(cmd, timeout=30):
     """运行命令并返回结果"""
     try:
@@ -368,7 +445,13 @@ def adb_status():
                 })
     
     # 如果有设备，检查 ADB Keyboard
-    if status["devices"]:
+    caps = get_device_capabilities() if status["devices"] else None
+    if caps is not None:
+        # 命中能力缓存，无需再执行 adb shell
+        status["adb_keyboard"]["installed"] = caps.adb_keyboard_installed
+        status["adb_keyboard"]["enabled"] = caps.adb_keyboard_enabled
+        status["adb_keyboard"]["ime_list"] = caps.ime_list
+    elif status["devices"]:
         # 检查是否安装
         result = run_command(f'"{adb}" shell pm path com.android.adbkeyboard')
         status["adb_keyboard"]["installed"] = 'package:' in result.get('stdout', '').lower()
@@ -471,6 +554,18 @@ def check_adbkeyboard():
     # 首先确保ADB服务器已启动
     run_command(f'"{adb}" start-server')
     
+    # 重新探测一次（单次 adb shell）并刷新能力缓存，避免沿用过期的“已启用”状态；
+    # 未启用时继续实时检测，以便发现刚完成的安装
+    caps = get_device_capabilities(refresh=True)
+    if caps is not None and caps.adb_keyboard_enabled:
+        return jsonify({
+            "installed": True,
+            "enabled": True,
+            "device_connected": True,
+            "apk_exists": apk_exists,
+            "message": "ADBKeyboard已安装并启用"
+        })
+    
     # 第一步：用adb shell pm path检查ADBKeyboard是否安装（带重试）
     result_pkg = None
     for attempt in range(3):
@@ -530,6 +625,8 @@ def check_adbkeyboard():
     
     # 必须检测完整的输入法ID: com.android.adbkeyboard/.AdbIME
     if 'com.android.adbkeyboard/.AdbIME' in ime_list:
+        # 刷新能力缓存，后续检测直接命中
+        get_device_capabilities(refresh=True)
         return jsonify({
             "installed": True,
             "enabled": True,
@@ -570,6 +667,7 @@ def enable_adbkeyboard():
     
     # 步骤2：设置为当前输入法
     set_result = run_command(f'"{adb}" shell ime set com.android.adbkeyboard/.AdbIME')
+    invalidate_device_capabilities()
     
     if set_result.get('success') or 'selected' in set_result.get('stdout', '').lower():
         return jsonify({
@@ -613,6 +711,8 @@ def install_adbkeyboard():
     if "doesn't match" in stderr or 'no devices' in stderr.lower():
         restart_adb_server()
         result = run_command(f'"{adb}" install -r "{apk_path}"', timeout=120)
+    # 安装完成后清除能力缓存，下次检测重新探测
+    invalidate_device_capabilities()
     
     if result.get('success') or 'Success' in result.get('stdout', ''):
         return jsonify({
@@ -643,7 +743,8 @@ def get_config():
     # 构建安全的配置（隐藏完整的 API Key）
     safe_config = {
         "current_provider": config.get('current_provider', 'bigmodel'),
-        "providers": {}
+        "providers": {},
+        "routing": config.get('routing', get_default_config()['routing'])
     }
     
     for provider, provider_config in config.get('providers', {}).items():
@@ -659,7 +760,9 @@ def get_config():
             "base_url": provider_config.get('base_url', ''),
             "model": provider_config.get('model', ''),
             "has_api_key": bool(key),
-            "api_key_display": key_display
+            "api_key_display": key_display,
+            "max_rps": provider_config.get('max_rps', 0),
+            "max_concurrent": provider_config.get('max_concurrent', 0)
         }
     
     return jsonify(safe_config)
@@ -671,6 +774,20 @@ def update_config():
     data = request.json
     config = load_config()
     
+    # 校验客户端限流参数（0 或空表示不限制）
+    try:
+        max_rps = float(data.get('max_rps') or 0)
+        if not 0 <= max_rps < float('inf'):
+            raise ValueError()
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "每秒请求数必须是不小于0的数字"})
+    try:
+        max_concurrent = int(data.get('max_concurrent') or 0)
+        if max_concurrent < 0:
+            raise ValueError()
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "最大并发数必须是不小于0的整数"})
+    
     provider = data.get('provider', config.get('current_provider', 'bigmodel'))
     
     # 更新当前服务商
@@ -692,6 +809,20 @@ def update_config():
         config['providers'][provider]['base_url'] = data['base_url']
     if 'model' in data:
         config['providers'][provider]['model'] = data['model']
+    # 客户端限流
+    if 'max_rps' in data:
+        config['providers'][provider]['max_rps'] = max_rps
+    if 'max_concurrent' in data:
+        config['providers'][provider]['max_concurrent'] = max_concurrent
+    
+    # 更新多服务商路由
+    routing = config.setdefault('routing', get_default_config()['routing'])
+    if 'fallback_providers' in data:
+        routing['fallback_providers'] = [
+            p for p in data['fallback_providers'] if p in config['providers']
+        ]
+    if 'hedge' in data:
+        routing['hedge'] = bool(data['hedge'])
     
     save_config(config)
     return jsonify({"success": True, "message": "配置已保存"})
@@ -746,10 +877,9 @@ def verify_api_key():
         return jsonify({"valid": False, "error": "请输入API Key"})
     
     try:
-        from openai import OpenAI
         # 对于自部署服务，使用一个占位符 key
         actual_key = api_key if api_key else "sk-placeholder"
-        client = OpenAI(base_url=base_url, api_key=actual_key, timeout=30.0)
+        client = get_openai_client(base_url, actual_key, timeout=30.0)
         
         # 简单测试API是否可用
         response = client.chat.completions.create(
@@ -836,15 +966,21 @@ def run_task():
             else:
                 current_task["logs"].append("⚠ 未检测到设备，继续尝试执行...")
             
-            # 检查 ADB Keyboard
-            result_ime = run_command(f'"{adb}" shell ime list -s')
-            if 'com.android.adbkeyboard/.AdbIME' in result_ime.get('stdout', ''):
+            # 检查 ADB Keyboard（优先读取能力缓存）
+            caps = get_device_capabilities()
+            if caps is not None:
+                keyboard_enabled = caps.adb_keyboard_enabled
+            else:
+                result_ime = run_command(f'"{adb}" shell ime list -s')
+                keyboard_enabled = 'com.android.adbkeyboard/.AdbIME' in result_ime.get('stdout', '')
+            if keyboard_enabled:
                 current_task["logs"].append("✓ ADB Keyboard 已启用")
             else:
                 current_task["logs"].append("⚠ ADB Keyboard 可能未启用，尝试自动启用...")
                 # 尝试自动启用
                 run_command(f'"{adb}" shell ime enable com.android.adbkeyboard/.AdbIME')
                 run_command(f'"{adb}" shell ime set com.android.adbkeyboard/.AdbIME')
+                invalidate_device_capabilities()
                 time.sleep(0.5)
             
             # 设置环境变量
@@ -853,6 +989,8 @@ def run_task():
             env['PATH'] = str(PLATFORM_TOOLS_DIR) + os.pathsep + env.get('PATH', '')
             # 设置Python IO编码为UTF-8，解决emoji字符编码问题
             env['PYTHONIOENCODING'] = 'utf-8'
+            # 任务结束后由 main.py 写入设备操作耗时快照
+            env['PHONE_AGENT_METRICS_FILE'] = str(DEVICE_METRICS_FILE)
             
             # 从当前服务商配置获取参数
             base_url = provider_config.get('base_url', 'https://open.bigmodel.cn/api/paas/v4')
@@ -867,6 +1005,16 @@ def run_task():
             # 只有有 API Key 时才添加
             if api_key:
                 cmd.extend(['--apikey', api_key])
+            # 备用服务商：每一步发往首 Token 延迟最低的健康端点
+            for endpoint in get_routing_endpoints(config):
+                cmd.extend(['--endpoint', endpoint])
+            if config.get('routing', {}).get('hedge'):
+                cmd.append('--hedge')
+            # 客户端限流：多个任务共用一个 API Key 时避免触发服务商 429
+            if provider_config.get('max_rps'):
+                cmd.extend(['--max-rps', str(provider_config['max_rps'])])
+            if provider_config.get('max_concurrent'):
+                cmd.extend(['--max-concurrent', str(provider_config['max_concurrent'])])
             cmd.append(task_text)
             
             current_task["logs"].append(f"开始执行任务: {task_text}")
@@ -970,6 +1118,10 @@ def wifi_connect():
     if result.get('success'):
         output = result.get('stdout', '') + result.get('stderr', '')
         if 'connected' in output.lower() or 'already connected' in output.lower():
+            # 后台保活，掉线后自动重连
+            watchdog = get_connection_watchdog()
+            if watchdog is not None:
+                watchdog.watch(address)
             return jsonify({
                 "success": True,
                 "message": f"已连接到 {address}",
@@ -1015,6 +1167,11 @@ def wifi_disconnect():
     
     adb = get_adb_path()
     
+    # 主动断开的设备不再自动重连
+    watchdog = get_connection_watchdog()
+    if watchdog is not None:
+        watchdog.unwatch(device_id or None)
+    
     if device_id:
         result = run_command(f'"{adb}" disconnect {device_id}')
     else:
@@ -1033,6 +1190,34 @@ def wifi_disconnect():
         })
 
 
+@app.route('/api/adb/wifi/watchdog', methods=['GET'])
+def wifi_watchdog_metrics():
+    """获取 WiFi 设备保活指标（重连次数、掉线时长）"""
+    watchdog = get_connection_watchdog()
+    if watchdog is None:
+        return jsonify({"success": False, "error": "Open-AutoGLM 依赖未安装"})
+    return jsonify({"success": True, "devices": watchdog.get_metrics()})
+
+
+@app.route('/api/device/metrics', methods=['GET'])
+def device_metrics():
+    """获取设备操作耗时统计（按后端、设备、操作分组的直方图）"""
+    try:
+        if str(OPEN_AUTOGLM_DIR) not in sys.path:
+            sys.path.insert(0, str(OPEN_AUTOGLM_DIR))
+        from phone_agent.device_metrics import get_device_metrics, load_device_metrics
+    except ImportError:
+        return jsonify({"success": False, "error": "Open-AutoGLM 依赖未安装"})
+
+    return jsonify({
+        "success": True,
+        # 本服务进程内的设备调用（设备检测等）
+        "server": get_device_metrics(),
+        # 最近一次任务进程写入的快照
+        "last_task": load_device_metrics(str(DEVICE_METRICS_FILE)),
+    })
+
+
 @app.route('/api/adb/wifi/enable-tcpip', methods=['POST'])
 def enable_tcpip():
     """在USB连接的设备上启用TCP/IP模式（用于后续WiFi连接）"""